@@ -0,0 +1,207 @@
+"""
+This module runs many LidFlow executions as a batch. A manifest lists the data_paths /
+intermediate_paths variants to sweep; runs are submitted concurrently by a bounded worker pool,
+status polling for every run is multiplexed through a single MultiRunMonitor, and orchestration
+crates are built in a process pool as runs finish. Each run gets its own sub-crate directory and
+crate directory, so concurrent runs never collide.
+
+Manifest format (JSON):
+{
+    "defaults": {"endpoints": {...}, "data_paths": {...}, "intermediate_paths": {...},
+                 "LP_configuration": {...}, "run_label": "...", "run_tags": [...]},
+    "runs": [{"name": "dataset_a", "data_paths": {...}}, ...]
+}
+Sections given for a run are merged over the defaults.
+"""
+import copy
+import json
+import os
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+from .run_monitor import MultiRunMonitor, BackoffPolicy
+from .flow_registry import warm_up
+from .orchestration_types import OrchestrationData
+
+logger = logging.getLogger(__name__)
+
+CONFIG_SECTIONS = ('endpoints', 'data_paths', 'intermediate_paths', 'LP_configuration')
+
+
+def load_manifest(manifest_path) -> List[dict]:
+    """
+    Loads a batch manifest, returning one complete configuration per run.
+    """
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    return expand_manifest(manifest)
+
+
+def expand_manifest(manifest) -> List[dict]:
+    defaults = manifest.get('defaults', {})
+    runs, names = [], set()
+    for i, variant in enumerate(manifest['runs']):
+        config = copy.deepcopy(defaults)
+        for section in CONFIG_SECTIONS:
+            config.setdefault(section, {}).update(variant.get(section, {}))
+        for key in ('run_label', 'run_tags'):
+            if key in variant:
+                config[key] = variant[key]
+
+        name = variant.get('name', f"run_{i}")
+        if name in names:
+            raise ValueError(f"Duplicate run name {name} in batch manifest")
+        names.add(name)
+        config['name'] = name
+        # Each run receives its sub-crates in its own directory
+        config['LP_configuration']['article_name'] = os.path.join(config['LP_configuration']['article_name'], name)
+        config['run_label'] = f"{config.get('run_label', 'LiDFlow run')} ({name})"
+        runs.append(config)
+
+    shared = _shared_intermediate_paths(runs)
+    if shared:
+        logger.warning(f"Runs share intermediate paths on the LPAP nodes and may overwrite each other: {shared}")
+    return runs
+
+
+def _shared_intermediate_paths(runs):
+    seen, shared = {}, set()
+    for config in runs:
+        for path in config['intermediate_paths'].values():
+            if path in seen and seen[path] != config['name']:
+                shared.add(path)
+            seen[path] = config['name']
+    return sorted(shared)
+
+
+def build_crate(data_dict, crate_directory, run_label, run_tags, blob_store_root=None):
+    """
+    Builds an orchestration crate from serialized orchestration data (runs in a worker process).
+    """
+    from .orchestration_crate import Orchestration_crate
+    from .blob_store import BlobStore
+
+    blob_store = BlobStore(blob_store_root) if blob_store_root else None
+    crate = Orchestration_crate(None, OrchestrationData.from_dict(data_dict), crate_directory,
+                                run_label, run_tags, blob_store=blob_store)
+    crate.build_crate()
+    return str(crate_directory)
+
+
+class BatchRunner:
+    """
+    Parameters:
+    runs (List[dict]): Run configurations, as returned by load_manifest.
+    crate_root (Path): Directory under which each run's orchestration crate is written.
+    max_workers (int): Maximum number of runs being submitted / collected concurrently.
+    crate_workers (int): Number of processes building crates (defaults to the CPU count).
+    backoff (BackoffPolicy): Status polling backoff, applied per run.
+    blob_store_root (Path): Optional blob store shared by the crates.
+    flow_factory (Callable): Creates a flow from a run configuration (defaults to LidFlow).
+    warm (bool): Deploy the flows and fetch tokens before any run is submitted.
+    """
+
+    def __init__(self, runs, crate_root, max_workers=4, crate_workers=None, backoff: BackoffPolicy = None,
+                 blob_store_root=None, flow_factory=None, warm=False):
+        self.runs = runs
+        self.crate_root = Path(crate_root)
+        self.max_workers = max_workers
+        self.crate_workers = crate_workers
+        self.backoff = backoff
+        self.blob_store_root = str(blob_store_root) if blob_store_root else None
+        self.flow_factory = flow_factory or self._lid_flow
+        self.warm = warm
+        self.prepared = {}      # run name -> flow created (and warmed up) ahead of submission
+        self.flows = {}         # run_id -> (config, flow)
+        self.collected = {}     # run name -> future of the crate build future
+        self.results: Dict[str, dict] = {}
+
+    @staticmethod
+    def _lid_flow(config):
+        from .LidFlow import LidFlow
+        return LidFlow(config['endpoints'], config['data_paths'], config['intermediate_paths'],
+                       config['LP_configuration'], run_label=config['run_label'],
+                       run_tags=config.get('run_tags', []))
+
+    def warm_up(self):
+        """
+        Creates every run's flow, deploys each distinct flow definition and fetches tokens, so
+        the runs start without deployment checks or logins.
+        """
+        self.prepared = {config['name']: self.flow_factory(config) for config in self.runs}
+        return warm_up(list(self.prepared.values()))
+
+    def _start(self, config):
+        flow = self.prepared.pop(config['name'], None) or self.flow_factory(config)
+        flow.run()
+        return flow
+
+    def _collect(self, config, flow, status):
+        # Post-run work for one run: WED paging, sub-crate transfers, data collation
+        flow.run_status = status
+        flow.collect_WED()
+        flow.monitor_transfer()
+        data = flow.get_data()
+        crate_directory = self.crate_root / config['name']
+        return self.crate_pool.submit(build_crate, data.to_dict(), str(crate_directory), config['run_label'],
+                                      config.get('run_tags', []), self.blob_store_root)
+
+    def _on_run_complete(self, run_id, status):
+        config, flow = self.flows[run_id]
+        logger.info(f"Run {config['name']} ({run_id}) {status['status']}")
+        self.results[config['name']]['status'] = status['status']
+        if status['status'] == 'SUCCEEDED':
+            self.collected[config['name']] = self.workers.submit(self._collect, config, flow, status)
+
+    def run(self) -> Dict[str, dict]:
+        """
+        Runs every configuration in the batch, returning a result per run name.
+        """
+        if self.warm:
+            self.warm_up()
+        monitor = MultiRunMonitor(self.backoff, on_complete=self._on_run_complete)
+        with ThreadPoolExecutor(self.max_workers) as self.workers, \
+                ProcessPoolExecutor(self.crate_workers) as self.crate_pool:
+            started = {self.workers.submit(self._start, config): config for config in self.runs}
+            for future in as_completed(started):
+                config = started[future]
+                self.results[config['name']] = {'run_id': None, 'status': None, 'crate_directory': None, 'error': None}
+                try:
+                    flow = future.result()
+                except Exception as e:
+                    logger.error(f"Run {config['name']} failed to start: {e}")
+                    self.results[config['name']]['error'] = str(e)
+                    continue
+                self.flows[flow.run_id] = (config, flow)
+                self.results[config['name']]['run_id'] = flow.run_id
+                monitor.add(flow.run_id, flow.status_source or flow.client)
+
+            monitor.wait()
+            self.poll_stats = monitor.stats
+
+            for name, collected in self.collected.items():
+                try:
+                    self.results[name]['crate_directory'] = collected.result().result()
+                except Exception as e:
+                    logger.error(f"Run {name} failed to build its orchestration crate: {e}")
+                    self.results[name]['error'] = str(e)
+        return self.results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run and crate a batch of LidFlow executions")
+    parser.add_argument("manifest", help="Batch manifest (JSON)")
+    parser.add_argument("--crate-root", default=str(Path.cwd() / "working_crates"))
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--crate-workers", type=int, default=None)
+    parser.add_argument("--warm-up", action="store_true", help="Deploy flows and fetch tokens before submitting runs")
+    args = parser.parse_args()
+
+    results = BatchRunner(load_manifest(args.manifest), args.crate_root, args.max_workers, args.crate_workers,
+                          blob_store_root=Path.cwd() / ".crate_blobs", warm=args.warm_up).run()
+    print(json.dumps(results, indent=4))
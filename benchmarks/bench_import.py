@@ -0,0 +1,87 @@
+"""
+Cold start benchmark: the time taken to import the orchestration entry points, and to print the
+CLI help, each in a fresh interpreter. Exits with status 1 if any of them regresses:
+
+    - a module imports a heavy dependency it does not need at import time (gladier, globus_sdk,
+      rocrate, graphviz, yaml, numpy), or
+    - the best of the repeated timings exceeds its budget.
+
+Targets whose own dependencies are not installed are reported as skipped.
+
+Usage: python benchmarks/bench_import.py [repeats]
+"""
+import json
+import subprocess
+import sys
+import time
+
+from common import REPO
+
+HEAVY = ('gladier', 'globus_sdk', 'rocrate', 'graphviz', 'yaml', 'numpy')
+
+# Module -> (import budget (s), heavy dependencies it may import)
+TARGETS = {
+    'orchestration': (0.1, ()),                     # The CLI, before a command runs
+    'snapshot': (0.1, ()),                          # Loading orchestration data
+    'checkpoint': (0.1, ()),                        # Resuming from a journal
+    'flow': (0.25, ()),                             # The Flow engine, without a Gladier client
+    'LidFlow': (0.25, ()),                          # The LiD flow, before its Gladier client is built
+    'orchestration_crate': (1.0, ('rocrate',)),     # A crate-only rebuild
+}
+HELP_BUDGET = 0.5   # Seconds for `python -m <package>.orchestration --help`, interpreter start up included
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+try:
+    __import__({module!r})
+except ImportError as e:
+    print(json.dumps({{'missing': e.name}}))
+    sys.exit(0)
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': sorted(name for name in {heavy!r} if name in sys.modules)}}))
+"""
+
+
+def probe(module):
+    code = PROBE.format(root=str(REPO.parent), module=f"{REPO.name}.{module}", heavy=HEAVY)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def time_help():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", f"{REPO.name}.orchestration", "--help"], cwd=REPO.parent,
+                   capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def bench(repeats):
+    failures = []
+    for module, (budget, allowed) in TARGETS.items():
+        results = [probe(module) for _ in range(repeats)]
+        if 'missing' in results[0]:
+            print(f"{module}: skipped ({results[0]['missing']} is not installed)")
+            continue
+        best = min(result['seconds'] for result in results)
+        unexpected = sorted(set(results[0]['heavy']) - set(allowed))
+        print(f"{module}: {best * 1000:.1f} ms (budget {budget * 1000:.0f} ms), heavy imports: {results[0]['heavy'] or 'none'}")
+        if unexpected:
+            failures.append(f"{module} imports {', '.join(unexpected)} at import time")
+        if best > budget:
+            failures.append(f"{module} took {best * 1000:.1f} ms to import (budget {budget * 1000:.0f} ms)")
+
+    best = min(time_help() for _ in range(repeats))
+    print(f"orchestration --help: {best * 1000:.1f} ms (budget {HELP_BUDGET * 1000:.0f} ms)")
+    if best > HELP_BUDGET:
+        failures.append(f"orchestration --help took {best * 1000:.1f} ms (budget {HELP_BUDGET * 1000:.0f} ms)")
+    return failures
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failures = bench(repeats)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
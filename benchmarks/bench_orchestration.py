@@ -0,0 +1,67 @@
+"""
+End-to-end orchestration benchmark against the local mock Globus stack (mock_globus.MockGlobus).
+A LidFlow runs synthetic workflows of increasing size, and the benchmark reports the orchestration
+overhead (wall time beyond the replayed run and transfer time), the Globus API calls made, and the
+orchestration crate build time.
+
+Usage: python benchmarks/bench_orchestration.py [n_steps ...]
+"""
+import os
+import sys
+import tempfile
+
+from common import import_module, timed
+
+mock_globus = import_module("mock_globus")
+run_monitor = import_module("run_monitor")
+identity_cache = import_module("identity_cache")
+flow_registry = import_module("flow_registry")
+LidFlow = import_module("LidFlow").LidFlow
+Orchestration_crate = import_module("orchestration_crate").Orchestration_crate
+
+STEP_SECONDS = 0.002        # Replayed duration of each step
+TRANSFER_SECONDS = 0.01     # Replayed duration of each sub-crate transfer
+
+ENDPOINTS = {key: f"mock-{key.lower()}" for key in ("FT_UUID", "ST_UUID", "LD_UUID", "DS_UUID")}
+DATA_PATHS = {"validation_path": "/mock/validation.txt", "data_path": "/mock/input_data.txt"}
+INTERMEDIATE_PATHS = {key: f"/mock/{key}" for key in (
+    "validation_dest_path", "DS_FT_dest", "DS_LD_dest", "FT_ST_dest", "LD_ST_dest", "FT_output_path", "LD_output_path")}
+
+
+def bench(n_steps, directory):
+    tools = mock_globus.synthetic_tools(n_steps)
+    WED = mock_globus.synthetic_WED(n_steps, STEP_SECONDS, state_names=[tool.__name__ for tool in tools])
+    article_name = os.path.join(directory, f"sub_crates_{n_steps}")
+    stack = mock_globus.MockGlobus(WED, transfer_duration=TRANSFER_SECONDS, article_name=article_name)
+
+    flow = LidFlow(ENDPOINTS, DATA_PATHS, INTERMEDIATE_PATHS,
+                   {'orchestration_node': 'mock-orchestration-node', 'article_name': article_name},
+                   run_label=f"Benchmark run ({n_steps} steps)", run_tags=["Benchmark"],
+                   poll_backoff=run_monitor.BackoffPolicy(initial=0.005, maximum=0.05, jitter=0.0),
+                   identity_cache=identity_cache.IdentityCache(path=None),
+                   flow_registry=flow_registry.FlowRegistry(None), journal_dir=None,
+                   **stack.flow_kwargs(tools))
+
+    results = {}
+    with timed(results, 'end_to_end'):
+        flow.run()
+        flow.monitor_run()
+        flow.monitor_transfer()
+        data = flow.get_data()
+    with timed(results, 'crate_build'):
+        crate = Orchestration_crate(flow, data, os.path.join(directory, f"crate_{n_steps}"),
+                                    flow.run_label, flow.run_tags)
+        crate.build_crate()
+
+    results['replayed'] = stack.flows.duration + (TRANSFER_SECONDS if n_steps > 1 else 0.0)
+    results['overhead'] = results['end_to_end'] - results['replayed']
+    return results, stack.api_calls()
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [1, 10, 100, 1000]
+    with tempfile.TemporaryDirectory() as directory:
+        for n_steps in sizes:
+            results, calls = bench(n_steps, directory)
+            print(f"\n{n_steps} steps: " + ", ".join(f"{k}={v:.4f}s" for k, v in results.items()))
+            print(f"{n_steps} steps: API calls " + ", ".join(f"{k}={v}" for k, v in sorted(calls.items())))
@@ -0,0 +1,62 @@
+"""
+Compares the legacy orchestration_data.json format against snapshots, for writing, loading, and
+a crate-build style replay (which reads everything except the raw WED).
+
+Usage: python benchmarks/bench_snapshot.py [n_steps ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import import_module, timed
+
+snapshot = import_module("snapshot")
+mock_globus = import_module("mock_globus")
+orchestration_types = import_module("orchestration_types")
+
+
+def synthetic_data(n_steps):
+    WED = mock_globus.synthetic_WED(n_steps)
+    WED_clean = dict(import_module("wed_parser").WEDParser().parse(WED))
+    identity = mock_globus.StubAuthClient.make_identity("00000000-0000-0000-0000-000000000000")
+    return orchestration_types.OrchestrationData(
+        input={'input': {}}, WEP={'StartAt': 'Step_0', 'States': {}}, WED=WED, WED_clean=WED_clean,
+        components={}, flow_id='flow', run_id='run', article_name='article',
+        identity_map={identity['id']: orchestration_types.GlobusUser(**identity)}, reused_inputs=[], cached_steps=[])
+
+
+def replay(data):
+    # What a crate build touches: WED_clean, WEP, input and identities, but not the raw WED
+    return len(data.WED_clean), len(data.WEP), [user.name for user in data.identity_map.values()]
+
+
+def bench(n_steps, directory):
+    data = synthetic_data(n_steps)
+    results = {}
+    json_path = os.path.join(directory, "orchestration_data.json")
+    snapshot_path = os.path.join(directory, snapshot.DEFAULT_SNAPSHOT_PATH)
+
+    with timed(results, 'json_write'):
+        with open(json_path, "w") as f:
+            f.write(json.dumps(data.to_dict(), indent=4))
+    with timed(results, 'snapshot_write'):
+        snapshot.write_snapshot(data, snapshot_path)
+
+    for name, path in (('json', json_path), ('snapshot', snapshot_path)):
+        tracemalloc.start()
+        with timed(results, f'{name}_replay'):
+            replay(snapshot.load_orchestration_data(path))
+        results[f'{name}_peak_MB'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        results[f'{name}_size_MB'] = os.path.getsize(path) / 2**20
+    return results
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or [10, 1000, 10000]
+    with tempfile.TemporaryDirectory() as directory:
+        for n_steps in sizes:
+            results = bench(n_steps, directory)
+            print(f"{n_steps} steps: " + ", ".join(f"{k}={v:.4f}" for k, v in results.items()))
@@ -0,0 +1,70 @@
+"""
+Startup latency benchmark: time from creating a flow to its run's first ActionStarted entry, against
+the local mock Globus stack with simulated flow check, deployment and token fetch latencies.
+
+Scenarios:
+    no registry     every run checks the flow before submitting (Gladier's default behaviour)
+    registry        runs skip the check once the flow definition is in the deployment registry
+    warm-up         the flow is deployed and tokens fetched by warm_up before the first run
+
+Usage: python benchmarks/bench_startup.py [n_runs]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from common import import_module
+
+mock_globus = import_module("mock_globus")
+flow_module = import_module("flow")
+flow_registry = import_module("flow_registry")
+
+CHECK_SECONDS = 0.3     # Gladier checking the deployed flow against the definition
+DEPLOY_SECONDS = 1.0    # Deploying / updating the flow
+TOKEN_SECONDS = 0.5     # Login / token refresh
+N_STEPS = 8
+
+
+def first_action_started(stack, run_id):
+    while True:
+        entries = stack.flows.get_run_logs(run_id)['entries']
+        if any(entry['code'] == 'ActionStarted' for entry in entries):
+            return
+        time.sleep(0.001)
+
+
+def bench(scenario, n_runs, directory):
+    tools = mock_globus.synthetic_tools(N_STEPS)
+    WED = mock_globus.synthetic_WED(N_STEPS, 0.001, state_names=[tool.__name__ for tool in tools])
+    stack = mock_globus.MockGlobus(WED, check_latency=CHECK_SECONDS, deploy_latency=DEPLOY_SECONDS,
+                                   token_latency=TOKEN_SECONDS)
+    registry_path = os.path.join(directory, f"{scenario}_registry.json")
+
+    def make_flow():
+        registry = flow_registry.FlowRegistry(None if scenario == 'no registry' else registry_path)
+        return flow_module.Flow(config={}, run_label=f"Startup benchmark ({scenario})",
+                                gladier_client=stack.gladier_client(tools), flow_registry=registry,
+                                identity_cache=import_module("identity_cache").IdentityCache(path=None),
+                                journal_dir=None)
+
+    if scenario == 'warm-up':
+        flow_registry.warm_up([make_flow()], flow_registry.FlowRegistry(registry_path))
+
+    latencies = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        flow = make_flow()
+        flow.run()
+        first_action_started(stack, flow.run_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies, stack.api_calls()
+
+
+if __name__ == '__main__':
+    n_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        for scenario in ('no registry', 'registry', 'warm-up'):
+            latencies, calls = bench(scenario, n_runs, directory)
+            print(f"{scenario}: first run {latencies[0]:.3f}s, mean {sum(latencies) / len(latencies):.3f}s, "
+                  f"total {sum(latencies):.3f}s | checks={calls.get('check_flow', 0)}, deploys={calls.get('deploy_flow', 0)}")
@@ -0,0 +1,25 @@
+"""
+Shared helpers for the benchmark scripts. The orchestration modules use package-relative imports,
+so the benchmarks import them through the repository's package name.
+"""
+import importlib
+import sys
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def import_module(name):
+    if str(REPO.parent) not in sys.path:
+        sys.path.insert(0, str(REPO.parent))
+    return importlib.import_module(f"{REPO.name}.{name}")
+
+
+@contextmanager
+def timed(results, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
@@ -0,0 +1,174 @@
+"""
+This module defines a content-addressed blob store for orchestration crate payloads. Files are
+stored once, keyed by their SHA-256 digest, and hardlinked into each crate that uses them, so
+payloads that do not change between runs (gladier component sources, WEP.json, input and
+validation data carried in sub-crates) are neither rewritten nor duplicated on disk.
+
+The store keeps a reference list per crate directory; gc() drops the references of crates that no
+longer exist and deletes blobs no remaining crate refers to.
+"""
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import logging
+
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class BlobStore:
+    """
+    Parameters:
+    root (Path): The store directory. It must be on the same filesystem as the crates for
+    hardlinks to be used; otherwise files are copied into the crates.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.blob_root = self.root / "blobs"
+        self.refs_path = self.root / "refs.json"
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+        self.stored = 0     # Blobs added to the store
+        self.reused = 0     # Payloads served by an existing blob
+
+    def blob_path(self, digest) -> Path:
+        return self.blob_root / digest[:2] / digest[2:]
+
+    def _protect(self, path):
+        # Blobs are shared between crates, so they are made read-only to catch in-place writes
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    def put_file(self, path, owned=False) -> str:
+        """
+        Adds a file to the store and returns its digest. The file is copied into the store, as
+        blobs are made read-only and must not share an inode with a caller's file (e.g. a gladier
+        component source). A file the crate owns (owned, and with no other links) is hardlinked
+        instead.
+        """
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        if blob.exists():
+            self.reused += 1
+            return digest
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if owned and os.stat(path).st_nlink == 1:
+            try:
+                os.link(path, blob)
+            except FileExistsError:
+                # Stored concurrently by another thread (see Orchestration_crate.prepare_steps)
+                self.reused += 1
+                return digest
+            except OSError:
+                self._copy(path, blob)
+        else:
+            self._copy(path, blob)
+        self._protect(blob)
+        self.stored += 1
+        return digest
+
+    def _copy(self, path, blob):
+        # Copied to a temporary file and renamed, so a concurrent reader never sees a partial blob
+        with open(path, 'rb') as source, tempfile.NamedTemporaryFile(dir=blob.parent, delete=False) as f:
+            shutil.copyfileobj(source, f)
+        os.replace(f.name, blob)
+
+    def put_bytes(self, data: bytes) -> str:
+        """
+        Adds a payload to the store and returns its digest.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if blob.exists():
+            self.reused += 1
+            return digest
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=blob.parent, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, blob)
+        self._protect(blob)
+        self.stored += 1
+        return digest
+
+    def link(self, digest, destination) -> Path:
+        """
+        Places the blob at destination, as a hardlink where possible and a copy otherwise.
+        """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        blob = self.blob_path(digest)
+        if destination.exists():
+            if destination.samefile(blob):
+                return destination
+            destination.unlink()
+        try:
+            os.link(blob, destination)
+        except OSError:
+            shutil.copyfile(blob, destination)
+        return destination
+
+    def dedupe_tree(self, directory) -> Set[str]:
+        """
+        Replaces each file under directory (which the crate owns, e.g. an ingested sub-crate) with
+        a link to its blob, returning the digests used.
+        """
+        digests = set()
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = Path(root) / name
+                digest = self.put_file(path, owned=True)
+                if not path.samefile(self.blob_path(digest)):
+                    self.link(digest, path)
+                digests.add(digest)
+        return digests
+
+    def _load_refs(self) -> Dict[str, list]:
+        if not self.refs_path.exists():
+            return {}
+        with open(self.refs_path, "r") as f:
+            return json.load(f)
+
+    def record(self, crate_directory, digests: Iterable[str]):
+        """
+        Records the blobs a crate directory refers to.
+        """
+        refs = self._load_refs()
+        refs[str(Path(crate_directory).resolve())] = sorted(set(digests))
+        with tempfile.NamedTemporaryFile("w", dir=self.root, delete=False) as f:
+            json.dump(refs, f, indent=4)
+        os.replace(f.name, self.refs_path)
+
+    def gc(self) -> int:
+        """
+        Deletes blobs which are not referenced by any existing crate, returning the number deleted.
+        """
+        refs = {crate: digests for crate, digests in self._load_refs().items() if os.path.isdir(crate)}
+        live = {digest for digests in refs.values() for digest in digests}
+        removed = 0
+        for prefix in self.blob_root.iterdir():
+            for blob in prefix.iterdir():
+                if prefix.name + blob.name not in live:
+                    blob.unlink()
+                    removed += 1
+            if not any(prefix.iterdir()):
+                prefix.rmdir()
+
+        with tempfile.NamedTemporaryFile("w", dir=self.root, delete=False) as f:
+            json.dump(refs, f, indent=4)
+        os.replace(f.name, self.refs_path)
+        logger.info(f"Blob store gc removed {removed} unreferenced blobs")
+        return removed
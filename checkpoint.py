@@ -0,0 +1,131 @@
+"""
+This module journals orchestration progress, so a run can be resumed if the orchestrating process
+dies. Each run has an append-only JSON-lines journal; a checkpoint is written (and fsynced) after
+each phase:
+
+    submitted       how to recreate the flow object, plus flow_id, run_id and the WEP checksum
+    run_complete    the final run status
+    WED_page        run log entries paged (while the run is in progress, or after it), the marker
+                    and offset to continue paging from, and whether the log is complete
+    transfer        a sub-crate transfer which has succeeded
+    identities      the Globus IDs mapped (the identity records are kept in the identity cache)
+    ingested        a sub-crate placed in the orchestration crate directory
+    crate_complete  the orchestration crate has been written
+
+resume(run_id) recreates the flow from the journal; Flow.resume then continues monitoring, paging
+and transfer tracking from the last checkpoint, without resubmitting the run.
+"""
+import importlib
+import json
+import os
+import threading
+import time
+import logging
+
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_DIR = Path.home() / ".orchestration_logic" / "journal"
+
+
+def _plain(value):
+    # Globus responses wrap their JSON document in .data
+    return getattr(value, 'data', value)
+
+
+class Journal:
+    """
+    The checkpoint journal of one run.
+
+    Parameters:
+    run_id (str): The ID of the run.
+    directory (Path): The directory holding the journals.
+    """
+
+    def __init__(self, run_id, directory=DEFAULT_JOURNAL_DIR, clock=time.time):
+        self.run_id = run_id
+        self.directory = Path(directory)
+        self.path = self.directory / f"{run_id}.jsonl"
+        self.clock = clock
+        self.lock = threading.Lock()    # Sub-crates may be ingested concurrently
+
+    def exists(self):
+        return self.path.exists()
+
+    def record(self, phase, **data):
+        """
+        Appends a checkpoint, and syncs it to disk before returning.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({'phase': phase, 'time': self.clock(), **{k: _plain(v) for k, v in data.items()}})
+        with self.lock, open(self.path, "a+") as f:
+            if f.tell() and not self._ends_with_newline():
+                line = "\n" + line     # Terminate a checkpoint cut short by a crash
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def records(self):
+        if not self.exists():
+            return []
+        records = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A checkpoint cut short by a crash is ignored
+                    logger.warning(f"Ignoring incomplete checkpoint in {self.path}")
+        return records
+
+    def state(self) -> dict:
+        """
+        Folds the journal into the state to resume from.
+        """
+        state = {'phases': set(), 'WED': [], 'marker': None, 'offset': 0, 'WED_complete': False, 'tasks': {},
+                 'ingested': {}}
+        for record in self.records():
+            phase = record.pop('phase')
+            state['phases'].add(phase)
+            if phase == 'WED_page':
+                state['WED'].extend(record['entries'])
+                state['marker'] = record['marker']
+                state['offset'] = record.get('offset', 0)
+                # Journals without the complete flag only recorded pages once the run had finished
+                state['WED_complete'] = record.get('complete', record['marker'] is None)
+            elif phase == 'transfer':
+                state['tasks'][record['label']] = record['task']
+            elif phase == 'ingested':
+                state['ingested'][record['key']] = record['path']
+            else:
+                state.update(record)
+        return state
+
+
+def resume(run_id, journal_dir=DEFAULT_JOURNAL_DIR, **kwargs):
+    """
+    Recreates a flow from its journal, ready for Flow.resume (or Flow.resume_async).
+
+    Parameters:
+    run_id (str): The ID of the run to resume.
+    kwargs: Additional flow options (e.g. client substitutes), see Flow.
+    """
+    journal = Journal(run_id, journal_dir)
+    state = journal.state()
+    if 'submitted' not in state['phases']:
+        raise ValueError(f"No checkpoint for run {run_id} in {journal.directory}")
+
+    module_name, class_name = state['flow_class'].split(':')
+    flow_class = importlib.import_module(module_name)
+    for name in class_name.split('.'):
+        flow_class = getattr(flow_class, name)
+    flow = flow_class(**state['init'], journal_dir=journal_dir, **kwargs)
+    flow.restore(state, journal)
+    logger.info(f"Resuming run {run_id} after checkpoints: {', '.join(sorted(state['phases']))}")
+    return flow
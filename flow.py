@@ -0,0 +1,831 @@
+"""
+This module defines the generic Flow engine, which runs any list of Gladier tools as a Globus flow,
+monitors the run, and passes data for Ocrate generation. The flow input is derived from the tools
+themselves: every input path a tool requires (its required_input and the '$.input' paths in its
+Parameters) is looked up in the flow configuration, and the input is validated once, listing every
+missing value. Tool defaults (flow_input, e.g. transfer_sync_level) fill in unconfigured values.
+
+Flow configuration (JSON or YAML):
+{
+    "tools": ["DS_FT_Transfer", "fastText", "my_package.tools:MyTool", ...],
+    "input": {"endpoints": {"datastore_uuid": "..."}, "fastText_paths": {...}, ...},
+    "run_label": "...",
+    "run_tags": [...]
+}
+Tools are resolved from the tool registry (see register_tool), the gladier_components package,
+or a 'module:Class' import path.
+"""
+import asyncio
+import importlib
+import json
+import sys
+import logging
+
+from typing import Dict
+
+from .orchestration_types import OrchestrationData, GlobusUser, ListView, DictView
+from .run_monitor import AsyncRunMonitor, BackoffPolicy, PollBudgetExceeded, call_async
+from .flow_builder import (build_flow_definition, build_sequential_definition, fuse_transfers as fuse_transfer_tools,
+                           resolve_parameters, tool_name, transfer_state, json_copy, tool_input_paths,
+                           FLOW_DEFINITIONS, FlowDefinitionCache)
+from .wed_parser import WEDParser, iter_run_log_pages, aiter_run_log_pages
+from .identity_cache import IdentityCache, IdentityResolver
+from .transfer_tracker import TransferTracker, AsyncTransferTracker
+from .snapshot import write_snapshot, DEFAULT_SNAPSHOT_PATH
+from .profiling import Profiler
+from .flow_registry import FlowRegistry, deploy
+from .checkpoint import Journal, DEFAULT_JOURNAL_DIR
+from .transfer_manifest import TransferManifest, deliveries, elide_transfers, transfer_items
+from .step_cache import StepCache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TOOL_REGISTRY: Dict[str, type] = {}     # Tool name -> Gladier tool class
+_CLIENT_CLASSES: Dict[tuple, type] = {}
+
+
+class FlowInputError(ValueError):
+    """ Raised when the flow configuration does not provide every input the tools require. """
+
+
+class StepTimeoutError(PollBudgetExceeded):
+    """ Raised when an orchestration step (submit, monitor_run, ...) exceeds its timeout. """
+
+
+def run_sync(coroutine):
+    """
+    Runs a coroutine of the async Flow API to completion, for the synchronous API.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    coroutine.close()
+    raise RuntimeError("The synchronous Flow API cannot be used inside an event loop, await the *_async methods instead")
+
+
+def register_tool(tool, name=None):
+    """
+    Registers a Gladier tool under its class name (or name), so configurations can refer to it.
+    Can be used as a class decorator.
+    """
+    TOOL_REGISTRY[name or tool.__name__] = tool
+    return tool
+
+
+def resolve_tool(name):
+    """
+    Resolves a tool name from the registry, a 'module:Class' path, or the gladier_components
+    package (where each tool module is named after its class).
+    """
+    if not isinstance(name, str):
+        return name
+    if name in TOOL_REGISTRY:
+        return TOOL_REGISTRY[name]
+    if ':' in name:
+        module_name, attribute = name.split(':', 1)
+        tool = getattr(importlib.import_module(module_name), attribute)
+    else:
+        try:
+            module = importlib.import_module(f".gladier_components.{name}", __package__)
+        except ImportError as e:
+            raise ValueError(f"Unknown Gladier tool {name}") from e
+        tool = getattr(module, name)
+    return register_tool(tool, name)
+
+
+def load_flow_config(path) -> dict:
+    with open(path, "r") as f:
+        if str(path).endswith(('.yaml', '.yml')):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def build_flow_input(tools, config) -> dict:
+    """
+    Builds the flow input document for a list of tools from a configuration's 'input' section.
+
+    Raises:
+    FlowInputError: If any required input is missing, listing every missing path.
+    """
+    values = dict(config.get('input', {}))
+    flow_input, missing = {}, set()
+    for tool in tools:
+        for key, default in getattr(tool, 'flow_input', {}).items():
+            flow_input.setdefault(key, values.get(key, default))
+            values.setdefault(key, default)     # Tool defaults satisfy the tools' own Parameters
+    for tool in tools:
+        for path in tool_input_paths(tool):
+            keys = path[len('$.input.'):].split('.')
+            value, target = values, flow_input
+            for key in keys:
+                if not isinstance(value, dict) or key not in value:
+                    missing.add(path)
+                    break
+                value = value[key]
+            else:
+                for key in keys[:-1]:
+                    target = target.setdefault(key, {})
+                target[keys[-1]] = value
+    if missing:
+        raise FlowInputError("Flow configuration is missing required input: " + ", ".join(sorted(missing)))
+    return {'input': flow_input}
+
+
+def make_client(tools):
+    """
+    Returns a Gladier client class for a list of tools (one class per tool list).
+    """
+    key = FlowDefinitionCache.key(tools, 'client')
+    if key not in _CLIENT_CLASSES:
+        from gladier import GladierBaseClient, generate_flow_definition
+        _CLIENT_CLASSES[key] = generate_flow_definition(
+            type('FlowClient', (GladierBaseClient,), {'gladier_tools': list(tools)}))
+    return _CLIENT_CLASSES[key]
+
+
+class Flow:
+    """
+    Parameters:
+    tools (list): Gladier tools (classes or names, see resolve_tool). Defaults to the tools of
+    client_class or gladier_client.
+    config (dict): The flow configuration; its 'input' section supplies the flow input.
+    run_label (str) / run_tags (list): Label and tags for the run.
+    client_class (type): Optional Gladier client class (defaults to one generated for the tools).
+    gladier_client / flows_status_client / transfer_client / auth_client: Optional substitutes
+    for the Globus services (see mock_globus).
+    flow_registry (FlowRegistry): Registry of deployed flows (see flow_registry).
+    step_timeouts (dict): Optional timeouts (s) for the orchestration steps: 'submit',
+    'monitor_run', 'collect_WED', 'monitor_transfer' and 'identity_mapping'.
+    fuse_transfers (bool): Merge transfer tools with the same source and destination endpoints into
+    multi-item transfer actions (see flow_builder.fuse_transfers). WED_clean still holds one step
+    per original tool, recording the fused state and the tool's own transfer items.
+    transfer_manifest (TransferManifest): Optional manifest of delivered transfer files. Transfers
+    whose destinations are current are dropped before the flow is submitted, and recorded in
+    self.reused_inputs (see transfer_manifest).
+    step_cache (StepCache): Optional cache of LPAP step results (requires a transfer_manifest). LPAP
+    steps with a cached result for their inputs are dropped before the flow is submitted, and
+    recorded in self.cached_steps (see step_cache).
+    journal_dir (Path): Where run checkpoints are journaled (None disables checkpointing). A run
+    whose orchestrating process dies can be continued with checkpoint.resume(run_id).resume().
+    profiler (Profiler): Records the run's timeline (see profiling); defaults to a new profiler per
+    flow, which the monitors, trackers and orchestration crate of the run share.
+
+    Every Globus interaction is implemented as a coroutine (the *_async methods), so one event
+    loop can supervise many runs (see supervise); the synchronous methods run the coroutines.
+    """
+
+    def __init__(self, tools=None, config=None, run_label=None, run_tags=None, client_class=None,
+                 status_source=None, poll_backoff: BackoffPolicy = None, max_polls=None, poll_timeout=None,
+                 parallel_branches=False, auth_client=None, identity_cache: IdentityCache = None,
+                 transfer_client=None, gladier_client=None, flows_status_client=None,
+                 flow_registry: FlowRegistry = None, step_timeouts: Dict[str, float] = None, debug=False,
+                 journal_dir=DEFAULT_JOURNAL_DIR, fuse_transfers=False,
+                 transfer_manifest: TransferManifest = None, step_cache: StepCache = None,
+                 profiler: Profiler = None):
+        if step_cache is not None and transfer_manifest is None:
+            raise ValueError("A step cache requires a transfer manifest, which proves the step inputs are unchanged")
+        self.config = config or {}
+        if gladier_client is not None:
+            self.client = gladier_client
+        else:
+            client_class = client_class or make_client([resolve_tool(tool) for tool in tools or self.config['tools']])
+            self.client = client_class()
+        tools = self.tools = list(self.client.gladier_tools)     # The original tools, for the OCrate
+        self.parallel_branches = parallel_branches
+        self.fused = {}                 # Fused transfer state name -> original tools
+        if fuse_transfers:
+            fused_tools = fuse_transfer_tools(tools)
+            self.fused = {tool_name(tool): tool.fused_tools for tool in fused_tools if hasattr(tool, 'fused_tools')}
+        self.define(fused_tools if self.fused else tools)
+        self.debug = debug              # Print the flow definition on run
+        self.run_label = run_label or self.config.get('run_label', 'Flow run')
+        self.run_tags = run_tags if run_tags is not None else self.config.get('run_tags', [])
+        self.LP_configuration = self.config.get('input', {}).get('LP_configuration', {})
+        self.flow_input = None          # Built and validated on first use
+        # Run monitor configuration (status_source defaults to the Gladier client)
+        self.status_source = status_source
+        self.poll_backoff = poll_backoff
+        self.max_polls = max_polls
+        self.poll_timeout = poll_timeout
+        # Identity resolution (auth_client defaults to one authorised through the Gladier login manager)
+        self.auth_client = auth_client
+        self.identity_cache = identity_cache if identity_cache is not None else IdentityCache()
+        # Sub-crate transfer tracking (transfer_client defaults to one authorised through the login manager)
+        self.transfer_client = transfer_client
+        self.flows_status_client = flows_status_client
+        # Deployed flows, so unchanged flows are not checked / redeployed on every run
+        self.flow_registry = flow_registry if flow_registry is not None else FlowRegistry()
+        self.step_timeouts = step_timeouts or {}
+        # Delivered transfer files, so transfers with current destinations are skipped
+        self.transfer_manifest = transfer_manifest
+        self.reused_inputs = []         # Transfers skipped on submission (see skip_current_steps)
+        # Cached LPAP step results, so steps are not re-run on unchanged inputs
+        self.step_cache = step_cache
+        self.cached_steps = []          # LPAP steps skipped on submission (see skip_current_steps)
+        self.tasks = set()              # Orchestration steps in progress (see cancel_async)
+        # Run log paging (see stream_WED): the next page's marker, the entries of it already read
+        self.WED_parser = None
+        self.WED_marker = None
+        self.WED_offset = 0
+        self.WED_complete = False
+        self.profiler = profiler if profiler is not None else Profiler()    # This run's timeline
+        # Checkpointing (the journal is opened once the run is submitted)
+        self.journal_dir = journal_dir
+        self.journal = None
+        self.restored = None            # Journal state, when resuming a run
+        self.init_arguments = {         # Recreates this flow on resume
+            'tools': [f"{tool.__module__}:{tool.__qualname__}" for tool in self.tools],
+            'config': self.config,
+            'run_label': self.run_label,
+            'run_tags': self.run_tags,
+            'parallel_branches': parallel_branches,
+            'fuse_transfers': fuse_transfers,
+        }
+        self.get_input()                # Fail on incomplete configuration before contacting Globus
+
+    @classmethod
+    def from_config(cls, path, **kwargs):
+        # Creates a flow from a configuration file (see the module docstring)
+        return cls(config=load_flow_config(path), **kwargs)
+
+    def define(self, tools):
+        """
+        Sets the flow definition for the tools the run executes. Tool lists other than the
+        client's own (fused or elided transfers) are built by flow_builder.
+        """
+        generated = list(tools) == list(self.client.gladier_tools) and not self.fused
+        self.client.gladier_tools = list(tools)
+        if self.parallel_branches:
+            # Run independent tool chains (e.g. the fastText and langDetect pipelines) concurrently
+            self.flow_definition, self.flow_checksum = FLOW_DEFINITIONS.get(
+                tools, 'parallel', lambda: build_flow_definition(tools))
+        elif generated:
+            self.flow_definition, self.flow_checksum = FLOW_DEFINITIONS.get(
+                tools, 'sequential', self.client.get_flow_definition)
+        else:
+            self.flow_definition, self.flow_checksum = FLOW_DEFINITIONS.get(
+                tools, 'sequential', lambda: build_sequential_definition(tools))
+        self.client.flow_definition = self.flow_definition
+
+    def skip_current_steps(self):
+        """
+        Drops the transfers whose destination files are current (see transfer_manifest), and the
+        LPAP steps with a cached result (see step_cache), from the flow before it is deployed. The
+        dropped steps are recorded in self.reused_inputs and self.cached_steps.
+        """
+        lookup = self.step_cache.lookup if self.step_cache is not None else None
+        with self.profiler.span('transfer.elide'):
+            tools, reused, cached = elide_transfers(self.client.gladier_tools, self.get_input(),
+                                                    self.get_transfer_client(), self.transfer_manifest, lookup)
+        if not reused and not cached:
+            return
+        self.reused_inputs = reused
+        self.cached_steps = cached
+        self.define(tools)
+
+    def record_transfers(self):
+        # Records the files delivered by the run's successful transfer steps in the manifest
+        if self.transfer_manifest is None:
+            return
+        for tool in self.tools:
+            step = self.WED_clean.get(tool_name(tool), {})
+            if transfer_state(tool) is None or step.get('status') != 'SUCCEEDED':
+                continue
+            for item in transfer_items(tool, self.get_input()):
+                self.transfer_manifest.record(self.get_transfer_client(), item, self.run_id)
+        self.transfer_manifest.save()
+
+    async def _record_transfers_async(self):
+        if self.transfer_manifest is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.record_transfers)
+
+    def record_steps(self, subcrate_paths):
+        """
+        Caches the results of the run's successful LPAP steps (see step_cache), given their
+        sub-crates by state name. Called once the sub-crates are in the orchestration crate.
+        """
+        if self.step_cache is None:
+            return
+        delivered = deliveries(self.tools, self.get_input(), self.transfer_manifest)
+        for tool in self.tools:
+            step = self.WED_clean.get(tool_name(tool), {})
+            if transfer_state(tool) is not None or step.get('status') != 'SUCCEEDED':
+                continue
+            if tool_name(tool) in subcrate_paths:
+                self.step_cache.record(tool, subcrate_paths[tool_name(tool)], delivered, self.run_id, step.get('action_id'))
+        self.step_cache.save()
+
+    def get_input(self):
+        # The flow input is derived from the tools' required input and validated once
+        if self.flow_input is None:
+            self.flow_input = build_flow_input(self.client.gladier_tools, self.config)
+        return self.flow_input
+
+    def required_scopes(self):
+        # Scopes needed for monitoring sub-crate transfers and identity mapping
+        from globus_sdk.scopes import TransferScopes, AuthScopes
+        return [TransferScopes.all, AuthScopes.view_identities]
+
+    def get_WEP(self):
+        # Copy of the cached flow definition, for the OCrate
+        return json_copy(self.flow_definition)
+
+    def checkpoint(self, phase, **data):
+        # Journals a completed phase of the run (see checkpoint.py)
+        if self.journal is not None:
+            self.journal.record(phase, **data)
+
+    def restore(self, state, journal):
+        """
+        Restores a submitted run from its journal state (see checkpoint.resume).
+        """
+        self.journal = journal
+        self.restored = state
+        self.run_id = state['run_id']
+        self.flow_id = state['flow_id']
+        self.run = {'action_id': self.run_id}
+        self.reused_inputs = state.get('reused_inputs', [])
+        self.cached_steps = state.get('cached_steps', [])
+        if self.reused_inputs or self.cached_steps:
+            # The run was submitted without the steps it skipped
+            skipped = {record['tool'] for record in self.reused_inputs + self.cached_steps}
+            self.define([tool for tool in self.client.gladier_tools if tool_name(tool) not in skipped])
+        self.WEP = self.get_WEP()
+        if state.get('flow_checksum') != self.flow_checksum:
+            logger.warning(f"The flow definition has changed since run {self.run_id} was submitted")
+        if 'run_complete' in state['phases']:
+            self.run_status = state['run_status']
+
+    async def _step(self, name, awaitable):
+        # Runs an orchestration step as a cancellable task, with its configured timeout
+        task = asyncio.ensure_future(awaitable)
+        self.tasks.add(task)
+        timeout = self.step_timeouts.get(name)
+        try:
+            return await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            raise StepTimeoutError(f"{name} did not complete within {timeout}s "
+                                   f"(run {getattr(self, 'run_id', None)})") from None
+        finally:
+            self.tasks.discard(task)
+
+    async def cancel_async(self, cancel_run=True):
+        """
+        Cancels the orchestration steps in progress and, with cancel_run, the Globus run itself.
+        """
+        for task in list(self.tasks):
+            task.cancel()
+        if cancel_run and getattr(self, 'run_id', None):
+            client = self.get_flows_status_client()
+            if hasattr(client, 'cancel_run') or hasattr(client, 'cancel_run_async'):
+                await call_async(client, 'cancel_run', self.run_id)
+                logger.info(f"Cancelled run {self.run_id}")
+
+    async def run_async(self):
+        # Submission (login, deployment, run_flow) is blocking SDK work, run off the event loop
+        loop = asyncio.get_running_loop()
+        return await self._step('submit', loop.run_in_executor(None, self._submit))
+
+    def run(self):
+        return run_sync(self.run_async())
+
+    def _submit(self):
+        # Print flow definition
+        if self.debug:
+            print(json.dumps(self.flow_definition, indent=4))
+        """ 
+        Make sure the client has access to the Transfer and view_identities APIs for 
+        monitoring sub-crate transfer and identity mapping. 
+        """
+        self.client.login_manager.add_requirements(self.required_scopes())
+        if self.transfer_manifest is not None:
+            self.skip_current_steps()
+        # Add WEP for OCrate
+        self.WEP = self.get_WEP()
+        with self.profiler.span('flow.deploy', checksum=self.flow_checksum):
+            self.deployment = deploy(self.client, self.flow_checksum, self.flow_registry, self.run_label)
+        with self.profiler.span('flow.submit', label=self.run_label):
+            self.run = self.client.run_flow(
+                flow_input=self.get_input(),
+                label=self.run_label,
+                tags=self.run_tags
+                )
+        self.run_id = self.run['action_id']
+        self.flow_id = self.deployment['flow_id']
+        if self.journal_dir is not None:
+            self.journal = Journal(self.run_id, self.journal_dir)
+            self.checkpoint('submitted', flow_class=f"{type(self).__module__}:{type(self).__qualname__}",
+                            init=self.init_arguments, flow_id=self.flow_id, run_id=self.run_id,
+                            flow_checksum=self.flow_checksum, reused_inputs=self.reused_inputs, cached_steps=self.cached_steps)
+        return self.run
+    
+    def clean_WED(self):
+        # Clean up the WED for ease of use (start/complete entries are matched by state name, so
+        # the log does not need to be in order)
+        return dict(WEDParser().parse(self.WED))
+
+    def stream_WED(self, flows_client, on_step=None, complete=True):
+        """
+        Pages the run log entries not yet read, building self.WED and self.WED_clean as each page
+        arrives. Paging continues from where the previous call stopped, so the log can be read
+        while the run is in progress (see monitor_run_async).
+
+        Parameters:
+        flows_client (FlowsClient): A client with access to the run logs.
+        on_step (Callable): Optional callback, called with (state_name, record) as each step's
+        ActionCompleted entry is parsed, so downstream work can start before paging finishes.
+        complete (bool): Whether the run has finished, so the log is complete once paged.
+        """
+        if self._WED_pending(on_step):
+            for entries, marker in iter_run_log_pages(flows_client, self.run_id, self.WED_marker, self.profiler):
+                self._add_WED_page(entries, marker, on_step)
+            if complete:
+                self._complete_WED()
+        return self.WED_clean
+
+    async def stream_WED_async(self, flows_client, on_step=None, complete=True):
+        if self._WED_pending(on_step):
+            async for entries, marker in aiter_run_log_pages(flows_client, self.run_id, self.WED_marker, self.profiler):
+                self._add_WED_page(entries, marker, on_step)
+            if complete:
+                self._complete_WED()
+        return self.WED_clean
+
+    def _WED_pending(self, on_step):
+        # Starts paging on first use (replaying the journaled pages when resuming); False once the
+        # log is complete
+        if self.WED_parser is None:
+            self.WED = []
+            self.WED_clean = {}
+            self.WED_parser = WEDParser()
+            if self.restored:
+                for entry in self.restored['WED']:
+                    self._add_WED_entry(entry, on_step)
+                self.WED_marker = self.restored['marker']
+                self.WED_offset = self.restored['offset']
+                self.WED_complete = self.restored['WED_complete']
+        return not self.WED_complete
+
+    def _add_WED_page(self, entries, marker, on_step):
+        # Pages after the first start at offset 0; the last page so far is read again (from its own
+        # marker) on the next call, as entries logged later are added to it
+        new = entries[self.WED_offset:]
+        if marker is None:
+            self.WED_offset += len(new)
+        else:
+            self.WED_marker, self.WED_offset = marker, 0
+        for entry in new:
+            self._add_WED_entry(entry, on_step)
+        if new or marker is not None:
+            self.checkpoint('WED_page', entries=new, marker=self.WED_marker, offset=self.WED_offset, complete=False)
+
+    def _complete_WED(self):
+        self.WED_complete = True
+        self.checkpoint('WED_page', entries=[], marker=self.WED_marker, offset=self.WED_offset, complete=True)
+
+    def _add_WED_entry(self, entry, on_step):
+        self.WED.append(entry)
+        for state_name, record in self.WED_parser.feed(entry):
+            for step_name, step in self.expand_step(state_name, record):
+                self.WED_clean[step_name] = step
+                if on_step:
+                    on_step(step_name, step)
+
+    def expand_step(self, state_name, record):
+        """
+        Yields one (state_name, record) per original tool of a step: a fused transfer state is
+        split into a record per merged tool, with the fused state name and the tool's own
+        (resolved) transfer items.
+        """
+        if state_name not in self.fused:
+            yield state_name, record
+            return
+        for tool in self.fused[state_name]:
+            items = transfer_state(tool)['Parameters']['transfer_items']
+            yield tool_name(tool), dict(record, state_name=tool_name(tool), fused_state=state_name,
+                                        transfer_items=resolve_parameters(items, self.get_input()))
+    
+    def transfers_complete(self, client, action_labels_dir):
+        """
+        Returns false if a transfer does not exist yet, or is not complete. Raises
+        TransferFailedError if a transfer has failed.
+        """
+        # Ensure self.WED_clean is initialized
+        if not hasattr(self, 'WED_clean'):
+            raise AttributeError("The attribute 'WED_clean' is not initialized.")
+        
+        # Grab action labels 
+        action_labels = {action_label: action for action, action_label in action_labels_dir.items()}
+        tracker = TransferTracker(client, action_labels, profiler=self.profiler)
+        tracker.poll()
+        return tracker.done
+
+    def get_transfer_client(self):
+        # Grab the transfer auth token from the login_manager, and use that token
+        # to init an API client.
+        if self.transfer_client is None:
+            from globus_sdk import TransferClient
+            from globus_sdk.scopes import TransferScopes
+            transfer_authorizor = self.client.login_manager.get_authorizers()[TransferScopes.all]
+            self.transfer_client = TransferClient(authorizer=transfer_authorizor)
+        return self.transfer_client
+        
+    def monitor_transfer(self, on_subcrate=None):
+        """
+        1. Monitor globus transfer execution
+        2. Confirm / wait for transfer to complete
+
+        Parameters:
+        on_subcrate (Callable): Optional callback, called with (state_name, action_id, task) as
+        each LPAP sub-crate lands on the orchestration server.
+        """
+        return run_sync(self.monitor_transfer_async(on_subcrate))
+
+    def transfer_labels(self):
+        # Filter self.clean_WED for all actions that don't include 'Transfer' in the name
+        # Assumes all actions that are not transfers are LPAPs # TODO LPAP type field in WED?
+        filtered_actions = {key: value for key, value in self.WED_clean.items() if 'Transfer' not in key}
+        return {value['action_id']: key for key, value in filtered_actions.items()}
+
+    async def monitor_transfer_async(self, on_subcrate=None):
+        action_labels = self.transfer_labels()
+
+        def on_complete(state_name, action_id, task):
+            self.checkpoint('transfer', label=action_id, task=task)
+            if on_subcrate:
+                on_subcrate(state_name, action_id, task)
+
+        self.transfer_tracker = AsyncTransferTracker(self.get_transfer_client(), action_labels,
+                                                     on_complete=on_complete, backoff=self.poll_backoff,
+                                                     profiler=self.profiler)
+        # Transfers journaled before a restart are not polled again
+        for label, task in (self.restored['tasks'] if self.restored else {}).items():
+            if label in action_labels:
+                self.transfer_tracker.tasks[label] = task
+                if on_subcrate:
+                    on_subcrate(action_labels[label], label, task)
+        with self.profiler.span('transfer.monitor', transfers=len(action_labels)):
+            return await self._step('monitor_transfer', self.transfer_tracker.wait())
+
+
+    def monitor_run(self, on_step=None):
+        """
+        1. Monitor globus flow execution
+        2. Confirm / wait for sub-crate transfers to complete
+
+        Polling backs off while the run status is unchanged; self.poll_stats records the number
+        of status requests and their latencies.
+        """
+        return run_sync(self.monitor_run_async(on_step))
+
+    async def monitor_run_async(self, on_step=None):
+        if hasattr(self, 'run_id') and hasattr(self, 'run_status'):
+            # Completed before a restart (see restore)
+            await self.collect_WED_async(on_step=on_step)
+            await self._record_transfers_async()
+            return True
+        if hasattr(self, 'run_id'):
+            async def on_progress(status):
+                # Page the run log entries of the states started / completed since the last poll
+                with self.profiler.span('wed.collect', run_id=self.run_id, partial=True):
+                    await self.stream_WED_async(self.get_flows_status_client(), on_step=on_step, complete=False)
+
+            self.run_monitor = AsyncRunMonitor(
+                self.status_source or self.client,
+                backoff=self.poll_backoff,
+                max_polls=self.max_polls,
+                timeout=self.poll_timeout,
+                profiler=self.profiler,
+                on_progress=on_progress,
+                on_poll=lambda status, elapsed: logger.debug(
+                    f"Flow {self.flow_id} | Run {self.run_id} | Time Elapsed: {elapsed:.2f}s")
+                )
+            with self.profiler.span('flow.monitor', run_id=self.run_id):
+                self.run_status = await self._step('monitor_run', self.run_monitor.wait(self.run_id))
+            self.poll_stats = self.run_monitor.stats
+            self.checkpoint('run_complete', run_status=self.run_status)
+            logger.info(f"Run {self.run_id} complete | Waiting on subcrate transfers to complete")
+
+            await self.collect_WED_async(on_step=on_step)
+            await self._record_transfers_async()
+            return True
+        else:
+            raise ValueError('Run has not been started yet')
+
+    def get_flows_status_client(self):
+        # Set up clients for interfacing with Globus API's
+        if self.flows_status_client is None:
+            from globus_sdk import FlowsClient
+            from globus_sdk.scopes import FlowsScopes
+            flow_status_authorizor = self.client.login_manager.get_authorizers()[FlowsScopes.run_status]
+            self.flows_status_client = FlowsClient(authorizer=flow_status_authorizor)
+        return self.flows_status_client
+
+    def collect_WED(self, on_step=None):
+        # Raw WED description -> list of start/complete states with associated action details,
+        # transformed into the cleaned WED definition (for ease of use) as it is paged
+        return run_sync(self.collect_WED_async(on_step))
+
+    async def collect_WED_async(self, on_step=None):
+        with self.profiler.span('wed.collect', run_id=self.run_id):
+            return await self._step('collect_WED', self.stream_WED_async(self.get_flows_status_client(), on_step=on_step))
+
+    def get_components(self):
+        # Get components for inlcusion in the OCrate (the original tools, when transfers are fused)
+        return (self.tools)
+    
+    def get_WED(self):
+        # Get the WED for the OCrate
+        return self.WED
+    
+    def get_identities(self):
+        """
+        Extracts unique Globus IDs from the specified JSON file.
+
+        Parameters:
+        self.WED_clean (dict): The cleaned WED definition.
+
+        Returns:
+        set: A set of Globus IDs.
+        """
+        # Ensure self.WED_clean is initialized
+        if not hasattr(self, 'WED_clean'):
+            raise AttributeError("The attribute 'WED_clean' is not initialized.")
+        unique_ids = set()
+        # We dont need to classify the category of identity (creator, manager, monitor)
+        # This can be done during the OCrate generation
+        for entry in self.WED_clean.values():
+            if 'creator_id' in entry:
+                unique_ids.add(entry['creator_id'].replace('urn:globus:auth:identity:', ''))
+            if 'manage_by' in entry:
+                for manager in entry['manage_by']:
+                    unique_ids.add(manager.replace('urn:globus:auth:identity:', ''))
+            if 'monitor_by' in entry:
+                for monitor in entry['monitor_by']:
+                    unique_ids.add(monitor.replace('urn:globus:auth:identity:', ''))
+        return unique_ids
+    
+    def identity_mapping(self):
+        """
+        Maps extracted Globus IDs to their associated identities using Globus Auth API.
+        IDs are served from the shared identity cache where possible, and the remainder are
+        requested in batched multi-ID calls. The mapping is computed once per set of IDs.
+
+        Parameters:
+        unique_ids (set): A set of Globus IDs.
+
+        Returns:
+        self.identity_map Dict[str:GlobusUser]: A dictionary mapping Globus IDs to their GlobusUser objects.
+        """
+        if self.identity_map_current():
+            return self.identity_map
+        return run_sync(self.identity_mapping_async())
+
+    def identity_map_current(self):
+        # The mapping is reused while the set of IDs in the WED is unchanged
+        return getattr(self, 'identity_map', None) is not None and self.identity_map.keys() == self.get_identities()
+
+    async def identity_mapping_async(self):
+        unique_ids = self.get_identities()      # Get unique Globus IDs
+        if self.identity_map_current():
+            return self.identity_map
+
+        # Set up clients for interfacing with Globus Auth API
+        if self.auth_client is None:
+            from globus_sdk import AuthClient
+            from globus_sdk.scopes import AuthScopes
+            auth_authorizor = self.client.login_manager.get_authorizers()[AuthScopes.view_identities]
+            self.auth_client = AuthClient(authorizer=auth_authorizor)
+
+        self.identity_resolver = IdentityResolver(self.auth_client, self.identity_cache)
+        with self.profiler.span('identity.mapping', identities=len(unique_ids)):
+            identities = await self._step('identity_mapping', self.identity_resolver.resolve_async(unique_ids))
+        self.identity_map = {g_id: GlobusUser(**identity) for g_id, identity in identities.items()}
+        self.checkpoint('identities', ids=sorted(unique_ids))
+
+        return self.identity_map
+    
+    def serrialize_data(self, path=DEFAULT_SNAPSHOT_PATH, encoding=None):
+        """
+        A function for saving the data used to generate the OCrate to file for testing purposes.
+
+        Parameters:
+        self.OrchestrationData (OrchestrationData): An object containing the data for the OCrate.
+        path (str): The output file.
+        encoding (str): The snapshot encoding ('msgpack' or 'jsonl', see snapshot.py), or 'json'
+        for the legacy indented orchestration_data.json format.
+        """
+
+        # Check that self.OrchestrationData is initialized
+        logger.info("Writing orchestration data to file")
+        if encoding == 'json':
+            with open(path, "w") as f:
+                f.write(json.dumps(self.get_data().to_dict(), indent=4))
+        else:
+            write_snapshot(self.get_data(), path, encoding=encoding)
+        
+
+    def get_data(self, partial=False) -> OrchestrationData:
+        """
+        Collate and return data for OCrate generation. With partial=True, the data can be
+        collated as soon as the run has started (for incremental crate builds): WED and
+        WED_clean are left empty and identities are not mapped.
+
+        Parameters:
+        input: The input definition for the Gladier flow.
+        WEP: The WEP definition for the Gladier flow.
+        WED: The WED definition for the Gladier flow.
+        WED_clean: The cleaned WED definition for the Gladier flow.
+        components: The Gladier components used in the Gladier flow.
+        flow_id: The ID of the Gladier flow.
+        run_id: The ID of the Gladier run.
+        article_name: The name of the LivePublication article.
+        identity_map: A dictionary mapping Globus IDs to their GlobusUser objects.
+
+        Returns:
+        OrchestrationData: An object containing the data for the OCrate.
+        """
+
+        attributes_to_check = [
+            'client', 'flow_id', 'run_id', 'LP_configuration', 'WEP'
+        ]
+        if not partial:
+            attributes_to_check += ['WED', 'WED_clean']
+
+        for attr in attributes_to_check:
+            if not hasattr(self, attr):
+                raise AttributeError(f"The attribute '{attr}' is not initialized.")
+
+        data = {
+            "input": self.get_input(),
+            "WEP": self.WEP,
+            # Read-only views, so the run log is shared with the OCrate rather than copied
+            "WED": [] if partial else ListView(self.WED),
+            "WED_clean": {} if partial else DictView(self.WED_clean),
+            "components": {
+                component.__name__: Path(sys.modules[component.__module__].__file__) for component in self.tools
+            },
+            "flow_id": self.flow_id,
+            "run_id": self.run_id,
+            "article_name": self.LP_configuration['article_name'],
+            # Flow.identity_mapping, since subclasses may expose the coroutine API under its name
+            "identity_map": {} if partial else Flow.identity_mapping(self),
+            "reused_inputs": self.reused_inputs,
+            "cached_steps": self.cached_steps
+        }
+        
+        return OrchestrationData(**data)
+
+    async def get_data_async(self, partial=False) -> OrchestrationData:
+        # Maps identities without blocking the event loop, then collates the data
+        if not partial:
+            await self.identity_mapping_async()
+        return Flow.get_data(self, partial)
+
+    async def orchestrate_async(self, on_step=None, on_subcrate=None) -> OrchestrationData:
+        """
+        Runs the flow end to end: submit, monitor the run, collect the WED, wait for the LPAP
+        sub-crates, and collate the data for OCrate generation.
+        """
+        await self.run_async()
+        await self.monitor_run_async(on_step=on_step)
+        await self.monitor_transfer_async(on_subcrate=on_subcrate)
+        return await self.get_data_async()
+
+    async def resume_async(self, on_step=None, on_subcrate=None) -> OrchestrationData:
+        """
+        Continues a restored run (see checkpoint.resume) from its last checkpoint: the run is
+        monitored if it had not completed, journaled run log pages are replayed and paging
+        continues from the saved marker, and only the outstanding sub-crate transfers are polled.
+        """
+        if self.restored is None:
+            raise ValueError('No checkpoint to resume from, use checkpoint.resume(run_id)')
+        await self.monitor_run_async(on_step=on_step)
+        await self.monitor_transfer_async(on_subcrate=on_subcrate)
+        return await self.get_data_async()
+
+    def resume(self, on_step=None, on_subcrate=None) -> OrchestrationData:
+        return run_sync(Flow.resume_async(self, on_step, on_subcrate))
+
+
+async def supervise(flows, max_concurrent=None):
+    """
+    Orchestrates many flows from one event loop, returning each flow's OrchestrationData (or the
+    exception it failed with), in order.
+
+    Parameters:
+    flows (list): Flow objects.
+    max_concurrent (int): Optional limit on the number of flows orchestrated at once.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+    async def orchestrate(flow):
+        if semaphore is None:
+            return await flow.orchestrate_async()
+        async with semaphore:
+            return await flow.orchestrate_async()
+
+    return await asyncio.gather(*(orchestrate(flow) for flow in flows), return_exceptions=True)
@@ -0,0 +1,401 @@
+"""
+This module builds Globus flow definitions from a list of Gladier tools. Rather than chaining every
+tool into one sequential flow, the builder works out which tools depend on each other from the
+JSONPaths in their Parameters/required_input, and runs independent tool chains side by side in a
+Globus Parallel state.
+
+A tool depends on an earlier tool when it reads a path the earlier tool writes (or writes a path
+the earlier tool reads or writes). Transfer tools write their destination_path(s); LPAP tools
+declare the paths they write with an optional produced_output attribute, in the same format as
+required_input.
+
+Transfer tools moving data between the same source and destination endpoints can also be fused into
+a single multi-item transfer action (see fuse_transfers), saving an action submission and its
+polling per merged tool. Fused tools list their original tools in fused_tools.
+"""
+import hashlib
+import json
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+TRANSFER_ACTION_URL = "https://actions.automate.globus.org/transfer/transfer"
+
+_FUSED_TOOLS: Dict[tuple, type] = {}
+
+
+def _iter_jsonpaths(parameters):
+    # Yields (key, JSONPath) pairs for every '.$' parameter, including those nested in transfer_items
+    if isinstance(parameters, dict):
+        for key, value in parameters.items():
+            if key.endswith('.$') and isinstance(value, str):
+                yield key[:-2], value
+            else:
+                yield from _iter_jsonpaths(value)
+    elif isinstance(parameters, list):
+        for item in parameters:
+            yield from _iter_jsonpaths(item)
+
+
+def _input_paths(spec):
+    # Converts a required_input style {group: {key, ...}} mapping into '$.input.group.key' paths
+    if isinstance(spec, dict):
+        return {f"$.input.{group}.{key}" for group, keys in spec.items() for key in keys}
+    return {f"$.input.{key}" for key in spec or []}
+
+
+def tool_states(tool) -> Dict[str, dict]:
+    return tool.flow_definition['States']
+
+
+def tool_name(tool) -> str:
+    return tool.flow_definition['StartAt']
+
+
+def tool_io(tool):
+    """
+    Returns the sets of input JSONPaths a tool reads and writes.
+    """
+    reads, writes = set(), set()
+    for state in tool_states(tool).values():
+        for key, path in _iter_jsonpaths(state.get('Parameters', {})):
+            (writes if key == 'destination_path' else reads).add(path)
+    writes |= _input_paths(getattr(tool, 'produced_output', {}))
+    reads |= _input_paths(getattr(tool, 'required_input', {}))
+    return reads - writes, writes
+
+
+def tool_input_paths(tool) -> set:
+    """
+    Returns the '$.input...' JSONPaths a tool needs in the flow input: its required_input plus
+    every input path referenced by its Parameters.
+    """
+    paths = _input_paths(getattr(tool, 'required_input', {}))
+    for state in tool_states(tool).values():
+        paths.update(path for _, path in _iter_jsonpaths(state.get('Parameters', {})) if path.startswith('$.input.'))
+    return paths
+
+
+def tool_dependencies(tools) -> Dict[str, set]:
+    """
+    Maps each tool name to the names of the earlier tools it must run after.
+    """
+    io = [(tool_name(tool), *tool_io(tool)) for tool in tools]
+    dependencies = {}
+    for i, (name, reads, writes) in enumerate(io):
+        dependencies[name] = {
+            earlier for earlier, earlier_reads, earlier_writes in io[:i]
+            if reads & earlier_writes or writes & (earlier_reads | earlier_writes)
+        }
+    return dependencies
+
+
+def plan_stages(tools) -> List[List[list]]:
+    """
+    Groups an ordered tool list into stages. Each stage is a list of branches (lists of tools)
+    which share no data and can run concurrently; stages run one after another. A tool which
+    joins several branches closes the current stage and runs as a stage of its own.
+    """
+    dependencies = tool_dependencies(tools)
+    stages, branches = [], []
+
+    def flush():
+        if branches:
+            stages.append([list(branch) for branch in branches])
+            branches.clear()
+
+    for tool in tools:
+        deps = dependencies[tool_name(tool)]
+        touched = [branch for branch in branches if deps & {tool_name(t) for t in branch}]
+        if len(touched) > 1:
+            flush()
+            stages.append([[tool]])
+        elif touched:
+            touched[0].append(tool)
+        else:
+            branches.append([tool])
+    flush()
+    return stages
+
+
+def transfer_state(tool) -> Optional[dict]:
+    # The state of a single state Globus Transfer tool (None for any other tool)
+    states = tool_states(tool)
+    if len(states) != 1:
+        return None
+    state = next(iter(states.values()))
+    if state.get('ActionUrl') != TRANSFER_ACTION_URL or 'transfer_items' not in state.get('Parameters', {}):
+        return None
+    return state
+
+
+def fused_tool(members) -> type:
+    """
+    Returns a tool running the transfer items of several transfer tools (with the same endpoints
+    and transfer options) as one transfer action. The tool is a subclass of the first member, and
+    is created once per list of members.
+    """
+    key = tuple(f"{tool.__module__}.{tool.__qualname__}" for tool in members)
+    if key not in _FUSED_TOOLS:
+        name = "__".join(tool_name(tool) for tool in members)
+        states = [transfer_state(tool) for tool in members]
+        state = json_copy(states[0])
+        state['Comment'] = 'Fused transfer: ' + ', '.join(tool_name(tool) for tool in members)
+        state['WaitTime'] = sum(s.get('WaitTime', 0) for s in states) or states[0].get('WaitTime')
+        state['Parameters']['transfer_items'] = [json_copy(item) for s in states for item in s['Parameters']['transfer_items']]
+        state['ResultPath'] = f"$.{name}_result"
+
+        required_input, flow_input = {}, {}
+        for tool in members:
+            for group, keys in getattr(tool, 'required_input', {}).items():
+                required_input.setdefault(group, set()).update(keys)
+            flow_input.update(getattr(tool, 'flow_input', {}))
+
+        _FUSED_TOOLS[key] = type(name, (members[0],), {
+            'flow_definition': {'Comment': state['Comment'], 'StartAt': name, 'States': {name: state}},
+            'required_input': required_input,
+            'flow_input': flow_input,
+            'fused_tools': list(members),
+        })
+    return _FUSED_TOOLS[key]
+
+
+def fuse_transfers(tools) -> list:
+    """
+    Merges transfer tools which share their source and destination endpoints (and transfer options)
+    into multi-item transfer tools, each placed at its first member's position. A transfer is only
+    merged into an earlier one when every tool it depends on runs before that one, so the data
+    dependencies of the tool list are preserved. Tools which cannot be fused are left as they are.
+    """
+    dependencies = tool_dependencies(tools)
+    names = [tool_name(tool) for tool in tools]
+    groups = []     # {'index', 'key', 'members'}, in order of the first member
+    for index, tool in enumerate(tools):
+        state = transfer_state(tool)
+        if state is None:
+            continue
+        options = {key: value for key, value in state['Parameters'].items() if key != 'transfer_items'}
+        key = json.dumps(options, sort_keys=True)
+        group = next((group for group in groups if group['key'] == key
+                      and dependencies[names[index]] <= set(names[:group['index']])), None)
+        if group is None:
+            groups.append({'index': index, 'key': key, 'members': [tool]})
+        else:
+            group['members'].append(tool)
+
+    fused = {group['index']: group['members'] for group in groups if len(group['members']) > 1}
+    merged = {tool_name(member) for members in fused.values() for member in members}
+    result = []
+    for index, tool in enumerate(tools):
+        if index in fused:
+            result.append(fused_tool(fused[index]))
+        elif names[index] not in merged:
+            result.append(tool)
+    return result
+
+
+def resolve_parameters(parameters, document):
+    """
+    Resolves the '.$' JSONPath parameters (of the form '$.a.b') against a document, e.g. the flow
+    input. Paths which cannot be resolved are left as they are.
+    """
+    if isinstance(parameters, list):
+        return [resolve_parameters(item, document) for item in parameters]
+    if not isinstance(parameters, dict):
+        return parameters
+    resolved = {}
+    for key, value in parameters.items():
+        if key.endswith('.$') and isinstance(value, str) and value.startswith('$.'):
+            target = document
+            for part in value[2:].split('.'):
+                if not isinstance(target, dict) or part not in target:
+                    break
+                target = target[part]
+            else:
+                resolved[key[:-2]] = target
+                continue
+        resolved[key] = resolve_parameters(value, document)
+    return resolved
+
+
+def _chain(tools, next_state=None) -> dict:
+    # Chains tool states sequentially, ending at next_state (or End) after the last tool
+    states = {}
+    names = []
+    for tool in tools:
+        for name, state in tool_states(tool).items():
+            states[name] = json_copy(state)
+            names.append(name)
+    for name, following in zip(names, names[1:] + [next_state]):
+        states[name].pop('End', None)
+        states[name].pop('Next', None)
+        if following:
+            states[name]['Next'] = following
+        else:
+            states[name]['End'] = True
+    return {'StartAt': names[0], 'States': states}
+
+
+def build_flow_definition(tools, comment=None) -> dict:
+    """
+    Builds a flow definition in which independent tool chains run in Parallel states.
+    """
+    stages = plan_stages(tools)
+    stage_names = []
+    for i, stage in enumerate(stages):
+        if len(stage) > 1:
+            stage_names.append(f"Parallel_{i + 1}")
+        else:
+            stage_names.append(tool_name(stage[0][0]))
+
+    states = {}
+    for i, stage in enumerate(stages):
+        next_state = stage_names[i + 1] if i + 1 < len(stages) else None
+        if len(stage) == 1:
+            states.update(_chain(stage[0], next_state)['States'])
+            continue
+        parallel = {
+            'Type': 'Parallel',
+            'Comment': 'Independent branches: ' + ', '.join(tool_name(branch[0]) for branch in stage),
+            'Branches': [_chain(branch) for branch in stage],
+            # Keep the flow input intact for later stages, branch outputs are stored alongside it
+            'ResultPath': f"$.{stage_names[i]}_results",
+        }
+        if next_state:
+            parallel['Next'] = next_state
+        else:
+            parallel['End'] = True
+        states[stage_names[i]] = parallel
+
+    return {
+        'Comment': comment or 'Flow with parallel branches: ' + ', '.join(tool_name(t) for t in tools),
+        'StartAt': stage_names[0],
+        'States': states,
+    }
+
+
+def build_sequential_definition(tools, comment=None) -> dict:
+    """
+    Builds a flow definition which runs the tools one after another.
+    """
+    return {
+        'Comment': comment or 'Flow: ' + ', '.join(tool_name(t) for t in tools),
+        **_chain(tools),
+    }
+
+
+def flow_topology(definition) -> List[List[List[str]]]:
+    """
+    Walks a flow definition (WEP) and returns its action states as stages of branches of state
+    names. A sequential flow gives one single-branch stage per state.
+    """
+    def branch_names(branch):
+        # Flattens a branch into its state names, in execution order
+        return [name for stage in flow_topology(branch) for b in stage for name in b]
+
+    stages = []
+    states = definition.get('States', {})
+    name = definition.get('StartAt')
+    while name in states:
+        state = states[name]
+        if state.get('Type') == 'Parallel':
+            stages.append([branch_names(branch) for branch in state.get('Branches', [])])
+        else:
+            stages.append([[name]])
+        if state.get('End'):
+            break
+        name = state.get('Next')
+    return stages
+
+
+def restrict_topology(topology, state_names) -> List[List[List[str]]]:
+    """
+    Restricts a topology to the given state names (e.g. the keys of WED_clean), dropping empty
+    branches and stages, and appending any remaining names as sequential stages.
+    """
+    restricted, seen = [], set()
+    for stage in topology:
+        branches = [[name for name in branch if name in state_names] for branch in stage]
+        branches = [branch for branch in branches if branch]
+        if branches:
+            restricted.append(branches)
+            seen.update(name for branch in branches for name in branch)
+    restricted.extend([[name]] for name in state_names if name not in seen)
+    return restricted
+
+
+def expand_fused(topology, records) -> List[List[List[str]]]:
+    """
+    Replaces fused transfer states in a topology with the steps of their original tools, which
+    are the records (e.g. WED_clean) naming the fused state in 'fused_state'.
+    """
+    members = {}
+    for name, record in records.items():
+        if isinstance(record, dict) and record.get('fused_state'):
+            members.setdefault(record['fused_state'], []).append(name)
+    if not members:
+        return topology
+    return [[[step for name in branch for step in members.get(name, [name])] for branch in stage]
+            for stage in topology]
+
+
+def topology_edges(topology):
+    """
+    Returns the (from, to) edges between state names implied by a topology.
+    """
+    edges = []
+    tails = []
+    for stage in topology:
+        for branch in stage:
+            edges.extend((tail, branch[0]) for tail in tails)
+            edges.extend(zip(branch, branch[1:]))
+        tails = [branch[-1] for branch in stage]
+    return edges
+
+
+def json_copy(value):
+    """
+    Structural copy of a JSON document (dicts, lists and immutable scalars), much cheaper than
+    copy.deepcopy or a serialization round-trip.
+    """
+    if isinstance(value, dict):
+        return {key: json_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_copy(item) for item in value]
+    return value
+
+
+def definition_checksum(definition) -> str:
+    # Same canonical form Gladier uses to detect flow changes
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+
+class FlowDefinitionCache:
+    """
+    Process-wide cache of generated flow definitions, keyed by the tool list (each tool's name and
+    the checksum of its own flow_definition) and a variant name (e.g. 'sequential' or 'parallel').
+    Each definition is generated and checksummed once; callers get a structural copy so the cached
+    definition cannot be mutated.
+    """
+
+    def __init__(self):
+        self.entries: Dict[Tuple, Tuple[dict, str]] = {}
+
+    @staticmethod
+    def key(tools, variant) -> Tuple:
+        # Tool classes created at runtime may share a qualified name but not a definition
+        return tuple((f"{tool.__module__}.{tool.__qualname__}",
+                      definition_checksum(getattr(tool, 'flow_definition', None))) for tool in tools) + (variant,)
+
+    def get(self, tools, variant, generate: Callable[[], dict]) -> Tuple[dict, str]:
+        """
+        Returns (definition, checksum), generating the definition on first use.
+        """
+        key = self.key(tools, variant)
+        if key not in self.entries:
+            definition = json_copy(generate())
+            self.entries[key] = (definition, definition_checksum(definition))
+        definition, checksum = self.entries[key]
+        return json_copy(definition), checksum
+
+
+FLOW_DEFINITIONS = FlowDefinitionCache()
@@ -0,0 +1,121 @@
+"""
+This module renders the orchestration flow diagram. The Graphviz layout only depends on the flow
+topology (its steps and edges), not on the step timings, so the diagram is laid out once per
+topology as an SVG template with fixed-width placeholders for the timings, and each build fills the
+placeholders in. Templates are cached in memory (and optionally on disk), rendering runs in a
+background thread, and the SVG is produced in memory with Digraph.pipe rather than via files in
+the working directory.
+"""
+import hashlib
+import json
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict
+from xml.sax.saxutils import escape
+
+from .flow_builder import topology_edges
+from .profiling import NULL_PROFILER
+
+if TYPE_CHECKING:
+    from graphviz import Digraph
+
+logger = logging.getLogger(__name__)
+
+# Wide enough for "999 minutes, 59 seconds", so filled-in labels fit the template layout
+PLACEHOLDER_WIDTH = 23
+
+
+def topology_key(topology) -> str:
+    return hashlib.sha256(json.dumps(topology).encode()).hexdigest()
+
+
+def placeholder(index) -> str:
+    return f"@T{index}@".ljust(PLACEHOLDER_WIDTH, '_')
+
+
+def execution_time_label(execution_time) -> str:
+    # Convert execution time to a human-readable format (minutes and seconds)
+    minutes, seconds = divmod(execution_time, 60)
+    return f"{int(minutes)} minutes, {int(seconds)} seconds"
+
+
+def build_template(topology) -> 'Digraph':
+    """
+    Builds the diagram for a topology, with a timing placeholder in each node's label.
+    """
+    from graphviz import Digraph    # Only needed when a layout is not cached
+
+    diagram = Digraph(comment='Orchestration Flow')
+    names = [name for stage in topology for branch in stage for name in branch]
+    for index, state_name in enumerate(names):
+        # Determine the color of the node based on the state_name
+        color = "green" if "Transfer" in state_name else "blue"
+        diagram.node(state_name, label=f"{state_name}\nExecution time: {placeholder(index)}",
+                     shape="box", color=color, style="filled")
+
+    # Add directed edges between the nodes to represent the flow from one step to the next,
+    # fanning out to / in from parallel branches
+    for tail, head in topology_edges(topology):
+        diagram.edge(tail, head)
+    return diagram
+
+
+class DiagramRenderer:
+    """
+    Renders flow diagrams from cached per-topology SVG templates.
+
+    Parameters:
+    cache_dir (Path): Optional directory for persisting templates across processes.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.templates: Dict[str, str] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flow-diagram")
+        self.renders = 0    # Graphviz layouts performed
+
+    def template(self, topology, profiler=NULL_PROFILER) -> str:
+        key = topology_key(topology)
+        if key in self.templates:
+            return self.templates[key]
+
+        cache_path = self.cache_dir / f"{key}.svg" if self.cache_dir else None
+        if cache_path and cache_path.exists():
+            svg = cache_path.read_text()
+        else:
+            with profiler.span('diagram.layout', key=key):
+                svg = build_template(topology).pipe(format='svg', encoding='utf-8')
+            self.renders += 1
+            if cache_path:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                cache_path.write_text(svg)
+        self.templates[key] = svg
+        return svg
+
+    def prepare(self, topology, profiler=NULL_PROFILER) -> Future:
+        """
+        Lays out the template for a topology in the background.
+        """
+        return self.executor.submit(self.template, topology, profiler)
+
+    def render(self, topology, WED_clean, profiler=NULL_PROFILER) -> str:
+        """
+        Returns the SVG diagram for a topology, filled in with the step timings from WED_clean.
+        Spans are recorded on profiler (that of the crate being built, as the renderer is shared).
+        """
+        with profiler.span('diagram.render'):
+            svg = self.template(topology, profiler)
+            names = [name for stage in topology for branch in stage for name in branch]
+            for index, state_name in enumerate(names):
+                label = execution_time_label(WED_clean[state_name]['total_execution_time'])
+                svg = svg.replace(placeholder(index), escape(label))
+        return svg
+
+    def render_async(self, topology, WED_clean, profiler=NULL_PROFILER) -> Future:
+        return self.executor.submit(self.render, topology, WED_clean, profiler)
+
+
+# Process-wide renderer, so templates are shared by every crate built in the process
+DIAGRAMS = DiagramRenderer()
@@ -0,0 +1,192 @@
+"""
+This module keeps an on-disk registry of deployed flows, keyed by the checksum of the generated
+flow definition. Gladier checks (and, if it has changed, redeploys) the flow on every run_flow; when
+the registry already holds the definition's checksum, the flow is run by its recorded ID and that
+check is skipped. Each definition (e.g. the parallel, fused or elided variants of a tool list) is
+deployed as a flow of its own, so running one variant never redeploys the flow of another. A
+warm-up command deploys flows and fetches tokens ahead of a batch, so the first run does not pay
+for either.
+
+Usage: python -m <package>.flow_registry warm-up flow_config.json [...]
+       python -m <package>.flow_registry list
+"""
+import json
+import os
+import threading
+import time
+import logging
+
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = Path.home() / ".orchestration_logic" / "flow_registry.json"
+
+
+class FlowRegistry:
+    """
+    A JSON file mapping flow definition checksums to {flow_id, flow_scope, title, deployed}.
+
+    Parameters:
+    path (Path): The registry file location (None for an in-memory only registry).
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, clock=time.time):
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable flow registry {self.path}: {e}")
+            return {}
+
+    def get(self, checksum) -> Optional[dict]:
+        """
+        Returns the entry of a definition, unless its flow has since been deployed with another
+        definition (registries written before each definition had a flow of its own).
+        """
+        entry = self.entries.get(checksum)
+        if entry is None or entry['flow_id'] is None:
+            return None
+        if any(other['flow_id'] == entry['flow_id'] and other['deployed'] > entry['deployed']
+               for other in self.entries.values()):
+            logger.info(f"Flow {entry['flow_id']} was redeployed with another definition")
+            return None
+        return entry
+
+    def put(self, checksum, flow_id, flow_scope=None, title=None):
+        if flow_id is None:
+            raise ValueError(f"No flow ID to register for definition {checksum[:12]}")
+        for other in [key for key, entry in self.entries.items() if entry['flow_id'] == flow_id]:
+            del self.entries[other]     # The flow now runs this definition
+        self.entries[checksum] = {'flow_id': flow_id, 'flow_scope': flow_scope, 'title': title,
+                                  'deployed': self.clock()}
+        self.save()
+
+    def forget(self, checksum):
+        if self.entries.pop(checksum, None) is not None:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)     # Atomic, so concurrent runs never see a partial file
+
+
+def keep_deployment(manager, reason):
+    """
+    A flows manager on_change callback which leaves the deployed flow as it is. Registered flows
+    are deployed from the definition with the registered checksum, so Gladier's check (which
+    compares with its own cached checksum) is not acted on.
+    """
+    logger.debug(f"Keeping registered flow {manager.get_flow_id()} ({reason})")
+
+
+def use_deployment(client, entry):
+    """
+    Points a Gladier client's flows manager at a registered deployment, and stops its per-run
+    check from redeploying the flow.
+    """
+    manager = getattr(client, 'flows_manager', None)
+    if manager is None:
+        return
+    manager.flow_id = entry['flow_id']
+    manager.on_change = keep_deployment     # Gladier calls on_change(manager, exception)
+
+
+def forget_stored_flow(manager):
+    """
+    Clears the flow_id and flow_checksum Gladier stored for the client's last registered flow, so
+    the next register_flow deploys a new flow instead of updating that one in place.
+    """
+    manager.flow_id = None
+    storage = getattr(manager, 'storage', None)
+    if storage is None:
+        return
+    for name in ('flow_id', 'flow_checksum'):
+        if storage.get_value(name) is not None:
+            storage.del_value(name)
+
+
+def deploy(client, checksum, registry: FlowRegistry, title=None) -> dict:
+    """
+    Makes sure the client's flow is deployed, returning its registry entry. Registered flows are
+    not checked again; other definitions are registered through Gladier as a new flow (rather than
+    updating the client's last flow in place, which may be another registered definition) and
+    recorded with the flow's scope.
+    """
+    entry = registry.get(checksum)
+    if entry is not None:
+        use_deployment(client, entry)
+        return entry
+
+    manager = getattr(client, 'flows_manager', client)
+    forget_stored_flow(manager)
+    manager.register_flow()
+    # Gladier keeps the registered ID in its storage, not in manager.flow_id
+    flow_id = manager.get_flow_id()
+    registry.put(checksum, flow_id, getattr(manager, 'flow_scope', None), title)
+    logger.info(f"Deployed flow {flow_id} ({checksum[:12]})")
+    entry = registry.get(checksum)
+    use_deployment(client, entry)
+    return entry
+
+
+def fetch_tokens(client, scopes):
+    """
+    Adds the scopes a run needs to the client's login manager and fetches their authorizers, so
+    logins and token refreshes happen before a batch starts.
+    """
+    client.login_manager.add_requirements(list(scopes))
+    return client.login_manager.get_authorizers()
+
+
+def warm_up(flows, registry: FlowRegistry = None) -> Dict[str, dict]:
+    """
+    Deploys each distinct flow definition and fetches the tokens its runs need.
+
+    Parameters:
+    flows (list): Flow objects (see flow.Flow).
+
+    Returns:
+    Dict[str, dict]: Registry entries keyed by flow definition checksum.
+    """
+    registry = registry if registry is not None else FlowRegistry()
+    entries = {}
+    for flow in flows:
+        if flow.flow_checksum in entries:
+            continue
+        entries[flow.flow_checksum] = deploy(flow.client, flow.flow_checksum, registry, flow.run_label)
+        fetch_tokens(flow.client, flow.required_scopes())
+    return entries
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from .flow import Flow
+
+    parser = argparse.ArgumentParser(description="Manage the local flow deployment registry")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm = subparsers.add_parser("warm-up", help="Deploy flows and fetch tokens ahead of a batch")
+    warm.add_argument("configs", nargs="+", help="Flow configuration files (JSON or YAML)")
+    subparsers.add_parser("list", help="List registered deployments")
+    args = parser.parse_args()
+
+    registry = FlowRegistry()
+    if args.command == "warm-up":
+        entries = warm_up([Flow.from_config(path, flow_registry=registry) for path in args.configs], registry)
+    else:
+        entries = registry.entries
+    print(json.dumps(entries, indent=4))
@@ -15,6 +15,7 @@ class DS_FT_Transfer(GladierBaseTool):
           "Parameters": {
             "source_endpoint_id.$": "$.input.endpoints.datastore_uuid", 
             "destination_endpoint_id.$": "$.input.endpoints.fasttext_uuid",
+            "sync_level.$": "$.input.transfer_sync_level",
             "transfer_items": [
               {
                 "source_path.$": "$.input.datastore_paths.data_path", 
@@ -20,7 +20,8 @@ class DS_LD_Transfer(GladierBaseTool):
                 }
               ], 
               'source_endpoint_id.$': '$.input.endpoints.datastore_uuid', 
-              'destination_endpoint_id.$': '$.input.endpoints.langdetect_uuid'
+              'destination_endpoint_id.$': '$.input.endpoints.langdetect_uuid',
+              'sync_level.$': '$.input.transfer_sync_level'
           },
           "ResultPath": "$.DS_LD_Transfer_result"
         }
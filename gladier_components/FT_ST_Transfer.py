@@ -15,6 +15,7 @@ class FT_ST_Transfer(GladierBaseTool):
           "Parameters": {
               'source_endpoint_id.$': '$.input.endpoints.fasttext_uuid', 
               'destination_endpoint_id.$': '$.input.endpoints.statistics_uuid',
+              'sync_level.$': '$.input.transfer_sync_level',
               'transfer_items': [
                   {
                   'recursive': False, 
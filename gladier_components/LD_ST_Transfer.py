@@ -15,6 +15,7 @@ class LD_ST_Transfer(GladierBaseTool):
           "Parameters": {
               'source_endpoint_id.$': '$.input.endpoints.langdetect_uuid', 
               'destination_endpoint_id.$': '$.input.endpoints.statistics_uuid',
+              'sync_level.$': '$.input.transfer_sync_level',
               'transfer_items': [
                   {
                   'recursive': False, 
@@ -30,7 +31,9 @@ class LD_ST_Transfer(GladierBaseTool):
 
     funcx_functions = [] 
 
-    flow_input = {}
+    flow_input = {
+        'transfer_sync_level': 'checksum'
+    }
 
     required_input = {
         "endpoints": {
@@ -26,6 +26,13 @@ class fastText(GladierBaseTool):
 
     flow_input = {}
 
+    # Paths written by the LPAP (used to detect dependencies between tools)
+    produced_output = {
+      "fastText_paths": {
+        "FT_output_path"
+      }
+    }
+
     required_input = {
       "LP_configuration": {
         "orchestration_node",
@@ -26,6 +26,13 @@ class langDetect(GladierBaseTool):
 
     flow_input = {}
 
+    # Paths written by the LPAP (used to detect dependencies between tools)
+    produced_output = {
+      "langdetect_paths": {
+        "LD_output_path"
+      }
+    }
+
     required_input = {
       "LP_configuration": {
         "orchestration_node",
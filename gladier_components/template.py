@@ -26,6 +26,8 @@ class TemplateClass(GladierBaseTool):
 
     flow_input = {}             # Input to the flow
 
+    produced_output = []        # Input paths written by the step (optional, used to detect dependencies)
+
     required_input = [          # Required input to the flow
       'param1',
       'param2',
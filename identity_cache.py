@@ -0,0 +1,201 @@
+"""
+This module resolves Globus identity IDs to identity records in batches, backed by a persistent
+on-disk cache shared across runs. Identities already in the cache (and younger than the TTL) are
+served without calling Globus Auth; the rest are requested in chunked multi-ID get_identities calls.
+IDs Auth returns no identity for are cached too (for a shorter TTL), so they are not requested again
+by every run. Concurrent runs merge their entries into the cache file under a file lock.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import logging
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable
+
+from .run_monitor import call_async
+
+try:
+    import fcntl
+except ImportError:     # Not available on Windows, where saves are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".orchestration_logic" / "identity_cache.json"
+
+NOT_FOUND = object()    # IdentityCache.get result for an ID Auth returned no identity for
+
+
+def merge_entry(entry, other) -> dict:
+    # The most recently stored record, with the latest access time of either copy
+    newest = entry if entry['stored'] >= other['stored'] else other
+    return {**newest, 'accessed': max(entry['accessed'], other['accessed'])}
+
+
+class IdentityCache:
+    """
+    A JSON file of identity records keyed by Globus ID, with a TTL and least-recently-used
+    eviction once max_entries is exceeded.
+
+    Parameters:
+    path (Path): The cache file location (None for an in-memory only cache).
+    ttl (float): Seconds an identity record stays valid.
+    max_entries (int): Maximum number of identities kept in the cache.
+    not_found_ttl (float): Seconds an ID Auth returned no identity for is not requested again.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=10000, clock=time.time,
+                 not_found_ttl=3600):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.not_found_ttl = not_found_ttl
+        self.hits = 0
+        self.misses = 0
+        self.modified = False   # Entries stored, or access times updated, since the last save
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable identity cache {self.path}: {e}")
+            return {}
+
+    def _expired(self, entry, now) -> bool:
+        ttl = self.ttl if entry['identity'] is not None else self.not_found_ttl
+        return now - entry['stored'] > ttl
+
+    def get(self, g_id):
+        """
+        Returns the cached identity record, NOT_FOUND for an ID Auth returned no identity for, or
+        None if the ID is not cached (or has expired).
+        """
+        entry = self.entries.get(g_id)
+        now = self.clock()
+        if entry is None or self._expired(entry, now):
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry['accessed'] = now
+        self.modified = True
+        return entry['identity'] if entry['identity'] is not None else NOT_FOUND
+
+    def put(self, g_id, identity):
+        """
+        Caches the identity record of an ID (None if Auth returned no identity for it).
+        """
+        now = self.clock()
+        self.entries[g_id] = {'identity': identity, 'stored': now, 'accessed': now}
+        self.modified = True
+
+    def evict(self):
+        # Drop expired entries, then the least recently used ones beyond max_entries
+        now = self.clock()
+        self.entries = {k: v for k, v in self.entries.items() if not self._expired(v, now)}
+        if len(self.entries) > self.max_entries:
+            keep = sorted(self.entries, key=lambda k: self.entries[k]['accessed'], reverse=True)[:self.max_entries]
+            self.entries = {k: self.entries[k] for k in keep}
+
+    @contextmanager
+    def _locked(self):
+        # Serializes saves across processes sharing the cache file
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_suffix('.lock'), "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def save(self):
+        """
+        Merges the entries saved by other runs since this cache was loaded (keeping the newest
+        record and access time of each ID), evicts, and writes the cache file.
+        """
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            for g_id, other in self._load().items():
+                entry = self.entries.get(g_id)
+                self.entries[g_id] = other if entry is None else merge_entry(entry, other)
+            self.evict()
+            tmp_path = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)     # Atomic, so readers never see a partial file
+        self.modified = False
+
+
+class IdentityResolver:
+    """
+    Resolves Globus IDs to identity records via a cache and batched Auth requests.
+
+    Parameters:
+    auth_client: A Globus AuthClient (or anything exposing get_identities(ids=[...])).
+    cache (IdentityCache): The identity cache (defaults to an in-memory cache).
+    batch_size (int): Maximum number of IDs per get_identities request.
+    """
+
+    def __init__(self, auth_client, cache: IdentityCache = None, batch_size=100):
+        self.auth_client = auth_client
+        self.cache = cache if cache is not None else IdentityCache(path=None)
+        self.batch_size = batch_size
+        self.requests = 0
+
+    def _lookup(self, ids):
+        # Splits ids into those served by the cache and the chunks to request from Auth
+        resolved, missing = {}, []
+        for g_id in sorted(set(ids)):
+            identity = self.cache.get(g_id)
+            if identity is None:
+                missing.append(g_id)
+            elif identity is not NOT_FOUND:
+                resolved[g_id] = identity
+        return resolved, [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+    def _store(self, resolved, chunks, responses):
+        for chunk, response in zip(chunks, responses):
+            for identity in response['identities']:
+                self.cache.put(identity['id'], identity)
+                resolved[identity['id']] = identity
+            for g_id in chunk:
+                if g_id not in resolved:
+                    self.cache.put(g_id, None)      # Not requested again until not_found_ttl
+        if self.cache.modified:
+            # Saved after all-hit lookups too, so LRU eviction sees the new access times
+            self.cache.save()
+        logger.info(f"Resolved {len(resolved)} identities | cache hits {self.cache.hits}, "
+                    f"misses {self.cache.misses}, Auth requests {self.requests}")
+        return resolved
+
+    def resolve(self, ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Returns a dictionary mapping each Globus ID to its identity record.
+        """
+        resolved, chunks = self._lookup(ids)
+        responses = []
+        for chunk in chunks:
+            self.requests += 1
+            responses.append(self.auth_client.get_identities(ids=chunk))
+        return self._store(resolved, chunks, responses)
+
+    async def resolve_async(self, ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Asyncio variant of resolve, requesting the uncached chunks concurrently.
+        """
+        resolved, chunks = self._lookup(ids)
+        self.requests += len(chunks)
+        responses = await asyncio.gather(*(call_async(self.auth_client, 'get_identities', ids=chunk) for chunk in chunks))
+        return self._store(resolved, chunks, responses)
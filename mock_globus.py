@@ -0,0 +1,514 @@
+"""
+Local stand-ins for the Globus services used by the orchestration logic, so monitoring and crate
+generation can be exercised without live Flows, Transfer or Auth endpoints.
+
+MockGlobus bundles a replaying Flows service, a Transfer client and an Auth client into a stack
+which can be injected into LidFlow (see MockGlobus.flow_kwargs). Runs replay a recorded (or
+synthetic) WED: log entries become visible as the run's clock passes their recorded times, LPAP
+sub-crate transfers start as each LPAP step completes, and every API call is counted.
+"""
+import itertools
+import json
+import os
+import posixpath
+import time
+
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from .flow_builder import _chain, definition_checksum
+
+
+class FakeFlowsService:
+    """
+    A fake Flows service which reports a run as ACTIVE for a fixed duration, then as finished.
+
+    Parameters:
+    run_duration (float): Seconds (by clock) the run stays ACTIVE after it is started.
+    final_status (str): The status reported once the run has finished.
+    latency (float): Artificial latency (s) added to each status request.
+    """
+
+    def __init__(self, run_duration=0.0, final_status='SUCCEEDED', latency=0.0, clock=time.monotonic):
+        self.run_duration = run_duration
+        self.final_status = final_status
+        self.latency = latency
+        self.clock = clock
+        self.runs = {}
+        self.status_requests = 0
+
+    def start_run(self, run_id, states=()):
+        """
+        Registers a run. states is an optional sequence of state names reported, in turn, as the
+        run's current state while it is active.
+        """
+        self.runs[run_id] = {'started': self.clock(), 'states': list(states)}
+        return {'action_id': run_id, 'run_id': run_id, 'status': 'ACTIVE'}
+
+    def get_status(self, run_id):
+        self.status_requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        run = self.runs[run_id]
+        elapsed = self.clock() - run['started']
+        if elapsed >= self.run_duration:
+            return {'action_id': run_id, 'status': self.final_status,
+                    'details': {'code': 'FlowSucceeded' if self.final_status == 'SUCCEEDED' else 'FlowFailed'}}
+
+        details = {'code': 'ActionStarted'}
+        if run['states']:
+            index = int(elapsed / self.run_duration * len(run['states']))
+            details['state_name'] = run['states'][index]
+        return {'action_id': run_id, 'status': 'ACTIVE', 'details': details}
+
+
+class StubAuthClient:
+    """
+    A stub Globus AuthClient serving identities from a local dictionary.
+
+    Parameters:
+    identities (dict): Identity records keyed by Globus ID. Unknown IDs get a generated record.
+    """
+
+    def __init__(self, identities=None):
+        self.identities = identities or {}
+        self.requests = 0
+        self.calls = Counter()
+
+    @staticmethod
+    def make_identity(g_id):
+        return {
+            'identity_provider': 'stub-provider',
+            'status': 'used',
+            'email': f"{g_id}@example.org",
+            'identity_type': 'login',
+            'organization': 'Stub Organization',
+            'name': f"User {g_id[:8]}",
+            'id': g_id,
+            'username': f"{g_id}@example.org",
+        }
+
+    def get_identities(self, ids=None, **kwargs):
+        self.requests += 1
+        self.calls['get_identities'] += 1
+        if isinstance(ids, str):
+            ids = ids.split(',')
+        return {'identities': [self.identities.get(g_id) or self.make_identity(g_id) for g_id in ids or []]}
+
+
+def synthetic_WED(n_steps, step_seconds=30.0, start=None, creator_id='urn:globus:auth:identity:00000000-0000-0000-0000-000000000000',
+                  state_names=None):
+    """
+    Generates a sequential run log (WED) with n_steps ActionStarted/ActionCompleted pairs, in the
+    shape returned by the Flows get_run_logs API. Steps are named Step_<i> unless state_names
+    is given.
+    """
+    from datetime import timedelta
+
+    start = start or datetime(2023, 1, 1, tzinfo=timezone.utc)
+    state_names = state_names or [f"Step_{i}" for i in range(n_steps)]
+    entries = []
+    for i in range(n_steps):
+        state_name = state_names[i]
+        started = start + timedelta(seconds=i * step_seconds)
+        completed = started + timedelta(seconds=step_seconds)
+        entries.append({
+            'code': 'ActionStarted',
+            'time': started.isoformat().replace('+00:00', 'Z'),
+            'details': {'state_name': state_name, 'state_type': 'Action'},
+        })
+        entries.append({
+            'code': 'ActionCompleted',
+            'time': completed.isoformat().replace('+00:00', 'Z'),
+            'details': {
+                'state_name': state_name,
+                'output': {f"{state_name}_result": {
+                    'action_id': f"action-{i}",
+                    'creator_id': creator_id,
+                    'manage_by': [creator_id],
+                    'monitor_by': [creator_id],
+                    'start_time': started.isoformat(),
+                    'completion_time': completed.isoformat(),
+                    'status': 'SUCCEEDED',
+                    'state_name': state_name,
+                    'details': {'files_transferred': i, 'description': 'x' * 200},
+                }},
+            },
+        })
+    return entries
+
+
+def synthetic_tools(n_steps, lpap_every=2):
+    """
+    Generates n_steps Gladier-style tool classes, one state each, for benchmarking flows of any
+    size. Every lpap_every-th tool is an LPAP (Step_<i>); the others are transfers
+    (Step_<i>_Transfer). The tools are attributed to this module, so they have a component file.
+    """
+    tools = []
+    for i in range(n_steps):
+        name = f"Step_{i}" if lpap_every and i % lpap_every == lpap_every - 1 else f"Step_{i}_Transfer"
+        state = {
+            'Type': 'Action',
+            'ActionUrl': 'https://actions.example.org/mock',
+            'Parameters': {'step': name},
+            'ResultPath': f"$.{name}_result",
+            'End': True,
+        }
+        tools.append(type(name, (), {
+            '__module__': __name__,
+            'flow_definition': {'StartAt': name, 'States': {name: state}},
+            'required_input': [],
+        }))
+    return tools
+
+
+def write_subcrate(crate_path, name, payload_bytes=1024):
+    """
+    Writes a minimal LPAP sub-crate (one data file and its ro-crate-metadata.json).
+    """
+    os.makedirs(crate_path, exist_ok=True)
+    with open(os.path.join(crate_path, "output.txt"), "wb") as f:
+        f.write(b'x' * payload_bytes)
+    metadata = {
+        '@context': 'https://w3id.org/ro/crate/1.1/context',
+        '@graph': [
+            {'@id': 'ro-crate-metadata.json', '@type': 'CreativeWork', 'about': {'@id': './'}},
+            {'@id': './', '@type': 'Dataset', 'name': name, 'hasPart': [{'@id': 'output.txt'}]},
+            {'@id': 'output.txt', '@type': 'File'},
+        ],
+    }
+    with open(os.path.join(crate_path, "ro-crate-metadata.json"), "w") as f:
+        json.dump(metadata, f)
+
+
+def _timestamp(entry):
+    return datetime.fromisoformat(entry['time'].replace('Z', '+00:00')).timestamp()
+
+
+class MockFlowsService:
+    """
+    A mock Flows service which replays a recorded WED for every run it starts.
+
+    Parameters:
+    WED (list): The run log to replay, in get_run_logs entry format.
+    time_scale (float): Multiplier applied to the recorded timings (0 completes runs immediately).
+    api_latency (float): Artificial latency (s) added to each API call.
+    page_size (int): Run log entries per get_run_logs page.
+    """
+
+    def __init__(self, WED, time_scale=1.0, api_latency=0.0, page_size=100,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.WED = list(WED)
+        self.time_scale = time_scale
+        self.api_latency = api_latency
+        self.page_size = page_size
+        self.clock = clock
+        self.sleep = sleep
+        self.runs = {}
+        self.deployments = {}   # Flow ID -> checksum of its deployed definition
+        self.calls = Counter()
+        self._ids = itertools.count()
+
+        # Entry offsets (s) from the start of a run, after scaling
+        origin = _timestamp(self.WED[0]) if self.WED else 0.0
+        self.offsets = [(_timestamp(entry) - origin) * time_scale for entry in self.WED]
+        self.duration = max(self.offsets, default=0.0)
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.api_latency:
+            self.sleep(self.api_latency)
+
+    def _elapsed(self, run_id):
+        return self.clock() - self.runs[run_id]['started']
+
+    def run_flow(self, flow_input=None, label=None, tags=None, **kwargs):
+        self._call('run_flow')
+        run_id = f"run-{next(self._ids)}"
+        self.runs[run_id] = {'started': self.clock(), 'input': flow_input, 'label': label, 'tags': tags,
+                             'flow_id': kwargs.get('flow_id'), 'definition': self.deployments.get(kwargs.get('flow_id'))}
+        return {'action_id': run_id, 'run_id': run_id, 'status': 'ACTIVE', 'label': label, 'tags': tags or []}
+
+    def get_status(self, run_id):
+        self._call('get_status')
+        elapsed = self._elapsed(run_id)
+        if elapsed >= self.duration:
+            return {'action_id': run_id, 'status': 'SUCCEEDED', 'details': {'code': 'FlowSucceeded'}}
+        visible = [entry for entry, offset in zip(self.WED, self.offsets) if offset <= elapsed]
+        details = {'code': visible[-1]['code'] if visible else 'FlowStarted'}
+        if visible:
+            details['state_name'] = visible[-1]['details'].get('state_name')
+        return {'action_id': run_id, 'status': 'ACTIVE', 'details': details}
+
+    def get_run_logs(self, run_id, marker=None, limit=None, **kwargs):
+        self._call('get_run_logs')
+        elapsed = self._elapsed(run_id)
+        visible = [entry for entry, offset in zip(self.WED, self.offsets) if offset <= elapsed]
+        start = int(marker) if marker else 0
+        end = start + (limit or self.page_size)
+        has_next_page = end < len(visible)
+        return {'entries': visible[start:end], 'has_next_page': has_next_page,
+                'marker': str(end) if has_next_page else None}
+
+    def action_completions(self, run_id):
+        """
+        Returns {action_id: clock time} for the completed actions of a run, as replayed.
+        """
+        started = self.runs[run_id]['started']
+        completions = {}
+        for entry, offset in zip(self.WED, self.offsets):
+            if entry['code'] != 'ActionCompleted':
+                continue
+            for result in entry['details'].get('output', {}).values():
+                if isinstance(result, dict) and 'action_id' in result:
+                    completions[result['action_id']] = started + offset
+        return completions
+
+
+class MockTransferClient:
+    """
+    A mock Globus TransferClient for sub-crate transfers and endpoint listings (files). A transfer labelled with an LPAP action
+    id appears once the action completes, and succeeds transfer_duration seconds later, at which
+    point deliver(label) is called (e.g. to write the sub-crate).
+    """
+
+    def __init__(self, flows: MockFlowsService, transfer_duration=0.0, deliver=None, files=None):
+        self.flows = flows
+        self.transfer_duration = transfer_duration
+        self.deliver = deliver
+        self.delivered = set()
+        self.files = files if files is not None else {}     # (endpoint, path) -> {size, last_modified}
+
+    def _task(self, label, completed_at):
+        now = self.flows.clock()
+        status = 'SUCCEEDED' if now >= completed_at + self.transfer_duration else 'ACTIVE'
+        if status == 'SUCCEEDED' and label not in self.delivered:
+            self.delivered.add(label)
+            if self.deliver:
+                self.deliver(label)
+        return {'task_id': f"task-{label}", 'label': label, 'status': status}
+
+    def task_list(self, filter=None, **kwargs):
+        self.flows._call('task_list')
+        filter = dict(filter or {})
+        for key, value in filter.items():
+            if isinstance(value, str):
+                filter[key] = value.split(',')
+
+        now = self.flows.clock()
+        tasks = []
+        for run_id in self.flows.runs:
+            for label, completed_at in self.flows.action_completions(run_id).items():
+                if completed_at > now:
+                    continue
+                if 'label' in filter and label not in filter['label']:
+                    continue
+                if 'task_id' in filter and f"task-{label}" not in filter['task_id']:
+                    continue
+                tasks.append(self._task(label, completed_at))
+        return tasks
+
+    def operation_ls(self, endpoint_id, path='/', filter=None, **kwargs):
+        self.flows._call('operation_ls')
+        name = filter.split(':', 1)[1] if filter and filter.startswith('name:') else None
+        entries = []
+        for (endpoint, file_path), listing in self.files.items():
+            directory, file_name = posixpath.split(file_path)
+            if endpoint != endpoint_id or (directory or '/') != path or (name and file_name != name):
+                continue
+            entries.append({'name': file_name, 'type': 'file', **listing})
+        return entries
+
+
+class MockLoginManager:
+    """
+    Accepts scope requirements, and hands out no authorizers (the mock clients need none). The
+    first get_authorizers call, and any after new scopes are required, takes token_latency
+    seconds, like a login or token refresh.
+    """
+
+    def __init__(self, token_latency=0.0, sleep=time.sleep):
+        self.token_latency = token_latency
+        self.sleep = sleep
+        self.scopes = set()
+        self.fetched = set()
+        self.token_fetches = 0
+
+    def add_requirements(self, scopes):
+        self.scopes.update(str(scope) for scope in scopes)
+
+    def get_authorizers(self):
+        if self.scopes - self.fetched or not self.token_fetches:
+            self.token_fetches += 1
+            if self.token_latency:
+                self.sleep(self.token_latency)
+            self.fetched |= self.scopes
+        return defaultdict(lambda: None)
+
+
+def register_on_change(manager, reason):
+    # Gladier's default on_change: (re)register the flow whenever the check fails
+    manager.register_flow()
+
+
+class MockStorage:
+    """
+    Stands in for Gladier's client config storage, which keeps the last registered flow_id and
+    flow_checksum of a client (shared by every instance of the client, as Gladier's file is).
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get_value(self, name):
+        return self.values.get(name)
+
+    def set_value(self, name, value):
+        self.values[name] = value
+
+    def del_value(self, name):
+        self.values.pop(name, None)
+
+
+class MockFlowsManager:
+    """
+    Stands in for a Gladier flows manager. Like Gladier's, sync_flow checks the deployed flow
+    (check_latency) on every run, and calls on_change(manager, reason) when the flow is missing or
+    its definition differs; the default on_change registers the flow (deploy_latency), updating
+    the stored flow in place when there is one. As in Gladier, flow_id is only a fixed ID given
+    by the caller: registered IDs are kept in storage, and read back with get_flow_id().
+    flow_scope is read-only.
+    """
+
+    def __init__(self, client, flows: MockFlowsService, check_latency=0.0, deploy_latency=0.0,
+                 storage: MockStorage = None):
+        self.client = client
+        self.flows = flows
+        self.check_latency = check_latency
+        self.deploy_latency = deploy_latency
+        self.storage = storage if storage is not None else MockStorage()
+        self.flow_id = None
+        self.on_change = register_on_change
+
+    def get_flow_id(self):
+        return self.flow_id or self.storage.get_value('flow_id')
+
+    @property
+    def flow_scope(self):
+        flow_id = self.get_flow_id()
+        return f"https://auth.globus.org/scopes/{flow_id}/flow_run" if flow_id else None
+
+    def definition_checksum(self):
+        return definition_checksum(self.client.flow_definition or self.client.get_flow_definition())
+
+    def check_flow(self):
+        # The reason the deployed flow cannot be used as it is (None if it can)
+        self.flows._call('check_flow')
+        if self.check_latency:
+            self.flows.sleep(self.check_latency)
+        flow_id = self.get_flow_id()
+        if flow_id not in self.flows.deployments:
+            return 'FlowObjectNotFound'
+        if self.flows.deployments[flow_id] != self.definition_checksum():
+            return 'FlowObjectIsStale'
+        return None
+
+    def sync_flow(self):
+        reason = self.check_flow()
+        if reason is not None:
+            self.on_change(self, reason)
+
+    def register_flow(self):
+        self.flows._call('deploy_flow')
+        if self.deploy_latency:
+            self.flows.sleep(self.deploy_latency)
+        flow_id = self.get_flow_id()
+        if flow_id is None:
+            flow_id = f"mock-flow-{len(self.flows.deployments)}"
+        self.flows.deployments[flow_id] = self.definition_checksum()    # Deployed, or updated in place
+        self.storage.set_value('flow_id', flow_id)
+        self.storage.set_value('flow_checksum', self.definition_checksum())
+        return flow_id
+
+
+class MockGladierClient:
+    """
+    Stands in for a Gladier client (e.g. LidFlow.lid_client()), running its tools as a sequential
+    flow on a MockFlowsService.
+    """
+
+    def __init__(self, gladier_tools, flows: MockFlowsService, login_manager: MockLoginManager = None,
+                 check_latency=0.0, deploy_latency=0.0, storage: MockStorage = None):
+        self.gladier_tools = list(gladier_tools)
+        self.flows = flows
+        self.login_manager = login_manager or MockLoginManager()
+        self.flows_manager = MockFlowsManager(self, flows, check_latency, deploy_latency, storage)
+        self.flow_definition = None
+
+    def get_flow_definition(self):
+        definition = _chain(self.gladier_tools)
+        definition['Comment'] = 'Mock flow: ' + ', '.join(tool.__name__ for tool in self.gladier_tools)
+        return definition
+
+    def get_flow_id(self):
+        if self.flows_manager.get_flow_id() is None:
+            self.flows_manager.sync_flow()
+        return self.flows_manager.get_flow_id()
+
+    def run_flow(self, flow_input=None, label=None, tags=None, **kwargs):
+        self.flows_manager.sync_flow()     # Gladier checks the flow on every run
+        self.login_manager.get_authorizers()
+        return self.flows.run_flow(flow_input=flow_input, label=label, tags=tags, flow_id=self.flows_manager.get_flow_id())
+
+    def get_status(self, run_id):
+        return self.flows.get_status(run_id)
+
+
+class MockGlobus:
+    """
+    A local Globus stack (Flows, Transfer and Auth) replaying a recorded WED.
+
+    Parameters:
+    WED (list): The run log replayed by every run.
+    time_scale (float): Multiplier applied to the recorded step timings.
+    transfer_duration (float): Seconds each sub-crate transfer takes after its LPAP completes.
+    api_latency (float): Artificial latency (s) added to each Flows/Transfer API call.
+    article_name (str): If given, delivered sub-crates are written to article_name/<action_id>.
+    check_latency / deploy_latency (float): Seconds taken to check / deploy a flow before a run.
+    token_latency (float): Seconds taken to fetch tokens (once per new set of scopes).
+    """
+
+    def __init__(self, WED, time_scale=1.0, transfer_duration=0.0, api_latency=0.0, article_name=None,
+                 identities=None, check_latency=0.0, deploy_latency=0.0, token_latency=0.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.article_name = article_name
+        self.flows = MockFlowsService(WED, time_scale=time_scale, api_latency=api_latency, clock=clock, sleep=sleep)
+        self.transfer = MockTransferClient(self.flows, transfer_duration,
+                                           deliver=self.deliver_subcrate if article_name else None)
+        self.auth = StubAuthClient(identities)
+        self.check_latency = check_latency
+        self.deploy_latency = deploy_latency
+        self.login_manager = MockLoginManager(token_latency, sleep)     # Shared token store
+        self.storage = MockStorage()    # Shared client config, as Gladier's config file is
+
+    def deliver_subcrate(self, action_id):
+        write_subcrate(os.path.join(self.article_name, action_id), name=f"subcrate_{action_id}")
+
+    def gladier_client(self, gladier_tools):
+        return MockGladierClient(gladier_tools, self.flows, self.login_manager,
+                                 self.check_latency, self.deploy_latency, self.storage)
+
+    def flow_kwargs(self, gladier_tools):
+        """
+        Keyword arguments which point a LidFlow at this stack.
+        """
+        return {
+            'gladier_client': self.gladier_client(gladier_tools),
+            'flows_status_client': self.flows,
+            'transfer_client': self.transfer,
+            'auth_client': self.auth,
+        }
+
+    def api_calls(self):
+        # Flows and Transfer calls are counted by the Flows service
+        return dict(self.flows.calls + self.auth.calls)
@@ -1,72 +1,252 @@
+"""
+Command line entry point of the orchestration server, which runs the LiD flow and builds its
+orchestration crate. Run it as a module of the package (python -m <package>.orchestration):
+
+    run                 submit the LiD flow, monitor it and build the orchestration crate
+    monitor RUN_ID      continue an interrupted orchestration from its checkpoints, without
+                        resubmitting the run (see checkpoint.py)
+    build-crate [DATA]  rebuild the orchestration crate from a snapshot (or orchestration_data.json)
+                        without contacting Globus
+    replay [DATA]       replay a recorded run log against the local mock Globus stack (see
+                        mock_globus), and build the orchestration crate of the replayed run
+
+Only the standard library is imported up front. Each command imports the modules it needs
+(gladier, globus_sdk, rocrate, ...) when it runs, so --help and crate rebuilds start quickly;
+benchmarks/bench_import.py guards the cold start.
+"""
+import argparse
+import logging
+import os
+import sys
+
 from pathlib import Path
-from LidFlow import LidFlow
-from orchestration_crate import Orchestration_crate
-from orchestration_types import OrchestrationData
-from globus_sdk import LocalGlobusConnectPersonal
 
-if __name__ == '__main__':
+logger = logging.getLogger(__name__)
 
-    # Get local GCP instance so we can set it for sub-crate transfers
-    local_gcp = LocalGlobusConnectPersonal()
-    ep_id = local_gcp.endpoint_id
-
-    # Configuration for LidFlow as top level attributes (we could easily move this to a config file)
-    # Customizable attributes for re-execution by readers? # TODO
-    endpoints = {
-        "FT_UUID": "5612672e-1ead-11ee-abf1-63e0d97254cd",
-        "ST_UUID": "105a24f4-2a94-11ee-8801-056a4e394379",
-        "LD_UUID": "21968ff8-29c4-11ee-87ff-056a4e394379",
-        "DS_UUID": "d6215ec8-244a-11ee-80c1-a3018385fcef"
-    }
+# Configuration for LidFlow as top level attributes (we could easily move this to a config file)
+# Customizable attributes for re-execution by readers? # TODO
+ENDPOINTS = {
+    "FT_UUID": "5612672e-1ead-11ee-abf1-63e0d97254cd",
+    "ST_UUID": "105a24f4-2a94-11ee-8801-056a4e394379",
+    "LD_UUID": "21968ff8-29c4-11ee-87ff-056a4e394379",
+    "DS_UUID": "d6215ec8-244a-11ee-80c1-a3018385fcef"
+}
 
-    # Data paths for the actual test and validation data
-    data_paths = {
-        "validation_path": "/home/ubuntu/LiD_Datastore/validation.txt",
-        "data_path": "/home/ubuntu/LiD_Datastore/input_data.txt"
-    }
+# Data paths for the actual test and validation data
+DATA_PATHS = {
+    "validation_path": "/home/ubuntu/LiD_Datastore/validation.txt",
+    "data_path": "/home/ubuntu/LiD_Datastore/input_data.txt"
+}
 
-    # Intermediate paths for data transfer between LPAPs
-    intermediate_paths = {
-        "validation_dest_path": "/home/ubuntu/statistics_lpap/input/validation.txt",
-        "DS_FT_dest": "/home/ubuntu/fastText_lpap/input/input_data.txt",
-        "DS_LD_dest": "/home/ubuntu/langdetect_lpap/input/input_data.txt",
-        "FT_ST_dest": "/home/ubuntu/statistics_lpap/input/fastText_predictions.txt",
-        "LD_ST_dest": "/home/ubuntu/statistics_lpap/input/langdetect_predictions.txt",
-        "FT_output_path": "/home/ubuntu/fastText_lpap/output/fastText_predictions.txt",
-        "LD_output_path": "/home/ubuntu/langdetect_lpap/output/langdetect_predictions.txt"
-    }
-    
-    # LivePub name/subcrate path & orchestration node UUID
-    # TODO change article_name to subcrate_path -> will need to change in LPAPs 
-    LP_configuration = {
-        "orchestration_node": ep_id,
-        "article_name": "/Users/eller/Projects/orchestration_logic/sub_crates"
+# Intermediate paths for data transfer between LPAPs
+INTERMEDIATE_PATHS = {
+    "validation_dest_path": "/home/ubuntu/statistics_lpap/input/validation.txt",
+    "DS_FT_dest": "/home/ubuntu/fastText_lpap/input/input_data.txt",
+    "DS_LD_dest": "/home/ubuntu/langdetect_lpap/input/input_data.txt",
+    "FT_ST_dest": "/home/ubuntu/statistics_lpap/input/fastText_predictions.txt",
+    "LD_ST_dest": "/home/ubuntu/statistics_lpap/input/langdetect_predictions.txt",
+    "FT_output_path": "/home/ubuntu/fastText_lpap/output/fastText_predictions.txt",
+    "LD_output_path": "/home/ubuntu/langdetect_lpap/output/langdetect_predictions.txt"
+}
+
+# LivePub name/subcrate path
+# TODO change article_name to subcrate_path -> will need to change in LPAPs
+ARTICLE_NAME = "/Users/eller/Projects/orchestration_logic/sub_crates"
+
+# Run label and tags for the flow
+RUN_LABEL = "LiDFlow run"
+RUN_TAGS = ["LID", "Orchestration", "Test"]
+
+# Run the independent fastText and langDetect branches concurrently (Globus Parallel state)
+PARALLEL_BRANCHES = True
+
+
+def configure_logging(level=logging.INFO):
+    """
+    Logs the orchestration modules at level to the console, and other libraries' warnings only.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.WARNING)
+    logging.getLogger(__name__.rpartition('.')[0] or __name__).setLevel(level)
+
+
+def LP_configuration():
+    # Sub-crates are transferred to the local GCP instance (the orchestration node)
+    from globus_sdk import LocalGlobusConnectPersonal
+    return {
+        "orchestration_node": LocalGlobusConnectPersonal().endpoint_id,
+        "article_name": ARTICLE_NAME
     }
 
-    # Run label and tags for the flow
-    run_label = "LiDFlow run"
-    run_tags = ["LID", "Orchestration", "Test"]
+
+def crate_directory():
+    return Path.cwd() / "working_crate"
+
+
+def blob_store():
+    # Content-addressed store shared by the working crates, so unchanged payloads are hardlinked
+    from .blob_store import BlobStore
+    return BlobStore(Path.cwd() / ".crate_blobs")
+
+
+def run_options():
+    """
+    Options shared by submitted and resumed runs: skip the transfers whose destination files are
+    unchanged since a previous run delivered them, and reuse the fastText / langDetect / statistics
+    results of previous runs on the same inputs.
+    """
+    from .transfer_manifest import TransferManifest
+    from .step_cache import StepCache
+    return {'transfer_manifest': TransferManifest(), 'step_cache': StepCache()}
+
+
+def orchestrate(lid_flow, resumed=False, incremental=True):
+    """
+    Monitors a submitted (or resumed) LiD run and its sub-crate transfers, and builds the
+    orchestration crate; incrementally (while the flow runs) unless incremental is False.
+    """
+    from .orchestration_crate import Orchestration_crate
+
+    store = blob_store()
+    if incremental:
+        # Add steps to the orchestration crate as they complete and their sub-crates arrive
+        orchestration_crate = Orchestration_crate(lid_flow, lid_flow.get_data(partial=True), crate_directory(),
+                                                  RUN_LABEL, RUN_TAGS, blob_store=store, journal=lid_flow.journal)
+        orchestration_crate.start_incremental()
+        if resumed:
+            # Continue from the last checkpoint (monitoring, run log paging, sub-crate transfers)
+            lid_flow.resume(on_step=orchestration_crate.on_step_complete, on_subcrate=orchestration_crate.on_subcrate)
+        else:
+            lid_flow.monitor_run(on_step=orchestration_crate.on_step_complete)          # Wait untill Globus flow complete
+            lid_flow.monitor_transfer(on_subcrate=orchestration_crate.on_subcrate)      # Wait untill LPAP transfers to orchestration server complete
+        orchestration_crate.finalize()      # Finalize metadata and write orchestration crate
+    else:
+        if resumed:
+            lid_flow.resume()
+        else:
+            lid_flow.monitor_run()                  # Wait untill Globus flow complete
+            lid_flow.monitor_transfer()             # Wait untill LPAP transfers to orchestration server complete
+
+        orchestration_data = lid_flow.get_data()    # Get orchestration data
+        orchestration_crate = Orchestration_crate(lid_flow, orchestration_data, crate_directory(), RUN_LABEL, RUN_TAGS,
+                                                  blob_store=store)    # Create orchestration crate object
+        orchestration_crate.build_crate()           # Build orchestration crate
+    orchestration_crate.clean_up()  # Simple removal of local sub-crates
+    store.gc()                      # Drop blobs no longer referenced by any crate
+    return orchestration_crate
 
 
-    lid_flow = LidFlow(endpoints, 
-                       data_paths, 
-                       intermediate_paths, 
-                       LP_configuration,
-                       run_label=run_label,
-                       run_tags=run_tags)   # Create flow object
+def run_command(args):
+    from .LidFlow import LidFlow
+
+    lid_flow = LidFlow(ENDPOINTS,
+                       DATA_PATHS,
+                       INTERMEDIATE_PATHS,
+                       LP_configuration(),
+                       run_label=RUN_LABEL,
+                       run_tags=RUN_TAGS,
+                       parallel_branches=PARALLEL_BRANCHES,
+                       **run_options())     # Create flow object
     lid_flow.run()                          # Run flow
-    lid_flow.monitor_run()                  # Wait untill Globus flow complete
-    lid_flow.monitor_transfer()             # Wait untill LPAP transfers to orchestration server complete 
+    orchestrate(lid_flow, incremental=not args.batch)
+
+
+def monitor_command(args):
+    from .checkpoint import resume
+
+    lid_flow = resume(args.run_id, **run_options())     # Recreate the flow object from the run's journal
+    orchestrate(lid_flow, resumed=True, incremental=not args.batch)
+
+
+def orchestration_data_path(path=None):
+    # Defaults to the snapshot in the working directory, else the legacy orchestration_data.json
+    from .snapshot import DEFAULT_SNAPSHOT_PATH
+    if path is not None:
+        return path
+    return DEFAULT_SNAPSHOT_PATH if os.path.exists(DEFAULT_SNAPSHOT_PATH) else "orchestration_data.json"
+
+
+def build_crate_command(args):
+    from .snapshot import load_orchestration_data
+    from .orchestration_crate import Orchestration_crate
+
+    orchestration_data = load_orchestration_data(orchestration_data_path(args.data))
+    store = blob_store()
+    orchestration_crate = Orchestration_crate(None, orchestration_data, args.output or crate_directory(),
+                                              RUN_LABEL, RUN_TAGS, blob_store=store)
+    orchestration_crate.build_crate()
+    store.gc()
+
+
+def replay_command(args):
+    from .snapshot import load_orchestration_data
+    from .mock_globus import MockGlobus
+    from .identity_cache import IdentityCache
+    from .flow_registry import FlowRegistry
+    from .orchestration_crate import Orchestration_crate
+    from .LidFlow import LidFlow, lid_tools
 
-    orchestration_data: OrchestrationData = lid_flow.get_data() # Get orchestration data
-    orchestration_crate = Orchestration_crate(lid_flow, orchestration_data, (Path.cwd() / "working_crate"), run_label, run_tags) # Create orchestration crate object
-    orchestration_crate.build_crate() # Build orchestration crate
-    orchestration_crate.clean_up() # Simple removal of local sub-crates and diagram temp files
+    recorded = load_orchestration_data(orchestration_data_path(args.data))
+    article_name = os.path.abspath(args.subcrates)
+    stack = MockGlobus(list(recorded.WED), time_scale=args.time_scale, article_name=article_name,
+                       identities=getattr(recorded.identity_map, 'records', None))
+    lid_flow = LidFlow(ENDPOINTS, DATA_PATHS, INTERMEDIATE_PATHS,
+                       {"orchestration_node": "mock-orchestration-node", "article_name": article_name},
+                       run_label=f"{RUN_LABEL} (replay of {recorded.run_id})", run_tags=RUN_TAGS + ["Replay"],
+                       journal_dir=None, flow_registry=FlowRegistry(None), identity_cache=IdentityCache(path=None),
+                       **stack.flow_kwargs(lid_tools()))
+    lid_flow.run()
+    lid_flow.monitor_run()
+    lid_flow.monitor_transfer()
+    orchestration_crate = Orchestration_crate(lid_flow, lid_flow.get_data(), args.output or crate_directory(),
+                                              lid_flow.run_label, lid_flow.run_tags)
+    orchestration_crate.build_crate()
+    print(f"Replayed run {recorded.run_id} | Globus API calls: {stack.api_calls()}")
 
-    # For testing, you can use the following code to serialize and deserialize orchestration data
-    # Meaning, you dont need to re-run the flow to test the orchestration crate build
 
-    # lid_flow.serrialize_data() # Serialize orchestration data for testing
-    # oCrate = Orchestration_crate(None, None, (Path.cwd() / "working_crate"), run_label, run_tags, True)
-    # oCrate.deserialize_data() # Using local data for testing
-    # oCrate.build_crate()
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the LiD flow and build its orchestration crate")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only log warnings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Submit the LiD flow, monitor it and build the orchestration crate")
+    run.set_defaults(handler=run_command)
+
+    monitor = commands.add_parser("monitor", help="Continue an interrupted orchestration from its checkpoints, "
+                                                  "without resubmitting the run")
+    monitor.add_argument("run_id", metavar="RUN_ID")
+    monitor.set_defaults(handler=monitor_command)
+
+    for command in (run, monitor):
+        command.add_argument("--batch", action="store_true",
+                             help="Build the crate once the run has finished, rather than while it runs")
+
+    build_crate = commands.add_parser("build-crate", help="Rebuild the orchestration crate from saved orchestration "
+                                                          "data, without contacting Globus")
+    build_crate.set_defaults(handler=build_crate_command)
+
+    replay = commands.add_parser("replay", help="Replay a recorded run against the mock Globus stack, and build "
+                                                "its orchestration crate")
+    replay.add_argument("--subcrates", default="replay_sub_crates", help="Where the mock sub-crates are delivered")
+    replay.add_argument("--time-scale", type=float, default=0.0,
+                        help="Multiplier applied to the recorded step timings (0 replays immediately)")
+    replay.set_defaults(handler=replay_command)
+
+    for command in (build_crate, replay):
+        command.add_argument("data", nargs="?", help="Snapshot or orchestration_data.json (default: the one in the "
+                                                     "working directory)")
+        command.add_argument("-o", "--output", help="Crate directory (default: ./working_crate)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(logging.WARNING if args.quiet else logging.INFO)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
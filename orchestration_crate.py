@@ -1,32 +1,26 @@
 import json
 import os
-import yaml
-import tempfile
+import posixpath
 import shutil
+import tempfile
 import logging
 
-from graphviz import Digraph
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from rocrate.rocrate import ROCrate, ContextEntity, DataEntity, ComputationalWorkflow
 from .orchestration_types import OrchestrationData
+from .flow_builder import flow_topology, restrict_topology, expand_fused
+from .flow_diagram import DiagramRenderer, DIAGRAMS
+from .subcrate_ingest import ingest_subcrate, subcrate_name
+from .blob_store import BlobStore
+from .snapshot import load_orchestration_data, DEFAULT_SNAPSHOT_PATH
+from .profiling import Profiler, TRACE_FORMAT_URL
+from .checkpoint import Journal
 from datetime import datetime
 
-import logging
-
-# Set up a logger for your script and set its level to INFO
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-# Create a handler, set its level to INFO, and define a format for the handler
-handler = logging.StreamHandler()
-handler.setLevel(logging.INFO)
-formatter = logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
-handler.setFormatter(formatter)
-
-# Add the handler to the logger
-logger.addHandler(handler)
-
-# Set the level of the root logger to WARNING to suppress logs from other libraries
-logging.getLogger().setLevel(logging.WARNING)
+GLOBUS_RUN_URL = "https://app.globus.org/runs/"     # Web page of a Globus flow run
 
 class Orchestration_crate:
     def __init__(self, 
@@ -34,7 +28,14 @@ class Orchestration_crate:
                  orchestration_data: OrchestrationData, 
                  crate_directory="RO_Crate", 
                  run_label=None, run_tags=None, 
-                 local_data=False):
+                 local_data=False,
+                 ingest_mode='auto',
+                 blob_store: BlobStore = None,
+                 diagram_renderer: DiagramRenderer = None,
+                 profiler: Profiler = None,
+                 journal: Journal = None,
+                 ingest_workers: int = None,
+                 verify_outputs=True):
 
         if local_data:
             self.flow_data = self.deserialize_data()
@@ -54,13 +55,84 @@ class Orchestration_crate:
         self.crate.license = "https://creativecommons.org/licenses/by-nc-sa/3.0/au/"
         self.run_label = run_label
         self.run_tags = run_tags
+        self.ingest_mode = ingest_mode  # How sub-crates are placed in the crate (see subcrate_ingest)
+        self.blob_store = blob_store    # Optional content-addressed store for unchanged payloads
+        self.blob_digests = set()       # Blobs referenced by this crate
+        self.staging_directory = None   # Temporary home of payloads staged without a blob store
+        self.diagrams = diagram_renderer or DIAGRAMS
+        self.diagram_future = None      # Background render of the flow diagram
+        # Timeline embedded in the crate as profile.json: the run's, or this crate build's own
+        self.profiler = profiler or getattr(self.flow, 'profiler', None) or Profiler()
+        # Run checkpoint journal (see checkpoint.py); sub-crates ingested before a restart are reused
+        self.journal = journal
+        self.ingested = dict(journal.state()['ingested']) if journal is not None else {}
+        self.ingest_workers = ingest_workers    # Threads used by prepare_steps (None: executor default)
+        self.subcrate_paths = {}        # LPAP state name -> sub-crate location in the crate directory
+        self.verify_outputs = verify_outputs    # Check the statistics LPAP's results (see verification)
+
+    def stage_file(self, dest_path, data: bytes = None, source=None):
+        """
+        Returns a source path for a crate payload given as data or as a source file. With a blob
+        store, the payload is stored once and hardlinked at its final location in the crate
+        directory, so crate.write does not rewrite it. Without one, data is written to a temporary
+        staging directory (removed once the crate is written), and source files are used as they are.
+        """
+        if self.blob_store is None:
+            if data is None:
+                return source
+            if self.staging_directory is None:
+                self.staging_directory = tempfile.mkdtemp(prefix="ocrate.")
+            path = os.path.join(self.staging_directory, dest_path)
+            with open(path, "wb") as f:
+                f.write(data)
+            return path
+
+        digest = self.blob_store.put_bytes(data) if data is not None else self.blob_store.put_file(source)
+        self.blob_digests.add(digest)
+        return str(self.blob_store.link(digest, os.path.join(self.crate_directory, dest_path)))
+
+    def add_profile(self, source):
+        """ Add the orchestration performance profile (a Chrome trace) to the crate """
+        self.crate.add_file(
+            source=source,
+            dest_path="profile.json",
+            properties={
+                "@type": "File",
+                "name": "Orchestration performance profile",
+                "description": "Timeline of the orchestration pipeline, in the Chrome trace event format",
+                "encodingFormat": "application/json",
+                "conformsTo": {"@id": TRACE_FORMAT_URL},
+            }
+        )
 
     def serialize(self):
-        self.crate.write(self.crate_directory)
-
-    def add_workflow(self):
+        profile_path = None
+        if self.profiler.enabled:
+            # A snapshot of the trace is written with the crate; the final trace (which includes
+            # the write itself) then replaces the copy in the crate directory
+            fd, profile_path = tempfile.mkstemp(prefix="profile.", suffix=".json")
+            os.close(fd)
+            self.add_profile(self.profiler.write(profile_path))
+        try:
+            with self.profiler.span('crate.write', crate_directory=str(self.crate_directory)):
+                self.crate.write(self.crate_directory)
+            if profile_path is not None:
+                self.profiler.write(os.path.join(self.crate_directory, "profile.json"))
+        finally:
+            if profile_path is not None:
+                os.remove(profile_path)
+            if self.staging_directory is not None:
+                shutil.rmtree(self.staging_directory, ignore_errors=True)
+                self.staging_directory = None
+        if self.blob_store is not None:
+            self.blob_store.record(self.crate_directory, self.blob_digests)
+        if self.journal is not None:
+            self.journal.record('crate_complete', crate_directory=str(self.crate_directory))
+
+    def add_workflow(self, include_image=True):
         """
-        Manually creates the workflow meta-data object
+        Manually creates the workflow meta-data object. The workflow image depends on the
+        step timings, so incremental builds add it when the crate is finalized.
         """
 
         # Check if self.flow_data.WEP exists
@@ -74,22 +146,22 @@ class Orchestration_crate:
         """ Add WEP to crate """
         try:
             # Add WEP to crate
-            with open("WEP.json", "w") as json_file:
-                json.dump(self.flow_data.WEP, json_file, indent=4)
+            wep_path = self.stage_file("WEP.json", json.dumps(self.flow_data.WEP, indent=4).encode())
 
-                try:
-                    workflow = self.crate.add_file(
-                        source=json_file.name,
-                        properties={
-                            "@type": ["File", "SoftwareSourceCode", "ComputationalWorkflow"],
-                            "name": self.run_label,
-                            "encoding": "utf-8",
-                            "content_type": "application/json",
-                            "Author": None,  # TODO
-                        }
-                    )
-                except Exception as e:
-                    raise RuntimeError(f"Error adding file to crate: {str(e)}")
+            try:
+                workflow = self.crate.add_file(
+                    source=wep_path,
+                    dest_path="WEP.json",
+                    properties={
+                        "@type": ["File", "SoftwareSourceCode", "ComputationalWorkflow"],
+                        "name": self.run_label,
+                        "encoding": "utf-8",
+                        "content_type": "application/json",
+                        "Author": None,  # TODO
+                    }
+                )
+            except Exception as e:
+                raise RuntimeError(f"Error adding file to crate: {str(e)}")
         
         except Exception as e:
             raise RuntimeError(f"Error writing to WEP.json: {str(e)}")
@@ -100,32 +172,42 @@ class Orchestration_crate:
         
         """ Add workflow input to crate """
         try:
-            with open("WEP_input.json", "w") as json_file:
-                json.dump(self.flow_data.input, json_file, indent=4)
+            input_path = self.stage_file("WEP_input.json", json.dumps(self.flow_data.input, indent=4).encode())
 
-                try:
-                    workflow["input"] = self.crate.add_file(
-                        source=json_file.name,
-                        properties={
-                            "@type": ["File", "Dataset"],
-                            "name": "Workflow Input",
-                            "encoding": "utf-8",
-                            "content_type": "application/json",
-                        }
-                    )
-                except Exception as e:
-                    raise RuntimeError(f"Error adding workflow input to crate: {str(e)}")
+            try:
+                workflow["input"] = self.crate.add_file(
+                    source=input_path,
+                    dest_path="WEP_input.json",
+                    properties={
+                        "@type": ["File", "Dataset"],
+                        "name": "Workflow Input",
+                        "encoding": "utf-8",
+                        "content_type": "application/json",
+                    }
+                )
+            except Exception as e:
+                raise RuntimeError(f"Error adding workflow input to crate: {str(e)}")
         except Exception as e:
             raise RuntimeError(f"Error writing to WEP_input.json: {str(e)}")
 
+        # Add workflow license 
+        workflow["license"] = "https://creativecommons.org/licenses/by-nc-sa/3.0/au/"  # TODO check license type
+        
+        self.workflow = workflow
+        if include_image:
+            self.add_workflow_image()
+        return workflow
+
+    def add_workflow_image(self):
         """ Add workflow image to crate """
         try:
             # Add workflow image
             workflow_svg = self.generate_flow_diagram()
             
             try:
-                workflow["image"] = self.crate.add_file(
+                self.workflow["image"] = self.crate.add_file(
                     source=workflow_svg,
+                    dest_path="flow_diagram.svg",
                     properties={
                         "@type": ["File", "ImageObject"],
                         "name": "Full Globus Workflow Diagram",
@@ -138,14 +220,85 @@ class Orchestration_crate:
             
         except Exception as e:
             raise RuntimeError(f"Error generating flow diagram: {str(e)}")
-        
-        # Add workflow license 
-        workflow["license"] = "https://creativecommons.org/licenses/by-nc-sa/3.0/au/"  # TODO check license type
-        
-        self.workflow = workflow
-        return workflow
 
 
+    def add_reused_inputs(self):
+        """
+        Adds the files of transfers which were skipped because their destinations were current
+        (see transfer_manifest), linked from the workflow as reused inputs.
+        """
+        reused = []
+        for transfer in self.flow_data.reused_inputs:
+            for item in transfer['items']:
+                reused.append(self.crate.add(
+                    ContextEntity(
+                        self.crate,
+                        identifier=f"globus://{item['destination_endpoint']}{item['destination_path']}",
+                        properties={
+                            "@type": "File",
+                            "name": posixpath.basename(item['destination_path']),
+                            "description": f"Input delivered by {transfer['tool']} in run {item['run_id']}, reused as it was unchanged",
+                            "contentSize": item['destination_listing'].get('size'),
+                            "dateModified": item['destination_listing'].get('last_modified'),
+                            "transfer_step": transfer['tool'],
+                            "source": f"globus://{item['source_endpoint']}{item['source_path']}",
+                            "reused_from_run": item['run_id'],
+                        }
+                    )
+                ))
+        if reused:
+            self.workflow["reusedInput"] = reused
+
+    def add_cached_steps(self):
+        """
+        Adds the LPAP steps which were skipped because their results were cached (see step_cache),
+        with a copy of the sub-crate of the run which produced the result. The steps are marked as
+        cached, and linked to the original run, and from the workflow as cached steps.
+        """
+        cached = []
+        for record in self.flow_data.cached_steps:
+            key = record['tool']
+            path = self.ingested.get(key)
+            if path is None or not os.path.isdir(path):
+                destination = self.subcrate_destination(record['subcrate'], key)
+                with self.profiler.span('subcrate.ingest', step=key, cached=True):
+                    path = str(ingest_subcrate(record['subcrate'], destination, mode='hardlink'))
+                self.ingested[key] = path
+                if self.journal is not None:
+                    self.journal.record('ingested', key=key, path=path)
+            self.subcrate_paths[key] = path
+
+            gladier_component = self.flow_data.components[key]
+            component_name = os.path.basename(gladier_component)
+            component = self.crate.add_file(self.stage_file(component_name, source=gladier_component), dest_path=component_name)
+            step = self.crate.add(
+                ContextEntity(
+                    self.crate,
+                    identifier=record['action_id'],
+                    properties={
+                        "@type": "WorkflowStep",
+                        "action_id": record['action_id'],
+                        "state_name": key,
+                        "status": "CACHED",
+                        "cached": True,
+                        "cached_from_run": record['run_id'],
+                        "isBasedOn": {"@id": f"{GLOBUS_RUN_URL}{record['run_id']}"},
+                        "lpap_version": record['version'],
+                        "input_checksums": [f"{path}: sha256:{digest}" for path, digest in sorted(record['inputs'].items())],
+                    }
+                )
+            )
+            step["hasPart"] = [self.crate.add_tree(source=path), component]
+            cached.append(step)
+        if cached:
+            self.workflow["cachedStep"] = cached
+
+    def record_steps(self):
+        # Caches the results of this run's LPAP steps from their sub-crates (see step_cache)
+        if self.flow is not None:
+            self.flow.record_steps({key: path for key, path in self.subcrate_paths.items()
+                                    if key in self.flow_data.WED_clean})
+
     def add_users(self):
 
         for globus_uuid, person in self.flow_data.identity_map.items():
@@ -166,144 +319,296 @@ class Orchestration_crate:
     def add_gladier_components(self):
         pass
 
+    def step_topology(self):
+        # Stages of (possibly parallel) branches of WED_clean steps, in WEP execution order. Fused
+        # transfer states are listed as the steps of their original tools
+        topology = expand_fused(flow_topology(self.flow_data.WEP), self.flow_data.WED_clean)
+        return restrict_topology(topology, self.flow_data.WED_clean)
+
     def add_steps(self):
-        # Uses WEP_clean as an ordered list of steps (Globus -> currently always sequential)
+        # Steps are numbered by stage in the WEP; steps in parallel branches share a step number
         # Inlcudes gladier component files as attributes for each step # TODO
 
-        current_step = 1
-        step_list = []
-        for key, value in self.flow_data.WED_clean.items():
-
-            # Metadata to store at the top level of the sub-crate step entries
-            action_id = value.get('action_id')
-            completion_time = value.get('completion_time')
-            creator_id = value.get('creator_id').replace('urn:globus:auth:identity:', '')
-            manage_by = [item.split(':')[-1] for item in value.get('manage_by', [])]
-            monitor_by = [item.split(':')[-1] for item in value.get('monitor_by', [])]
-            start_time = value.get('start_time')
-            status = value.get('status')
-            state_name = value.get('state_name')
-            total_execution_time = value.get('total_execution_time')
-            gladier_component = self.flow_data.components[key]
-
-            # Add step Contextual Entity
-            step = self.crate.add(
-                ContextEntity(
-                    self.crate,
-                    identifier=action_id,
-                    properties = {
-                        "@type":"WorkflowStep",
-                        "action_id":action_id,
-                        "completion_time":completion_time,
-                        "creator_id":creator_id,
-                        "manage_by":manage_by,
-                        "monitor_by":monitor_by,
-                        "start_time":start_time,
-                        "status":status,
-                        "state_name":state_name,
-                        "total_execution_time":total_execution_time,
-                        "step_number":current_step,
-                    }
-                )
-            )
+        placements = []
+        for current_step, stage in enumerate(self.step_topology(), start=1):
+            for branch_index, branch in enumerate(stage):
+                for key in branch:
+                    placements.append((key, current_step, branch_index if len(stage) > 1 else None))
 
-            # Add gladier component file, and link to step
-            component = self.crate.add_file(gladier_component)
-            step["hasPart"] = component
+        # Sub-crates and component files are ingested and hashed concurrently, then the step
+        # entities are added one by one in WEP order, so the metadata is the same on every build
+        prepared = self.prepare_steps([key for key, _, _ in placements])
+        step_list = [self.add_step(key, current_step, branch, prepared[key])
+                     for key, current_step, branch in placements]
 
-            if 'Transfer' not in key:
-                sub_crate_path = os.path.join(self.flow_data.article_name, action_id)
-                if os.path.isdir(sub_crate_path):
-                    print(sub_crate_path)
-                    path = self.static_dir_structure(sub_crate_path, key) # TODO: remove 
-                    print(path)
-                    sub_crate = self.crate.add_tree(source=path)
-                    # Link subcrate to step
-                    step["hasPart"] = [sub_crate, component]
-                else:
-                    raise Exception(f"Subcrate for LPAP action {action_id} does not exist")
-            
-            # Link step to workflow steps
-            step_list.append(step)
-            current_step += 1
-        
         # Link workflow to steps
         self.workflow["hasPart"] = step_list
 
-    def static_dir_structure(self, crate_path, key):
-        # A gross function that translates the crate directory structure into a static directory structure
-        # TODO: This is a temporary solution, and should be replaced with parsing the crate metadata
-
-        print(key)
-        if "statistics" in key:
-            if os.path.isdir(crate_path):
-                new_path = f"{os.path.dirname(crate_path)}/statistics_lpap"
-                return shutil.copytree(crate_path, new_path)
-        if "fastText" in key:
-            if os.path.isdir(crate_path):
-                new_path = f"{os.path.dirname(crate_path)}/fastText_lpap"
-                return shutil.copytree(crate_path, new_path)
-        if "langDetect" in key:
-            if os.path.isdir(crate_path):
-                new_path = f"{os.path.dirname(crate_path)}/langdetect_lpap"
-                return shutil.copytree(crate_path, new_path)
-
-
-    def deserialize_data(self):
+    def prepare_steps(self, keys: List[str]) -> Dict[str, dict]:
+        """
+        Does the file work for a set of steps on a thread pool: LPAP sub-crates are moved / linked /
+        copied into the crate directory (and deduplicated against the blob store), and the
+        component files are staged. Sub-crate destinations are assigned up front in step order, so
+        the result does not depend on which thread finishes first.
+
+        Returns:
+        Dict[str, dict]: {'component': staged component path, 'subcrate': sub-crate path (LPAPs)}
+        for each step, to pass to add_step.
+        """
+        components = {os.path.basename(self.flow_data.components[key]): self.flow_data.components[key] for key in keys}
+        destinations = {}
+        for key in keys:
+            if 'Transfer' not in key and key not in self.ingested:
+                sub_crate_path = os.path.join(self.flow_data.article_name, self.flow_data.WED_clean[key]['action_id'])
+                if os.path.isdir(sub_crate_path):
+                    destinations[key] = self.subcrate_destination(sub_crate_path, key, destinations.values())
+
+        with ThreadPoolExecutor(self.ingest_workers, thread_name_prefix="subcrate-ingest") as executor:
+            staged = {name: executor.submit(self.stage_file, name, source=source) for name, source in components.items()}
+            subcrates = {key: executor.submit(self.prepare_subcrate, key, destinations.get(key))
+                         for key in keys if 'Transfer' not in key}
+        prepared = {key: {'component': staged[os.path.basename(self.flow_data.components[key])].result()} for key in keys}
+        for key, future in subcrates.items():
+            prepared[key]['subcrate'] = future.result()
+        return prepared
+
+    def prepare_subcrate(self, key, destination=None):
         """
-        Deserialize OrchestrationData from json file for testing purposes (so you dont need to keep running the flow)
+        Places an LPAP step's sub-crate in the crate directory (reusing one ingested before a
+        restart), returning its path.
         """
-        # Load data from file
-        with open("orchestration_data.json", "r") as json_file:
-            data_dict = json.load(json_file)
-        return OrchestrationData.from_dict(data_dict)
+        action_id = self.flow_data.WED_clean[key].get('action_id')
+        sub_crate_path = os.path.join(self.flow_data.article_name, action_id)
+        path = self.ingested.get(key)
+        if path is not None and os.path.isdir(path):
+            logger.info(f"Reusing sub-crate for {key} ingested before restart")
+        elif os.path.isdir(sub_crate_path):
+            path = self.ingest_subcrate(sub_crate_path, key, destination)
+        else:
+            raise Exception(f"Subcrate for LPAP action {action_id} does not exist")
+        if self.blob_store is not None:
+            # Share identical files (e.g. input and validation data) with previous crates
+            self.blob_digests.update(self.blob_store.dedupe_tree(path))
+        return path
+
+    def add_step(self, key, current_step, branch=None, prepared=None):
+        # Adds a single WED_clean step (and its sub-crate, for LPAPs) to the crate. The file work
+        # is done here unless it was done by prepare_steps
+        value = self.flow_data.WED_clean[key]
+
+        # Metadata to store at the top level of the sub-crate step entries
+        action_id = value.get('action_id')
+        completion_time = value.get('completion_time')
+        creator_id = value.get('creator_id').replace('urn:globus:auth:identity:', '')
+        manage_by = [item.split(':')[-1] for item in value.get('manage_by', [])]
+        monitor_by = [item.split(':')[-1] for item in value.get('monitor_by', [])]
+        start_time = value.get('start_time')
+        status = value.get('status')
+        state_name = value.get('state_name')
+        total_execution_time = value.get('total_execution_time')
+        gladier_component = self.flow_data.components[key]
+
+        # Add step Contextual Entity
+        step = self.crate.add(
+            ContextEntity(
+                self.crate,
+                identifier=action_id,
+                properties = {
+                    "@type":"WorkflowStep",
+                    "action_id":action_id,
+                    "completion_time":completion_time,
+                    "creator_id":creator_id,
+                    "manage_by":manage_by,
+                    "monitor_by":monitor_by,
+                    "start_time":start_time,
+                    "status":status,
+                    "state_name":state_name,
+                    "total_execution_time":total_execution_time,
+                    "step_number":current_step,
+                }
+            )
+        )
+        if branch is not None:
+            step["branch"] = branch
+        if value.get('fused_state'):
+            step["fused_transfer"] = value['fused_state']   # Run as part of a multi-item transfer
+
+        # Add gladier component file, and link to step
+        component_name = os.path.basename(gladier_component)
+        if prepared is None:
+            prepared = {'component': self.stage_file(component_name, source=gladier_component)}
+        component = self.crate.add_file(prepared['component'], dest_path=component_name)
+        step["hasPart"] = component
+
+        if 'Transfer' not in key:
+            path = prepared['subcrate'] if 'subcrate' in prepared else self.prepare_subcrate(key)
+            self.subcrate_paths[key] = path
+            sub_crate = self.crate.add_tree(source=path)
+            # Link subcrate to step
+            step["hasPart"] = [sub_crate, component]
+
+        return step
+
+    def add_verification(self, key='statistics'):
+        """
+        Recomputes the statistics LPAP's results (accuracy, per-language precision / recall and
+        confusion matrices) from the predictions and validation data in its sub-crate, and adds
+        the report to the crate alongside the sub-crate.
+        """
+        if not self.verify_outputs or key not in self.subcrate_paths:
+            return None
+        from .verification import verify_statistics     # NumPy is only needed to verify
+
+        report = verify_statistics(self.subcrate_paths[key], self.flow_data.input.get('input', {}),
+                                   profiler=self.profiler)
+        if report is None:
+            return None
+
+        report['step'] = key
+        report_path = self.stage_file("statistics_verification.json", json.dumps(report, indent=4).encode())
+        return self.crate.add_file(
+            source=report_path,
+            dest_path="statistics_verification.json",
+            properties={
+                "@type": "File",
+                "name": "Statistics verification",
+                "description": "Statistics recomputed by the orchestration server from the predictions and validation data in the statistics sub-crate",
+                "encodingFormat": "application/json",
+                "about": {"@id": self.flow_data.WED_clean[key].get('action_id')},
+            }
+        )
+
+    def start_incremental(self):
+        """
+        Starts an incremental build: the workflow is added up front, and steps are added by
+        on_step_complete / on_subcrate as the run progresses, so finalize only has to add the
+        remaining metadata and write the crate.
+        """
+        self.add_workflow(include_image=False)
+        # Lay out the diagram template while the run is in progress; finalize fills in the timings
+        self.diagrams.prepare(flow_topology(self.flow_data.WEP), self.profiler)
+        self.steps = {}                 # state_name -> step entity
+        self.subcrates_arrived = set()  # LPAP state names whose sub-crate has landed
+        self.step_numbers = {}          # state_name -> (step_number, branch)
+        for current_step, stage in enumerate(flow_topology(self.flow_data.WEP), start=1):
+            for branch_index, branch in enumerate(stage):
+                for key in branch:
+                    self.step_numbers[key] = (current_step, branch_index if len(stage) > 1 else None)
+
+    def on_step_complete(self, state_name, record):
+        # LidFlow.monitor_run callback, called as each WED step is parsed
+        self.flow_data.WED_clean[state_name] = record
+        if record.get('fused_state') in self.step_numbers:
+            self.step_numbers.setdefault(state_name, self.step_numbers[record['fused_state']])
+        self.add_step_if_ready(state_name)
+
+    def on_subcrate(self, state_name, action_id, task):
+        # LidFlow.monitor_transfer callback, called as each LPAP sub-crate lands
+        self.subcrates_arrived.add(state_name)
+        self.add_step_if_ready(state_name)
+
+    def add_step_if_ready(self, key):
+        # A step is ready once it has completed and, for LPAPs, its sub-crate has arrived
+        if key in self.steps or key not in self.flow_data.WED_clean:
+            return
+        if 'Transfer' not in key and key not in self.subcrates_arrived:
+            return
+        self.steps[key] = self.add_step(key, *self.step_numbers.get(key, (len(self.step_numbers) + 1, None)))
+        logger.info(f"Added step {key} to orchestration crate")
+
+    def finalize(self):
+        """
+        Completes an incremental build: adds users, any outstanding steps and the workflow
+        image, links the steps to the workflow in WEP order, and writes the crate.
+        """
+        if self.flow is not None:
+            self.flow_data = self.flow.get_data()   # Complete data, including the identity map
+        self.add_users()
+
+        topology = self.step_topology()
+        for key in (key for stage in topology for branch in stage for key in branch):
+            if key not in self.steps:
+                self.steps[key] = self.add_step(key, *self.step_numbers.get(key, (len(self.step_numbers) + 1, None)))
+        self.workflow["hasPart"] = [self.steps[key] for stage in topology for branch in stage for key in branch]
+        self.add_cached_steps()
+        self.add_verification()
+        self.add_reused_inputs()
+
+        self.add_workflow_image()
+        self.add_gladier_components()
+        self.serialize()
+        self.record_steps()
 
-    def generate_flow_diagram(self):
+        logger.info(f"Orchestration crate built at {self.crate_directory}")
+
+    def subcrate_destination(self, crate_path, key, reserved=()):
+        # Sub-crates are named after the root data entity in their ro-crate-metadata.json
+        name = subcrate_name(crate_path, default=f"{key}_lpap")
+        destination = os.path.join(self.crate_directory, name)
+        if os.path.exists(destination) or destination in reserved:
+            destination = os.path.join(self.crate_directory, f"{name}_{os.path.basename(crate_path)}")
+        return destination
+
+    def ingest_subcrate(self, crate_path, key, destination=None):
         """
-        Generates a svg of the computational flow.
-        # TODO inlcude dynamic links to the Ocrate in the svg
+        Places a received sub-crate in the crate directory (see subcrate_destination). The
+        sub-crate is moved or linked rather than copied where the filesystem allows (see
+        self.ingest_mode), and crate.write then leaves it in place.
+        """
+        destination = destination or self.subcrate_destination(crate_path, key)
+        with self.profiler.span('subcrate.ingest', step=key):
+            path = ingest_subcrate(crate_path, destination, mode=self.ingest_mode)
+        self.ingested[key] = str(path)
+        if self.journal is not None:
+            self.journal.record('ingested', key=key, path=str(path))
+        return path
+
 
-        Parameters
-        ----------
-        flow_data : OrchestrationData
-            The OrchestrationData object containing the data from the flow
+    def deserialize_data(self, path=None):
         """
-        self.diagram = Digraph(comment='Orchestration Flow')
+        Deserialize OrchestrationData from a snapshot (or legacy json file) for testing purposes (so you dont need to keep running the flow)
+        """
+        # Load data from file, preferring a snapshot over the legacy orchestration_data.json
+        if path is None:
+            path = DEFAULT_SNAPSHOT_PATH if os.path.exists(DEFAULT_SNAPSHOT_PATH) else "orchestration_data.json"
+        return load_orchestration_data(path)
 
-        # Add nodes to the graph with 'state_name' as the title and 'execution_time' as an attribute
-        for state_name, details in self.flow_data.WED_clean.items():
-  
-            # Grab the execution time in seconds
-            execution_time = details['total_execution_time']
-            
-            # Convert execution time to a human-readable format (minutes and seconds)
-            minutes, seconds = divmod(execution_time, 60)
-            execution_time_str = f"{int(minutes)} minutes, {int(seconds)} seconds"
-            
-            # Determine the color of the node based on the state_name
-            color = "green" if "Transfer" in state_name else "blue"
-            
-            # Add the node to the graph with the specified attributes
-            self.diagram.node(state_name, label=f"{state_name}\nExecution time: {execution_time_str}", shape="box", color=color, style="filled")
+    def prepare_flow_diagram(self):
+        """
+        Starts rendering the flow diagram in the background, so Graphviz runs while the steps
+        are added. Requires the complete WED_clean.
+        """
+        self.diagram_future = self.diagrams.render_async(self.step_topology(), self.flow_data.WED_clean, self.profiler)
+        return self.diagram_future
 
-        # Add directed edges between the nodes to represent the flow from one step to the next
-        state_names = list(self.flow_data.WED_clean.keys())
-        for i in range(len(state_names) - 1):
-            self.diagram.edge(state_names[i], state_names[i + 1])
+    def generate_flow_diagram(self):
+        """
+        Generates a svg of the computational flow, written straight into the crate directory.
+        # TODO inlcude dynamic links to the Ocrate in the svg
+
+        Returns:
+        str: The path of the svg file.
+        """
+        if self.diagram_future is not None:
+            svg = self.diagram_future.result()
+            self.diagram_future = None
+        else:
+            svg = self.diagrams.render(self.step_topology(), self.flow_data.WED_clean, self.profiler)
 
-        # Render the graph to files in both PNG and SVG formats
-        output_base = 'flow_diagram'
-        return self.diagram.render(filename=output_base, format='svg')
+        os.makedirs(self.crate_directory, exist_ok=True)
+        output_path = os.path.join(self.crate_directory, "flow_diagram.svg")
+        with open(output_path, "w") as f:
+            f.write(svg)
+        return output_path
 
     def clean_up(self):
         # Removes sub-crates, and other artefacts after constructing the orchestration crate
         # Remove sub-crates
         shutil.rmtree(self.flow_data.article_name)
-        # Remove diagram
-        os.remove("flow_diagram.svg")
-        os.remove("flow_diagram")
-        os.remove("WEP.json")
-        os.remove("WEP_input.json")
+        # WEP files are only written to the working directory when no blob store is used
+        for path in ("WEP.json", "WEP_input.json", "statistics_verification.json"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def create_publication(self):
         """ This is a very stupid piece of code, and is only intended to demonstrate the 
@@ -321,11 +626,17 @@ class Orchestration_crate:
         pass
         
     def build_crate(self):
+        self.prepare_flow_diagram()     # Render the flow diagram in the background
         self.add_users()                # Add users to orchestration crate
-        self.add_workflow()             # Add workflow to orchestration crate
+        self.add_workflow(include_image=False)  # Add workflow to orchestration crate
         self.add_steps()                # Add steps to orchestration crate
+        self.add_cached_steps()         # Add the LPAP steps whose results were reused
+        self.add_verification()         # Check the statistics LPAP's results
+        self.add_reused_inputs()        # Add the inputs reused from previous runs
+        self.add_workflow_image()       # Add the rendered flow diagram to the workflow
         self.add_gladier_components()   # Add gladier components to orchestration crate      
         self.serialize()                # Serialize orchestration crate
+        self.record_steps()             # Cache the LPAP step results for later runs
 
         logger.info(f"Orchestration crate built at {self.crate_directory}")
         
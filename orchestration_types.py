@@ -1,9 +1,12 @@
-from dataclasses import dataclass, asdict
-from typing import Dict, Any
+from dataclasses import dataclass
+from collections.abc import Mapping, Sequence
+from typing import Dict, Any, List
 from pathlib import Path
 
 @dataclass
 class GlobusUser:
+    __slots__ = ('identity_provider', 'status', 'email', 'identity_type', 'organization', 'name', 'id', 'username')
+
     identity_provider: str
     status: str
     email: str
@@ -14,9 +17,9 @@ class GlobusUser:
     username: str
 
     def to_dict(self):
-        # Use the asdict function to get a dictionary representation of the data class
-        return asdict(self)
-    
+        # All fields are strings, so no copying is needed
+        return {name: getattr(self, name) for name in self.__slots__}
+
     @classmethod
     def from_dict(cls, d):
         return cls(
@@ -30,8 +33,100 @@ class GlobusUser:
             username=d['username']
         )
 
+
+class ListView(Sequence):
+    """
+    Read-only view over a list (e.g. the WED), so it can be handed around without copying.
+    """
+    __slots__ = ('_items',)
+
+    def __init__(self, items):
+        self._items = items
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ListView({self._items!r})"
+
+    def unwrap(self):
+        return self._items
+
+
+class DictView(Mapping):
+    """
+    Read-only view over a dictionary (e.g. WED_clean), so it can be handed around without copying.
+    """
+    __slots__ = ('_items',)
+
+    def __init__(self, items):
+        self._items = items
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __repr__(self):
+        return f"DictView({self._items!r})"
+
+    def unwrap(self):
+        return self._items
+
+
+class LazyIdentityMap(Mapping):
+    """
+    Mapping of Globus IDs to GlobusUser objects, built from the raw identity records on first access.
+    """
+    __slots__ = ('records', '_users')
+
+    def __init__(self, records):
+        self.records = records
+        self._users = {}
+
+    def __getitem__(self, g_id):
+        if g_id not in self._users:
+            self._users[g_id] = GlobusUser.from_dict(self.records[g_id])
+        return self._users[g_id]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+def _plain(value):
+    # Returns the plain list/dict behind a view, without copying where possible
+    if isinstance(value, (ListView, DictView)):
+        return value.unwrap()
+    if isinstance(value, (list, dict)):
+        return value
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence):
+        return list(value)
+    return value
+
+
 @dataclass
 class OrchestrationData:
+    __slots__ = ('input', 'WEP', 'WED', 'WED_clean', 'components', 'flow_id', 'run_id', 'article_name', 'identity_map',
+                 'reused_inputs', 'cached_steps')
+
     input: Dict[str, Any]
     WEP: Dict[str, Any]
     WED: Dict[str, Any]
@@ -41,19 +136,34 @@ class OrchestrationData:
     run_id: str
     article_name: str
     identity_map: Dict[str, GlobusUser]
+    reused_inputs: List[dict]       # Transfers skipped as their destinations were current
+    cached_steps: List[dict]        # LPAP steps skipped as their results were cached
 
     def to_dict(self):
-        # Use the asdict function to get a dictionary representation of the data class
-        data_dict = asdict(self)
-        
+        # The WEP/WED trees are not modified once collected, so they are shared rather than copied
+        data_dict = {
+            'input': _plain(self.input),
+            'WEP': _plain(self.WEP),
+            'WED': _plain(self.WED),
+            'WED_clean': _plain(self.WED_clean),
+            'flow_id': self.flow_id,
+            'run_id': self.run_id,
+            'article_name': self.article_name,
+            'reused_inputs': self.reused_inputs,
+            'cached_steps': self.cached_steps,
+        }
+
         # Convert Path objects to strings
-        data_dict['components'] = {k: str(v) for k, v in data_dict['components'].items()}
-        
+        data_dict['components'] = {k: str(v) for k, v in self.components.items()}
+
         # Convert GlobusUser objects to dictionaries, if they are not already dictionaries
-        data_dict['identity_map'] = {k: v.to_dict() if hasattr(v, 'to_dict') else v for k, v in data_dict['identity_map'].items()}
-        
+        if isinstance(self.identity_map, LazyIdentityMap):
+            data_dict['identity_map'] = self.identity_map.records
+        else:
+            data_dict['identity_map'] = {k: v.to_dict() if hasattr(v, 'to_dict') else v for k, v in self.identity_map.items()}
+
         return data_dict
-    
+
     @classmethod
     def from_dict(cls, d):
         return cls(
@@ -65,6 +175,7 @@ class OrchestrationData:
             flow_id=d['flow_id'],
             run_id=d['run_id'],
             article_name=d['article_name'],
-            identity_map={k: GlobusUser.from_dict(v) for k, v in d['identity_map'].items()}
+            identity_map=LazyIdentityMap(d['identity_map']),
+            reused_inputs=d.get('reused_inputs', []),
+            cached_steps=d.get('cached_steps', [])
         )
-
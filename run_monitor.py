@@ -0,0 +1,292 @@
+"""
+This module defines the run monitor used to wait on Globus flow runs. Rather than spinning on
+get_status, the monitor polls with an adaptive, jittered backoff: the delay grows while the run
+status is unchanged, and resets whenever the run moves on to a new state. Status is read from a
+pluggable status source (anything exposing get_status(run_id)), so the monitor can be pointed at
+a Gladier client, a Globus FlowsClient, or a local fake Flows service for testing.
+"""
+import asyncio
+import functools
+import heapq
+import json
+import random
+import time
+import logging
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .profiling import Profiler, NULL_PROFILER
+
+logger = logging.getLogger(__name__)
+
+# Globus run states which mean the run is still in progress
+ACTIVE_STATES = ('ACTIVE',)
+
+
+class PollBudgetExceeded(RuntimeError):
+    """ Raised when a run is still active after the monitor's poll or time budget is spent. """
+
+
+async def call_async(source, method, *args, **kwargs):
+    """
+    Calls source.<method>, awaiting source.<method>_async when the source provides a coroutine
+    version, and otherwise running the blocking call in the default executor.
+    """
+    if hasattr(source, f"{method}_async"):
+        return await getattr(source, f"{method}_async")(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(getattr(source, method), *args, **kwargs))
+
+
+@dataclass
+class BackoffPolicy:
+    initial: float = 2.0        # Delay (s) after the first poll, and after each status change
+    maximum: float = 60.0       # Upper bound (s) on the delay between polls
+    multiplier: float = 1.5     # Growth factor applied while the status is unchanged
+    jitter: float = 0.1         # Fraction of the delay randomly added/removed to spread polls
+
+    def next_delay(self, delay: Optional[float]) -> float:
+        """
+        Returns the un-jittered delay that follows delay (None starts a new backoff sequence).
+        """
+        if delay is None:
+            return self.initial
+        return min(delay * self.multiplier, self.maximum)
+
+    def apply_jitter(self, delay: float) -> float:
+        if not self.jitter:
+            return delay
+        spread = delay * self.jitter
+        return max(0.0, delay + random.uniform(-spread, spread))
+
+
+@dataclass
+class PollStats:
+    requests: int = 0
+    total_latency: float = 0.0
+    total_sleep: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    def record(self, latency: float):
+        self.requests += 1
+        self.total_latency += latency
+        self.latencies.append(latency)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'total_latency': self.total_latency,
+            'mean_latency': self.total_latency / self.requests if self.requests else 0.0,
+            'max_latency': max(self.latencies, default=0.0),
+            'total_sleep': self.total_sleep,
+        }
+
+
+class FlowsStatusSource:
+    """
+    Status source backed by a Globus FlowsClient (e.g. one authorised with FlowsScopes.run_status).
+    Gladier clients already expose get_status(run_id) and can be passed to the monitor directly.
+    """
+
+    def __init__(self, flows_client):
+        self.flows_client = flows_client
+
+    def get_status(self, run_id):
+        return self.flows_client.get_run(run_id).data
+
+
+def status_fingerprint(status) -> str:
+    # The run's details change whenever a new state is started or completed
+    return json.dumps(status.get('details'), sort_keys=True, default=str)
+
+
+class RunMonitor:
+    """
+    Polls a status source until a run leaves the ACTIVE state.
+
+    Parameters:
+    status_source: An object exposing get_status(run_id) -> dict.
+    backoff (BackoffPolicy): The polling backoff policy.
+    max_polls (int): Optional maximum number of status requests before giving up.
+    timeout (float): Optional maximum wall-clock time (s) before giving up.
+    on_poll (Callable): Optional callback, called with (status, elapsed_time) after each poll.
+    profiler (Profiler): Records each status request (see profiling).
+    on_progress (Callable): Optional callback, called with the status whenever an active run has
+    progressed (its status fingerprint changed) since the previous poll, e.g. to page new run log
+    entries while the run is in progress.
+    """
+
+    def __init__(self, status_source, backoff: BackoffPolicy = None, max_polls: int = None,
+                 timeout: float = None, on_poll: Callable = None,
+                 sleep: Callable = time.sleep, clock: Callable = time.monotonic, profiler: Profiler = None,
+                 on_progress: Callable = None):
+        self.status_source = status_source
+        self.backoff = backoff or BackoffPolicy()
+        self.max_polls = max_polls
+        self.timeout = timeout
+        self.on_poll = on_poll
+        self.sleep = sleep
+        self.clock = clock
+        self.profiler = profiler or NULL_PROFILER
+        self.on_progress = on_progress
+        self.stats = PollStats()
+
+    def poll(self, run_id):
+        """
+        Issues a single, timed status request.
+        """
+        start = self.clock()
+        with self.profiler.span('flow.poll', run_id=run_id):
+            status = self.status_source.get_status(run_id)
+        self.stats.record(self.clock() - start)
+        return status
+
+    def _check_budget(self, run_id, started):
+        if self.max_polls is not None and self.stats.requests >= self.max_polls:
+            raise PollBudgetExceeded(f"Run {run_id} still active after {self.stats.requests} polls")
+        if self.timeout is not None and self.clock() - started >= self.timeout:
+            raise PollBudgetExceeded(f"Run {run_id} still active after {self.timeout}s")
+
+    def _next_delay(self, status, fingerprint, delay):
+        # Reset the backoff whenever the run has progressed since the previous poll
+        current = status_fingerprint(status)
+        if current != fingerprint:
+            delay = None
+        return current, self.backoff.next_delay(delay)
+
+    def wait(self, run_id):
+        """
+        Blocks until the run is no longer active and returns its final status.
+        """
+        started = self.clock()
+        fingerprint, delay = None, None
+        while True:
+            status = self.poll(run_id)
+            if self.on_poll:
+                self.on_poll(status, self.clock() - started)
+            if status['status'] not in ACTIVE_STATES:
+                logger.info(f"Run {run_id} {status['status']} | {self.stats.summary()}")
+                return status
+
+            self._check_budget(run_id, started)
+            previous = fingerprint
+            fingerprint, delay = self._next_delay(status, fingerprint, delay)
+            if self.on_progress and fingerprint != previous:
+                self.on_progress(status)
+            pause = self.backoff.apply_jitter(delay)
+            self.stats.total_sleep += pause
+            self.sleep(pause)
+
+
+class AsyncRunMonitor(RunMonitor):
+    """
+    Asyncio variant of RunMonitor. Status sources exposing a coroutine get_status_async(run_id)
+    are awaited directly; blocking sources are run in the default executor. on_progress may be a
+    coroutine function, which is awaited.
+    """
+
+    def __init__(self, status_source, backoff: BackoffPolicy = None, max_polls: int = None,
+                 timeout: float = None, on_poll: Callable = None,
+                 sleep: Callable = asyncio.sleep, clock: Callable = time.monotonic, profiler: Profiler = None,
+                 on_progress: Callable = None):
+        super().__init__(status_source, backoff, max_polls, timeout, on_poll, sleep, clock, profiler, on_progress)
+
+    async def poll(self, run_id):
+        start = self.clock()
+        with self.profiler.span('flow.poll', run_id=run_id):
+            status = await call_async(self.status_source, 'get_status', run_id)
+        self.stats.record(self.clock() - start)
+        return status
+
+    async def wait(self, run_id):
+        started = self.clock()
+        fingerprint, delay = None, None
+        while True:
+            status = await self.poll(run_id)
+            if self.on_poll:
+                self.on_poll(status, self.clock() - started)
+            if status['status'] not in ACTIVE_STATES:
+                logger.info(f"Run {run_id} {status['status']} | {self.stats.summary()}")
+                return status
+
+            self._check_budget(run_id, started)
+            previous = fingerprint
+            fingerprint, delay = self._next_delay(status, fingerprint, delay)
+            if self.on_progress and fingerprint != previous:
+                result = self.on_progress(status)
+                if asyncio.iscoroutine(result):
+                    await result
+            pause = self.backoff.apply_jitter(delay)
+            self.stats.total_sleep += pause
+            await self.sleep(pause)
+
+
+class MultiRunMonitor:
+    """
+    Multiplexes status polling for many runs through a single loop. Each run keeps its own
+    backoff, and the loop always sleeps until the next run is due to be polled.
+
+    Parameters:
+    backoff (BackoffPolicy): The polling backoff policy, applied per run.
+    on_complete (Callable): Optional callback, called with (run_id, status) as each run finishes.
+    profiler (Profiler): Records each status request (see profiling).
+    """
+
+    def __init__(self, backoff: BackoffPolicy = None, on_complete: Callable = None,
+                 sleep: Callable = time.sleep, clock: Callable = time.monotonic, profiler: Profiler = None):
+        self.backoff = backoff or BackoffPolicy()
+        self.on_complete = on_complete
+        self.sleep = sleep
+        self.clock = clock
+        self.profiler = profiler or NULL_PROFILER
+        self.stats = PollStats()
+        self.queue = []         # (next_poll_time, sequence, run_id)
+        self.runs = {}          # run_id -> {'source', 'fingerprint', 'delay'}
+        self.results = {}       # run_id -> final status
+        self._sequence = 0
+
+    def add(self, run_id, status_source):
+        self.runs[run_id] = {'source': status_source, 'fingerprint': None, 'delay': None}
+        self._schedule(run_id, 0.0)
+
+    def _schedule(self, run_id, delay):
+        self._sequence += 1
+        heapq.heappush(self.queue, (self.clock() + delay, self._sequence, run_id))
+
+    def step(self):
+        """
+        Polls the next run that is due, sleeping until it is.
+        """
+        due, _, run_id = heapq.heappop(self.queue)
+        wait = due - self.clock()
+        if wait > 0:
+            self.stats.total_sleep += wait
+            self.sleep(wait)
+
+        run = self.runs[run_id]
+        start = self.clock()
+        with self.profiler.span('flow.poll', run_id=run_id):
+            status = run['source'].get_status(run_id)
+        self.stats.record(self.clock() - start)
+
+        if status['status'] not in ACTIVE_STATES:
+            self.results[run_id] = status
+            del self.runs[run_id]
+            if self.on_complete:
+                self.on_complete(run_id, status)
+            return
+
+        current = status_fingerprint(status)
+        delay = None if current != run['fingerprint'] else run['delay']
+        run['fingerprint'], run['delay'] = current, self.backoff.next_delay(delay)
+        self._schedule(run_id, self.backoff.apply_jitter(run['delay']))
+
+    def wait(self):
+        """
+        Blocks until every added run has finished, returning their final statuses.
+        """
+        while self.queue:
+            self.step()
+        logger.info(f"{len(self.results)} runs finished | {self.stats.summary()}")
+        return self.results
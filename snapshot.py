@@ -0,0 +1,163 @@
+"""
+This module defines the versioned snapshot format used to save OrchestrationData, so orchestration
+crates can be rebuilt without re-running the flow. A snapshot is a gzip-compressed stream of records
+(msgpack when available, JSON-lines otherwise):
+
+    1. header   {"format": "orchestration-snapshot", "version": 1, "encoding": ..., "WED_count": n}
+    2. data     every OrchestrationData field except the WED
+    3. WED      one record per run log entry
+
+The WED is the bulk of a long run's snapshot, and crate builds do not read it, so it is loaded
+lazily: it is only streamed from the file when it is used. identity_map entries are likewise only
+turned into GlobusUser objects when accessed.
+"""
+import gzip
+import json
+
+from collections.abc import Sequence
+from pathlib import Path
+
+from .orchestration_types import OrchestrationData, LazyIdentityMap
+
+try:
+    import msgpack
+except ImportError:     # msgpack is optional, snapshots fall back to JSON-lines
+    msgpack = None
+
+SNAPSHOT_FORMAT = "orchestration-snapshot"
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = "orchestration_data.snapshot"
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _write_records(f, encoding, records):
+    if encoding == 'msgpack':
+        packer = msgpack.Packer()
+        for record in records:
+            f.write(packer.pack(record))
+    else:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')).encode())
+            f.write(b'\n')
+
+
+def _read_records(f, encoding):
+    if encoding == 'msgpack':
+        yield from msgpack.Unpacker(f, raw=False)
+    else:
+        for line in f:
+            yield json.loads(line)
+
+
+def write_snapshot(data: OrchestrationData, path=DEFAULT_SNAPSHOT_PATH, encoding=None, compresslevel=1):
+    """
+    Writes OrchestrationData to a snapshot file.
+
+    Parameters:
+    encoding (str): 'msgpack' or 'jsonl' (defaults to msgpack when it is installed).
+    """
+    encoding = encoding or ('msgpack' if msgpack else 'jsonl')
+    if encoding == 'msgpack' and msgpack is None:
+        raise RuntimeError("msgpack is not installed, use the 'jsonl' snapshot encoding")
+
+    data_dict = data.to_dict()
+    WED = data_dict.pop('WED')
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'encoding': encoding,
+        'WED_count': len(WED),
+    }
+    # The header is always JSON, so the encoding can be read before the rest of the stream
+    with gzip.open(path, 'wb', compresslevel=compresslevel) as f:
+        f.write(json.dumps(header).encode() + b'\n')
+        _write_records(f, encoding, [data_dict])
+        _write_records(f, encoding, WED)
+    return Path(path)
+
+
+def _open_snapshot(path):
+    f = gzip.open(path, 'rb')
+    header = json.loads(f.readline())
+    if header.get('format') != SNAPSHOT_FORMAT:
+        f.close()
+        raise ValueError(f"{path} is not an orchestration snapshot")
+    if header['version'] > SNAPSHOT_VERSION:
+        f.close()
+        raise ValueError(f"{path} uses snapshot version {header['version']}, "
+                         f"this reader supports up to {SNAPSHOT_VERSION}")
+    return f, header
+
+
+class LazyWED(Sequence):
+    """
+    Read-only view of a snapshot's WED. Iteration streams entries from the file; indexing
+    materializes the list once.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self._entries = None
+
+    def __len__(self):
+        return self.header['WED_count']
+
+    def __iter__(self):
+        if self._entries is not None:
+            yield from self._entries
+            return
+        f, header = _open_snapshot(self.path)
+        with f:
+            records = _read_records(f, header['encoding'])
+            next(records)   # Skip the data record
+            yield from records
+
+    def __getitem__(self, index):
+        if self._entries is None:
+            self._entries = list(iter(self))
+        return self._entries[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"LazyWED({self.path!r}, entries={len(self)})"
+
+
+def read_snapshot(path=DEFAULT_SNAPSHOT_PATH) -> OrchestrationData:
+    """
+    Loads OrchestrationData from a snapshot, leaving the WED on disk until it is used.
+    """
+    f, header = _open_snapshot(path)
+    with f:
+        data_dict = next(_read_records(f, header['encoding']))
+
+    return OrchestrationData(
+        input=data_dict['input'],
+        WEP=data_dict['WEP'],
+        WED=LazyWED(path, header),
+        WED_clean=data_dict['WED_clean'],
+        components={k: Path(v) for k, v in data_dict['components'].items()},
+        flow_id=data_dict['flow_id'],
+        run_id=data_dict['run_id'],
+        article_name=data_dict['article_name'],
+        identity_map=LazyIdentityMap(data_dict['identity_map']),
+        reused_inputs=data_dict.get('reused_inputs', []),
+        cached_steps=data_dict.get('cached_steps', [])
+    )
+
+
+def is_snapshot(path) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def load_orchestration_data(path) -> OrchestrationData:
+    """
+    Loads OrchestrationData from either a snapshot or a legacy orchestration_data.json file.
+    """
+    if is_snapshot(path):
+        return read_snapshot(path)
+    with open(path, "r") as json_file:
+        return OrchestrationData.from_dict(json.load(json_file))
@@ -0,0 +1,221 @@
+"""
+This module memoizes LPAP step results across runs. LPAPs such as fastText and langDetect are
+deterministic for a given input and tool revision, so re-running the flow on unchanged data need
+not execute them again. A result is keyed by:
+
+    - the SHA-256 checksums of the step's input files,
+    - the tool's flow definition (including its ActionUrl),
+    - the LPAP version ('version' or 'softwareVersion'): for a recorded result, the one its
+      sub-crate reports on the root data entity; for a lookup, the one the LPAP's action provider
+      reports now (see introspect_version), so results of an upgraded LPAP are never reused.
+
+Steps whose LPAP reports no version are not cached. Input files live on the LPAP endpoints, where
+they cannot be hashed before the run. Their checksums are taken from the copies carried in the
+LPAP's sub-crate (matched by their path, see subcrate_ingest.find_path), and tied to the Globus
+listing of the delivered file (see transfer_manifest): an input delivered by a transfer which is
+skipped as current has the checksum recorded for that listing. Results older than max_age are not
+reused.
+
+Each result keeps a copy (hardlinked where possible) of the step's sub-crate, which the
+orchestration crate ingests in place of a new one, marking the step as cached.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import logging
+
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .blob_store import file_digest
+from .flow_builder import tool_io, tool_name, tool_states
+from .subcrate_ingest import find_path, ingest_subcrate, read_crate_metadata
+from .transfer_manifest import TransferManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".orchestration_logic" / "step_cache"
+DEFAULT_MAX_AGE = 7 * 24 * 3600     # Seconds a result is reused for
+VERSION_PROPERTIES = ('version', 'softwareVersion')
+INTROSPECT_TIMEOUT = 5.0            # Seconds to wait for an action provider's description
+
+
+def reported_version(entity) -> Optional[str]:
+    if not isinstance(entity, dict):
+        return None
+    return next((str(entity[name]) for name in VERSION_PROPERTIES if entity.get(name) is not None), None)
+
+
+def lpap_version(crate_path) -> Optional[str]:
+    # The LPAP version reported on the root data entity of its sub-crate
+    return reported_version(read_crate_metadata(crate_path))
+
+
+def action_url(tool) -> Optional[str]:
+    return tool_states(tool)[tool_name(tool)].get('ActionUrl')
+
+
+def introspect_version(tool, timeout=INTROSPECT_TIMEOUT) -> Optional[str]:
+    """
+    Returns the version an LPAP's action provider currently reports in its description (the
+    document served at its ActionUrl), or None if it reports none or cannot be reached.
+    """
+    from urllib.request import urlopen
+
+    url = action_url(tool)
+    if not url:
+        return None
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            description = json.load(response)
+    except (OSError, ValueError) as e:
+        logger.info(f"Could not read the version of {tool_name(tool)} from {url}: {e}")
+        return None
+    return reported_version(description)
+
+
+def step_key(tool, inputs: Dict[str, str], version) -> str:
+    """
+    Returns the cache key of a tool's result, given the checksums of its input files (by flow
+    input path) and the LPAP version.
+    """
+    document = {
+        'flow_definition': tool.flow_definition,
+        'action_url': action_url(tool),
+        'inputs': inputs,
+        'version': version,
+    }
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+
+class StepCache:
+    """
+    A directory of cached LPAP step results: index.json, and a sub-crate copy per result in
+    subcrates/<key>.
+
+    Parameters:
+    directory (Path): The cache location.
+    max_age (float): Seconds a result is reused for (None: no limit).
+    version_source (Callable): version_source(tool) returns the version the tool's LPAP runs now
+    (None if unknown, which makes the step uncacheable).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE, clock=time.time,
+                 version_source: Callable = introspect_version):
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.json"
+        self.max_age = max_age
+        self.clock = clock
+        self.version_source = version_source
+        self.lock = threading.Lock()
+        self.index = self._load()
+        self.entries: Dict[str, dict] = self.index['entries']         # key -> result
+        self.checksums: Dict[str, dict] = self.index['checksums']     # '<endpoint>:<path>' -> {listing, sha256}
+
+    def _load(self) -> dict:
+        index = {'entries': {}, 'checksums': {}}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, "r") as f:
+                    stored = json.load(f)
+                index.update((name, stored[name]) for name in index if name in stored)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable step cache index {self.index_path}: {e}")
+        return index
+
+    def input_checksums(self, tool, delivered) -> Optional[Dict[str, str]]:
+        """
+        Returns the checksums of a tool's input files by flow input path, from the recorded
+        checksum of each delivered file's listing (None if any is unknown, or the tool reads no
+        delivered files).
+        """
+        reads, _ = tool_io(tool)
+        inputs = {}
+        for path in sorted(reads & delivered.keys()):
+            item, entry = delivered[path]
+            known = self.checksums.get(TransferManifest.key(item))
+            if known is None or known['listing'] != entry['destination']:
+                return None
+            inputs[path] = known['sha256']
+        return inputs or None
+
+    def lookup(self, tool, delivered) -> Optional[dict]:
+        """
+        Returns the cached result of a tool for its current inputs (see elide_transfers), as
+        {tool, key, run_id, action_id, version, inputs, subcrate, recorded}, or None.
+        """
+        inputs = self.input_checksums(tool, delivered)
+        if inputs is None:
+            return None
+        version = self.version_source(tool)
+        if version is None:
+            logger.info(f"Not reusing a result of {tool_name(tool)}: its LPAP reports no version")
+            return None
+        key = step_key(tool, inputs, version)
+        entry = self.entries.get(key)
+        if entry is None or not os.path.isdir(entry['subcrate']):
+            return None
+        if self.max_age is not None and self.clock() - entry['recorded'] > self.max_age:
+            logger.info(f"Cached result of {tool_name(tool)} from run {entry['run_id']} has expired")
+            return None
+        return dict(entry, tool=tool_name(tool), key=key)
+
+    def record(self, tool, subcrate_path, delivered, run_id, action_id) -> Optional[dict]:
+        """
+        Caches the result of a step which has run: its input files are found (by their path, see
+        subcrate_ingest.find_path) and hashed in its sub-crate, and the sub-crate is copied into the
+        cache. Steps whose sub-crate reports no LPAP version, or does not carry each delivered
+        input as a file of its own, are not cached.
+
+        Parameters:
+        delivered (dict): The tool's input paths -> (item, manifest entry) of the files delivered
+        to it (see transfer_manifest.deliveries).
+        """
+        version = lpap_version(subcrate_path)
+        if version is None:
+            logger.info(f"Not caching {tool_name(tool)}: its sub-crate reports no LPAP version")
+            return None
+
+        reads, _ = tool_io(tool)
+        inputs, listings, found = {}, {}, set()
+        for path in sorted(reads & delivered.keys()):
+            item, entry = delivered[path]
+            local = find_path(subcrate_path, item['destination_path'])
+            if local is None or local in found:
+                logger.info(f"Not caching {tool_name(tool)}: its sub-crate does not include {item['destination_path']}")
+                return None
+            found.add(local)
+            inputs[path] = file_digest(local)
+            listings[TransferManifest.key(item)] = {'listing': entry['destination'], 'sha256': inputs[path]}
+        if not inputs:
+            return None
+
+        key = step_key(tool, inputs, version)
+        destination = self.directory / "subcrates" / key
+        with self.lock:
+            if destination.exists():
+                shutil.rmtree(destination)     # Replaced by the latest run's sub-crate
+            ingest_subcrate(subcrate_path, destination, mode='hardlink')    # Leaves the crate intact
+            now = self.clock()
+            self.checksums.update(listings)
+            self.entries[key] = {
+                'run_id': run_id,
+                'action_id': action_id,
+                'version': version,
+                'inputs': inputs,
+                'subcrate': str(destination),
+                'recorded': now,
+            }
+        logger.info(f"Cached the result of {tool_name(tool)} from run {run_id}")
+        return dict(self.entries[key], tool=tool_name(tool), key=key)
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with self.lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,126 @@
+"""
+This module ingests LPAP sub-crates into the orchestration crate directory without rewriting their
+contents where possible. Sub-crates are moved (rename), hardlinked or reflinked into place, and only
+copied when the source and destination are on different filesystems. Because the ingested tree
+already sits at its final location, ROCrate.write recognises the files as the same and skips them.
+"""
+import errno
+import json
+import os
+import re
+import shutil
+import logging
+
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INGEST_MODES = ('auto', 'rename', 'hardlink', 'reflink', 'copy')
+FICLONE = 0x40049409    # Linux ioctl for copy-on-write file clones (btrfs, xfs, ...)
+
+
+def read_crate_metadata(crate_path) -> dict:
+    """
+    Returns the root data entity of a sub-crate's ro-crate-metadata.json (empty if unavailable).
+    """
+    metadata_path = Path(crate_path) / "ro-crate-metadata.json"
+    try:
+        with open(metadata_path, "r") as f:
+            graph = json.load(f).get('@graph', [])
+    except (OSError, ValueError):
+        return {}
+    root_id = next((entity.get('about', {}).get('@id') for entity in graph
+                    if entity.get('@id') == 'ro-crate-metadata.json'), './')
+    return next((entity for entity in graph if entity.get('@id') == root_id), {})
+
+
+def subcrate_name(crate_path, default) -> str:
+    """
+    Names a sub-crate directory after the name of its root data entity.
+    """
+    name = read_crate_metadata(crate_path).get('name')
+    if not isinstance(name, str) or not name.strip():
+        return default
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name.strip())
+
+
+def find_file(directory, name) -> Optional[Path]:
+    # The first file called name under directory
+    for root, _, files in os.walk(directory):
+        if name in files:
+            return Path(root) / name
+    return None
+
+
+def find_path(directory, path) -> Optional[Path]:
+    """
+    Returns the file under directory whose path relative to it is the longest trailing part of
+    path (e.g. input/data.txt for /home/lpap/input/data.txt), or None if no file matches. Unlike
+    find_file, files with the same name in other directories are not matched.
+    """
+    parts = Path(path).parts
+    best = None
+    for root, _, files in os.walk(directory):
+        relative = Path(root).relative_to(directory).parts
+        for name in files:
+            candidate = relative + (name,)
+            if len(candidate) <= len(parts) and parts[-len(candidate):] == candidate \
+                    and (best is None or len(candidate) > len(best)):
+                best = candidate
+    return Path(directory).joinpath(*best) if best else None
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _link_tree(src, dst, link):
+    # Recreates the directory tree at dst, linking each file, and copying if linking fails
+    for root, dirs, files in os.walk(src):
+        target = Path(dst) / Path(root).relative_to(src)
+        target.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            try:
+                link(os.path.join(root, name), target / name)
+            except OSError:
+                shutil.copy2(os.path.join(root, name), target / name)
+
+
+def ingest_subcrate(src, dst, mode='auto') -> Path:
+    """
+    Places the sub-crate at src at dst, returning dst.
+
+    Parameters:
+    src (Path): The received sub-crate directory.
+    dst (Path): The sub-crate's location in the orchestration crate directory.
+    mode (str): 'rename' moves the sub-crate, 'hardlink' and 'reflink' link each file (leaving
+    src intact), 'copy' copies it, and 'auto' renames, falling back to a copy across filesystems.
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode {mode}, expected one of {INGEST_MODES}")
+    dst = Path(dst)
+    if dst.exists():
+        raise FileExistsError(f"Sub-crate destination {dst} already exists")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+
+    if mode in ('auto', 'rename'):
+        try:
+            os.rename(src, dst)
+            return dst
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            logger.info(f"{src} is on a different filesystem to {dst}, copying instead")
+    elif mode == 'hardlink':
+        _link_tree(src, dst, os.link)
+        return dst
+    elif mode == 'reflink':
+        _link_tree(src, dst, _reflink)
+        return dst
+
+    shutil.copytree(src, dst)
+    return dst
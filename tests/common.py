@@ -0,0 +1,85 @@
+"""
+Shared helpers for the tests. The orchestration modules use package-relative imports, so the tests
+import them through the repository's package name (as the benchmarks do).
+"""
+import importlib
+import sys
+
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def import_module(name):
+    if str(REPO.parent) not in sys.path:
+        sys.path.insert(0, str(REPO.parent))
+    return importlib.import_module(f"{REPO.name}.{name}")
+
+
+flow_builder = import_module("flow_builder")
+
+
+class FakeClock:
+    """
+    A manual clock for monitors and caches: sleep (or asleep) advances it instantly, and records
+    each pause.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def asleep(self, seconds):
+        self.sleep(seconds)
+
+
+def transfer_tool(name, source, destination, source_path, destination_path):
+    """
+    A Gladier-style transfer tool moving the flow input path p.<source_path> on endpoint
+    <source> to p.<destination_path> on <destination>.
+    """
+    state = {
+        'Type': 'Action',
+        'ActionUrl': flow_builder.TRANSFER_ACTION_URL,
+        'Parameters': {
+            'source_endpoint_id.$': f"$.input.endpoints.{source}",
+            'destination_endpoint_id.$': f"$.input.endpoints.{destination}",
+            'transfer_items': [{
+                'source_path.$': f"$.input.p.{source_path}",
+                'destination_path.$': f"$.input.p.{destination_path}",
+                'recursive': False,
+            }],
+        },
+        'ResultPath': f"$.{name}_result",
+        'End': True,
+    }
+    return type(name, (), {
+        'flow_definition': {'StartAt': name, 'States': {name: state}},
+        'required_input': {'endpoints': {source, destination}},
+    })
+
+
+def lpap_tool(name, reads, writes=()):
+    """
+    A Gladier-style LPAP tool reading the flow input paths p.<reads> and writing p.<writes>.
+    """
+    reads = [reads] if isinstance(reads, str) else list(reads)
+    state = {
+        'Type': 'Action',
+        'ActionUrl': f"https://lpap.example.org/{name}",
+        'Parameters': {f"{path}.$": f"$.input.p.{path}" for path in reads},
+        'ResultPath': f"$.{name}_result",
+        'End': True,
+    }
+    return type(name, (), {
+        'flow_definition': {'StartAt': name, 'States': {name: state}},
+        'required_input': {},
+        'produced_output': {'p': set(writes)} if writes else {},
+    })
@@ -0,0 +1,113 @@
+import itertools
+import json
+import logging
+
+import pytest
+
+from common import import_module
+
+batch_runner = import_module("batch_runner")
+mock_globus = import_module("mock_globus")
+orchestration_types = import_module("orchestration_types")
+run_monitor = import_module("run_monitor")
+
+FAST = run_monitor.BackoffPolicy(initial=0.001, maximum=0.001, jitter=0)
+
+
+def manifest(*runs):
+    return {
+        'defaults': {
+            'endpoints': {'DS_UUID': 'ds'},
+            'data_paths': {'data_path': '/data/default.txt'},
+            'intermediate_paths': {'DS_FT_dest': '/ft/default.txt'},
+            'LP_configuration': {'article_name': '/articles/lid'},
+            'run_label': 'LiD',
+        },
+        'runs': list(runs),
+    }
+
+
+def test_runs_are_merged_over_the_defaults():
+    runs = batch_runner.expand_manifest(manifest(
+        {'name': 'a', 'data_paths': {'data_path': '/data/a.txt'}, 'intermediate_paths': {'DS_FT_dest': '/ft/a.txt'}},
+        {'intermediate_paths': {'DS_FT_dest': '/ft/b.txt'}, 'run_tags': ['b']},
+    ))
+
+    assert [run['name'] for run in runs] == ['a', 'run_1']
+    assert [run['data_paths']['data_path'] for run in runs] == ['/data/a.txt', '/data/default.txt']
+    assert [run['LP_configuration']['article_name'] for run in runs] == ['/articles/lid/a', '/articles/lid/run_1']
+    assert [run['run_label'] for run in runs] == ['LiD (a)', 'LiD (run_1)']
+    assert runs[1]['run_tags'] == ['b'] and 'run_tags' not in runs[0]
+
+
+def test_run_names_must_be_unique(tmp_path):
+    path = tmp_path / "batch.json"
+    path.write_text(json.dumps(manifest({'name': 'a'}, {'name': 'a'})))
+
+    with pytest.raises(ValueError, match='Duplicate run name a'):
+        batch_runner.load_manifest(path)
+
+
+def test_runs_sharing_intermediate_paths_are_reported(caplog):
+    with caplog.at_level(logging.WARNING):
+        batch_runner.expand_manifest(manifest({'name': 'a'}, {'name': 'b'}))
+
+    assert "/ft/default.txt" in caplog.text
+
+
+class FakeRun:
+    """
+    A flow run on a FakeFlowsService, collating minimal orchestration data.
+    """
+    ids = itertools.count()
+
+    def __init__(self, config, service):
+        self.config = config
+        self.status_source = self.client = service
+
+    def run(self):
+        if self.config.get('fail_start'):
+            raise RuntimeError("Flow deployment refused")
+        self.run_id = f"run-{next(self.ids)}"
+        self.status_source.start_run(self.run_id)
+
+    def collect_WED(self):
+        pass
+
+    def monitor_transfer(self):
+        pass
+
+    def get_data(self):
+        return orchestration_types.OrchestrationData(
+            input={'input': {}}, WEP={'StartAt': 'A', 'States': {}}, WED=[], WED_clean={}, components={},
+            flow_id='flow', run_id=self.run_id, article_name=self.config['LP_configuration']['article_name'],
+            identity_map={}, reused_inputs=[], cached_steps=[])
+
+
+def test_failed_runs_are_reported_without_stopping_the_batch(tmp_path):
+    service = mock_globus.FakeFlowsService(run_duration=0.01, final_status='FAILED')
+    runs = batch_runner.expand_manifest(manifest({'name': 'a'}, {'name': 'b'}))
+    runs[1]['fail_start'] = True
+
+    results = batch_runner.BatchRunner(runs, tmp_path, max_workers=2, crate_workers=1, backoff=FAST,
+                                       flow_factory=lambda config: FakeRun(config, service)).run()
+
+    assert results['a']['status'] == 'FAILED'
+    assert results['a']['crate_directory'] is None
+    assert results['b'] == {'run_id': None, 'status': None, 'crate_directory': None,
+                            'error': "Flow deployment refused"}
+
+
+def test_each_successful_run_gets_its_own_crate(tmp_path):
+    pytest.importorskip("rocrate")
+    pytest.importorskip("graphviz")     # Each crate build lays out its flow diagram
+    service = mock_globus.FakeFlowsService(run_duration=0.01)
+    runs = batch_runner.expand_manifest(manifest({'name': 'a'}, {'name': 'b'}))
+
+    results = batch_runner.BatchRunner(runs, tmp_path, max_workers=2, crate_workers=1, backoff=FAST,
+                                       flow_factory=lambda config: FakeRun(config, service)).run()
+
+    assert {name: result['status'] for name, result in results.items()} == {'a': 'SUCCEEDED', 'b': 'SUCCEEDED'}
+    for name in ('a', 'b'):
+        assert results[name]['crate_directory'] == str(tmp_path / name)
+        assert (tmp_path / name / "ro-crate-metadata.json").exists()
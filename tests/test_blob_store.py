@@ -0,0 +1,66 @@
+import os
+import stat
+
+from common import import_module
+
+blob_store = import_module("blob_store")
+
+
+def test_a_callers_file_is_copied_into_the_store(tmp_path):
+    store = blob_store.BlobStore(tmp_path / "store")
+    source = tmp_path / "component.py"
+    source.write_text("print('hello')")
+
+    digest = store.put_file(source)
+    blob = store.blob_path(digest)
+
+    assert blob.read_text() == "print('hello')"
+    assert not source.samefile(blob)
+    assert os.stat(source).st_nlink == 1
+    assert os.stat(source).st_mode & stat.S_IWUSR
+    assert not os.stat(blob).st_mode & stat.S_IWUSR
+
+
+def test_an_owned_file_is_hardlinked_into_the_store(tmp_path):
+    store = blob_store.BlobStore(tmp_path / "store")
+    owned = tmp_path / "subcrate" / "data.txt"
+    owned.parent.mkdir()
+    owned.write_text("abc")
+
+    digest = store.put_file(owned, owned=True)
+
+    assert owned.samefile(store.blob_path(digest))
+
+
+def test_identical_payloads_are_stored_once(tmp_path):
+    store = blob_store.BlobStore(tmp_path / "store")
+
+    digests = {store.put_bytes(b"same") for _ in range(3)}
+
+    assert len(digests) == 1
+    assert (store.stored, store.reused) == (1, 2)
+
+
+def test_a_blob_is_linked_into_a_crate(tmp_path):
+    store = blob_store.BlobStore(tmp_path / "store")
+    digest = store.put_bytes(b"payload")
+
+    first = store.link(digest, tmp_path / "crate-1" / "WEP.json")
+    second = store.link(digest, tmp_path / "crate-2" / "WEP.json")
+
+    assert first.samefile(second)
+    assert first.read_bytes() == b"payload"
+
+
+def test_gc_removes_blobs_no_crate_refers_to(tmp_path):
+    store = blob_store.BlobStore(tmp_path / "store")
+    kept = store.put_bytes(b"kept")
+    dropped = store.put_bytes(b"dropped")
+    (tmp_path / "live").mkdir()
+    store.record(tmp_path / "live", [kept])
+    store.record(tmp_path / "deleted", [dropped])
+
+    assert store.gc() == 1
+    assert store.blob_path(kept).exists()
+    assert not store.blob_path(dropped).exists()
+    assert list(store._load_refs()) == [str((tmp_path / "live").resolve())]
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from common import import_module
+
+checkpoint = import_module("checkpoint")
+
+
+def page(journal, entries, marker, offset, **kwargs):
+    journal.record('WED_page', entries=entries, marker=marker, offset=offset, **kwargs)
+
+
+def test_the_journal_folds_into_the_state_to_resume_from(tmp_path):
+    journal = checkpoint.Journal('run-1', tmp_path, clock=lambda: 0)
+    journal.record('submitted', run_id='run-1', flow_id='flow-1')
+    page(journal, [{'code': 'A'}], 'm1', 1, complete=False)
+    journal.record('transfer', label='x', task={'task_id': 't1'})
+    journal.record('ingested', key='action-0', path='/crate/action-0')
+
+    state = checkpoint.Journal('run-1', tmp_path).state()
+
+    assert state['phases'] == {'submitted', 'WED_page', 'transfer', 'ingested'}
+    assert (state['run_id'], state['flow_id']) == ('run-1', 'flow-1')
+    assert (state['WED'], state['marker'], state['offset']) == ([{'code': 'A'}], 'm1', 1)
+    assert not state['WED_complete']
+    assert state['tasks'] == {'x': {'task_id': 't1'}}
+    assert state['ingested'] == {'action-0': '/crate/action-0'}
+
+
+def test_a_torn_checkpoint_is_ignored(tmp_path):
+    journal = checkpoint.Journal('run-1', tmp_path)
+    journal.record('submitted', run_id='run-1')
+    with open(journal.path, "a") as f:
+        f.write('{"phase": "run_comp')     # The process died mid-write
+
+    journal.record('crate_complete')
+
+    assert [record['phase'] for record in journal.records()] == ['submitted', 'crate_complete']
+
+
+def test_the_last_page_completes_the_run_log(tmp_path):
+    journal = checkpoint.Journal('run-1', tmp_path)
+    page(journal, [{'code': 'A'}], 'm1', 1, complete=False)
+    page(journal, [{'code': 'B'}], None, 0, complete=True)
+
+    state = journal.state()
+
+    assert state['WED'] == [{'code': 'A'}, {'code': 'B'}]
+    assert (state['marker'], state['WED_complete']) == (None, True)
+
+
+def test_pages_journaled_without_the_complete_flag_end_at_the_last_marker(tmp_path):
+    journal = checkpoint.Journal('run-1', tmp_path)
+    page(journal, [{'code': 'A'}], 'm1', 1)
+    assert not journal.state()['WED_complete']
+
+    page(journal, [{'code': 'B'}], None, 0)
+    assert journal.state()['WED_complete']
+
+
+def test_resume_without_a_submission_fails(tmp_path):
+    with pytest.raises(ValueError):
+        checkpoint.resume('run-1', tmp_path)
+
+
+def test_a_run_resumed_mid_log_has_the_full_log(tmp_path):
+    pytest.importorskip("globus_sdk")     # Flow requests the Transfer and Auth scopes
+    mock_globus = import_module("mock_globus")
+    flow = import_module("flow")
+    flow_registry = import_module("flow_registry")
+    identity_cache = import_module("identity_cache")
+    run_monitor = import_module("run_monitor")
+    flow_builder = import_module("flow_builder")
+
+    tools = mock_globus.synthetic_tools(4)
+    WED = mock_globus.synthetic_WED(len(tools), step_seconds=1,
+                                    state_names=[flow_builder.tool_name(tool) for tool in tools])
+    stack = mock_globus.MockGlobus(WED, time_scale=0)
+    stack.flows.page_size = 3
+    journal_dir = tmp_path / "journal"
+
+    def options():
+        return {'flow_registry': flow_registry.FlowRegistry(None),
+                'identity_cache': identity_cache.IdentityCache(path=None),
+                'poll_backoff': run_monitor.BackoffPolicy(0.001, 0.001),
+                **stack.flow_kwargs(tools)}
+
+    first = flow.Flow(journal_dir=journal_dir, **options())
+    first.run()
+    first.monitor_run()
+
+    # The process dies after journaling the first page of the run log
+    journal = checkpoint.Journal(first.run_id, journal_dir)
+    lines = journal.path.read_text().splitlines()
+    kept = [line for line in lines if json.loads(line)['phase'] == 'submitted']
+    kept.append(next(line for line in lines if json.loads(line)['phase'] == 'WED_page'))
+    journal.path.write_text("\n".join(kept) + "\n")
+    assert not journal.state()['WED_complete']
+
+    resumed = checkpoint.resume(first.run_id, journal_dir, **options())
+    resumed.monitor_run()
+
+    assert resumed.WED == WED
+    assert list(resumed.clean_WED()) == list(first.clean_WED())
+    assert journal.state()['WED_complete']
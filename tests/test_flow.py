@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from common import import_module, lpap_tool, transfer_tool
+
+flow = import_module("flow")
+mock_globus = import_module("mock_globus")
+flow_registry = import_module("flow_registry")
+identity_cache = import_module("identity_cache")
+
+TOOLS = [transfer_tool('A_Transfer', 'ds', 'ft', 'a', 'a2'), lpap_tool('FT', 'a2', ['o'])]
+INPUT = {'endpoints': {'ds': 'DS', 'ft': 'FT'}, 'p': {'a': '/d/a', 'a2': '/d/a2', 'unused': '/d/x'}}
+
+
+def make_flow(tools=TOOLS, config=None, **kwargs):
+    stack = mock_globus.MockGlobus([], time_scale=0)
+    return flow.Flow(config={'input': INPUT} if config is None else config, journal_dir=None,
+                     flow_registry=flow_registry.FlowRegistry(None),
+                     identity_cache=identity_cache.IdentityCache(path=None),
+                     **stack.flow_kwargs(tools), **kwargs)
+
+
+def test_the_flow_input_holds_only_what_the_tools_use():
+    assert flow.build_flow_input(TOOLS, {'input': INPUT}) == {'input': {
+        'endpoints': {'ds': 'DS', 'ft': 'FT'},
+        'p': {'a': '/d/a', 'a2': '/d/a2'},
+    }}
+
+
+def test_every_missing_input_is_reported_at_once():
+    config = {'input': {'endpoints': {'ds': 'DS'}, 'p': {'a': '/d/a'}}}
+
+    with pytest.raises(flow.FlowInputError) as error:
+        flow.build_flow_input(TOOLS, config)
+
+    assert str(error.value).endswith("$.input.endpoints.ft, $.input.p.a2")
+
+
+def test_tool_defaults_fill_in_unconfigured_input():
+    tool = type('Synced', (lpap_tool('Synced', 'a'),), {'flow_input': {'transfer_sync_level': 'checksum'}})
+
+    flow_input = flow.build_flow_input([tool], {'input': {'p': {'a': '/d/a'}, 'transfer_sync_level': 'mtime'}})
+    default_input = flow.build_flow_input([tool], {'input': {'p': {'a': '/d/a'}}})
+
+    assert flow_input['input']['transfer_sync_level'] == 'mtime'
+    assert default_input['input']['transfer_sync_level'] == 'checksum'
+
+
+def test_tools_are_resolved_by_registered_name_or_import_path():
+    tool = flow.register_tool(lpap_tool('Registered', 'a'))
+
+    assert flow.resolve_tool('Registered') is tool
+    assert flow.resolve_tool('collections:OrderedDict').__name__ == 'OrderedDict'
+    assert flow.resolve_tool(tool) is tool
+    with pytest.raises(ValueError, match='Unknown Gladier tool'):
+        flow.resolve_tool('NoSuchTool')
+
+
+def test_a_flow_is_configured_from_a_file(tmp_path):
+    path = tmp_path / "flow.json"
+    path.write_text(json.dumps({'input': INPUT, 'run_label': 'From file', 'run_tags': ['t']}))
+    stack = mock_globus.MockGlobus([], time_scale=0)
+
+    configured = flow.Flow.from_config(path, journal_dir=None, flow_registry=flow_registry.FlowRegistry(None),
+                                       identity_cache=identity_cache.IdentityCache(path=None), **stack.flow_kwargs(TOOLS))
+
+    assert (configured.run_label, configured.run_tags) == ('From file', ['t'])
+    assert configured.get_input()['input']['p'] == {'a': '/d/a', 'a2': '/d/a2'}
+
+
+def test_an_incomplete_configuration_fails_before_contacting_globus():
+    with pytest.raises(flow.FlowInputError):
+        make_flow(config={'input': {}})
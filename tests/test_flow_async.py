@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from common import import_module
+
+flow = import_module("flow")
+mock_globus = import_module("mock_globus")
+flow_builder = import_module("flow_builder")
+flow_registry = import_module("flow_registry")
+identity_cache = import_module("identity_cache")
+run_monitor = import_module("run_monitor")
+
+FAST = run_monitor.BackoffPolicy(initial=0.001, maximum=0.001, jitter=0)
+
+
+class PendingTransfers:
+    # A transfer client whose transfers never finish
+    def task_list(self, filter=None):
+        return [{'task_id': f"task-{label}", 'label': label, 'status': 'ACTIVE'} for label in filter.get('label', ())]
+
+
+class CancellableFlows:
+    def __init__(self):
+        self.cancelled = []
+
+    def cancel_run(self, run_id):
+        self.cancelled.append(run_id)
+
+
+def make_flow(stack, n_steps=4, **kwargs):
+    tools = mock_globus.synthetic_tools(n_steps)
+    options = {**stack.flow_kwargs(tools), **kwargs}
+    return flow.Flow(config={'input': {'LP_configuration': {'article_name': 'article'}}}, journal_dir=None,
+                     flow_registry=flow_registry.FlowRegistry(None),
+                     identity_cache=identity_cache.IdentityCache(path=None), poll_backoff=FAST, **options)
+
+
+def stalled_flow(**kwargs):
+    # A flow whose run has finished, waiting on a sub-crate transfer which never lands
+    stalled = make_flow(mock_globus.MockGlobus([], time_scale=0), transfer_client=PendingTransfers(), **kwargs)
+    stalled.run_id = 'run-0'
+    stalled.WED_clean = {'Step_1': {'action_id': 'action-1'}}
+    return stalled
+
+
+def test_the_synchronous_api_refuses_to_run_inside_an_event_loop():
+    async def main():
+        with pytest.raises(RuntimeError, match='await the \\*_async methods'):
+            flow.run_sync(asyncio.sleep(0))
+
+    asyncio.run(main())
+
+
+def test_a_step_exceeding_its_timeout_raises():
+    stalled = stalled_flow(step_timeouts={'monitor_transfer': 0.05})
+
+    with pytest.raises(flow.StepTimeoutError, match='monitor_transfer'):
+        stalled.monitor_transfer()
+    assert not stalled.tasks
+
+
+def test_cancelling_stops_the_steps_in_progress_and_the_run():
+    flows_client = CancellableFlows()
+    stalled = stalled_flow(flows_status_client=flows_client)
+
+    async def main():
+        waiting = asyncio.ensure_future(stalled.monitor_transfer_async())
+        await asyncio.sleep(0.01)
+        await stalled.cancel_async()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert flows_client.cancelled == ['run-0']
+
+
+def test_supervise_limits_the_flows_orchestrated_at_once():
+    running, peak = set(), []
+
+    class Orchestrated:
+        def __init__(self, name):
+            self.name = name
+
+        async def orchestrate_async(self):
+            running.add(self.name)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.discard(self.name)
+            if self.name == 'bad':
+                raise ValueError(self.name)
+            return self.name
+
+    results = asyncio.run(flow.supervise([Orchestrated(name) for name in ('a', 'bad', 'c', 'd')], max_concurrent=2))
+
+    assert results[::2] == ['a', 'c'] and results[3] == 'd'
+    assert isinstance(results[1], ValueError)
+    assert max(peak) == 2
+
+
+def test_runs_are_orchestrated_concurrently_on_one_event_loop():
+    pytest.importorskip("globus_sdk")     # Flow requests the Transfer and Auth scopes
+    tools = mock_globus.synthetic_tools(4)
+    WED = mock_globus.synthetic_WED(4, step_seconds=0.01, state_names=[flow_builder.tool_name(tool) for tool in tools])
+    stack = mock_globus.MockGlobus(WED)
+    flows = [make_flow(stack) for _ in range(3)]
+
+    results = asyncio.run(flow.supervise(flows))
+
+    assert [data.run_id for data in results] == ['run-0', 'run-1', 'run-2']
+    assert all(list(data.WED_clean) == [flow_builder.tool_name(tool) for tool in tools] for data in results)
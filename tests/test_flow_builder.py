@@ -0,0 +1,96 @@
+from common import import_module, lpap_tool, transfer_tool
+
+flow_builder = import_module("flow_builder")
+
+tool_name = flow_builder.tool_name
+
+
+def lid_tools():
+    # The LiD flow's shape: two LPAP branches from the datastore, joined by the statistics LPAP
+    return [
+        transfer_tool('DS_FT_Transfer', 'ds', 'ft', 'data', 'ft_data'),
+        lpap_tool('fastText', 'ft_data', ['ft_out']),
+        transfer_tool('FT_ST_Transfer', 'ft', 'st', 'ft_out', 'st_ft'),
+        transfer_tool('DS_LD_Transfer', 'ds', 'ld', 'data', 'ld_data'),
+        lpap_tool('langDetect', 'ld_data', ['ld_out']),
+        transfer_tool('LD_ST_Transfer', 'ld', 'st', 'ld_out', 'st_ld'),
+        lpap_tool('statistics', ['st_ft', 'st_ld']),
+    ]
+
+
+def names(stages):
+    return [[[tool_name(tool) for tool in branch] for branch in stage] for stage in stages]
+
+
+def test_independent_branches_share_a_stage():
+    stages = flow_builder.plan_stages(lid_tools())
+
+    assert names(stages) == [
+        [['DS_FT_Transfer', 'fastText', 'FT_ST_Transfer'], ['DS_LD_Transfer', 'langDetect', 'LD_ST_Transfer']],
+        [['statistics']],
+    ]
+
+
+def test_dependent_tools_run_in_order():
+    tools = [transfer_tool('A_Transfer', 'ds', 'x', 'a', 'a2'), lpap_tool('L', 'a2', ['o'])]
+
+    assert names(flow_builder.plan_stages(tools)) == [[['A_Transfer', 'L']]]
+    assert flow_builder.tool_dependencies(tools) == {'A_Transfer': set(), 'L': {'A_Transfer'}}
+
+
+def test_transfers_with_the_same_endpoints_are_fused():
+    tools = [
+        transfer_tool('A_Transfer', 'ds', 'st', 'a', 'a2'),
+        lpap_tool('L', 'a2', ['o']),
+        transfer_tool('B_Transfer', 'ds', 'st', 'b', 'b2'),
+    ]
+
+    fused = flow_builder.fuse_transfers(tools)
+
+    assert [tool_name(tool) for tool in fused] == ['A_Transfer__B_Transfer', 'L']
+    assert fused[0].fused_tools == [tools[0], tools[2]]
+    items = flow_builder.transfer_state(fused[0])['Parameters']['transfer_items']
+    assert [item['destination_path.$'] for item in items] == ['$.input.p.a2', '$.input.p.b2']
+
+
+def test_a_transfer_is_not_fused_ahead_of_the_step_it_depends_on():
+    tools = [
+        transfer_tool('A_Transfer', 'ds', 'st', 'a', 'a2'),
+        lpap_tool('L', 'a2', ['o']),
+        transfer_tool('O_Transfer', 'ds', 'st', 'o', 'o2'),
+    ]
+
+    assert flow_builder.fuse_transfers(tools) == tools
+
+
+def test_fused_tools_are_created_once():
+    tools = [transfer_tool('C_Transfer', 'ds', 'st', 'c', 'c2'), transfer_tool('D_Transfer', 'ds', 'st', 'd', 'd2')]
+
+    assert flow_builder.fuse_transfers(tools)[0] is flow_builder.fuse_transfers(tools)[0]
+
+
+def test_definitions_are_generated_once_per_tool_list():
+    cache = flow_builder.FlowDefinitionCache()
+    tools = [lpap_tool('E', 'e')]
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return flow_builder.build_sequential_definition(tools)
+
+    definition, checksum = cache.get(tools, 'sequential', generate)
+    definition['Comment'] = 'changed'
+
+    assert cache.get(tools, 'sequential', generate) == (flow_builder.build_sequential_definition(tools), checksum)
+    assert len(calls) == 1
+
+
+def test_tools_with_the_same_name_but_another_definition_are_cached_apart():
+    cache = flow_builder.FlowDefinitionCache()
+    first, second = [lpap_tool('F', 'a')], [lpap_tool('F', 'b')]
+
+    def get(tools):
+        return cache.get(tools, 'sequential', lambda: flow_builder.build_sequential_definition(tools))
+
+    assert get(first)[1] != get(second)[1]
+    assert get(second)[0] == flow_builder.build_sequential_definition(second)
@@ -0,0 +1,47 @@
+import pytest
+
+from common import import_module
+
+flow_diagram = import_module("flow_diagram")
+
+TOPOLOGY = [[['A_Transfer', 'A'], ['B']], [['C']]]
+WED_CLEAN = {'A_Transfer': {'total_execution_time': 5}, 'A': {'total_execution_time': 125},
+             'B': {'total_execution_time': 61}, 'C': {'total_execution_time': 0}}
+
+
+def cached_template(cache_dir, topology):
+    # A template as a previous process would have cached it: one placeholder per node
+    names = [name for stage in topology for branch in stage for name in branch]
+    svg = "<svg>" + "".join(f"<text>{name}: {flow_diagram.placeholder(index)}</text>"
+                            for index, name in enumerate(names)) + "</svg>"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / f"{flow_diagram.topology_key(topology)}.svg").write_text(svg)
+
+
+def test_timing_labels_fit_the_placeholders():
+    assert flow_diagram.execution_time_label(125) == "2 minutes, 5 seconds"
+    assert len(flow_diagram.execution_time_label(999 * 60 + 59)) <= flow_diagram.PLACEHOLDER_WIDTH
+
+
+def test_a_cached_template_is_filled_in_without_a_layout(tmp_path):
+    cached_template(tmp_path, TOPOLOGY)
+    renderer = flow_diagram.DiagramRenderer(cache_dir=tmp_path)
+
+    svg = renderer.render(TOPOLOGY, WED_CLEAN)
+
+    assert renderer.renders == 0
+    assert "A: 2 minutes, 5 seconds" in svg
+    assert "B: 1 minutes, 1 seconds" in svg
+    assert "@T" not in svg
+
+
+def test_each_topology_is_laid_out_once(tmp_path):
+    pytest.importorskip("graphviz")
+    renderer = flow_diagram.DiagramRenderer(cache_dir=tmp_path)
+
+    first = renderer.render_async(TOPOLOGY, WED_CLEAN).result()
+    second = renderer.render(TOPOLOGY, {**WED_CLEAN, 'C': {'total_execution_time': 60}})
+
+    assert renderer.renders == 1
+    assert "0 minutes, 0 seconds" in first and "1 minutes, 0 seconds" in second
+    assert flow_diagram.DiagramRenderer(cache_dir=tmp_path).render(TOPOLOGY, WED_CLEAN) == first
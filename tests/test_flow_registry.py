@@ -0,0 +1,85 @@
+import pytest
+
+from common import FakeClock, import_module
+
+flow_registry = import_module("flow_registry")
+mock_globus = import_module("mock_globus")
+flow_builder = import_module("flow_builder")
+
+
+@pytest.fixture
+def stack():
+    # Clients share Gladier's stored flow_id / flow_checksum, as instances of one client class do
+    return mock_globus.MockGlobus([], time_scale=0)
+
+
+def deploy(stack, registry, n_steps):
+    client = stack.gladier_client(mock_globus.synthetic_tools(n_steps))
+    checksum = flow_builder.definition_checksum(client.get_flow_definition())
+    return client, checksum, flow_registry.deploy(client, checksum, registry)
+
+
+def test_each_definition_is_deployed_as_its_own_flow(stack):
+    registry = flow_registry.FlowRegistry(None, clock=FakeClock())
+
+    _, first_checksum, first = deploy(stack, registry, 2)
+    registry.clock.now += 1
+    _, second_checksum, second = deploy(stack, registry, 3)
+
+    assert first['flow_id'] is not None
+    assert first['flow_id'] != second['flow_id']
+    assert first['flow_scope'] == f"https://auth.globus.org/scopes/{first['flow_id']}/flow_run"
+    assert stack.flows.deployments == {first['flow_id']: first_checksum, second['flow_id']: second_checksum}
+    assert registry.get(first_checksum) == first
+
+
+def test_a_registered_flow_is_run_without_redeploying(stack):
+    registry = flow_registry.FlowRegistry(None)
+    _, _, first = deploy(stack, registry, 2)
+    deploy(stack, registry, 3)     # Gladier's storage now holds the second flow
+
+    client, _, entry = deploy(stack, registry, 2)
+    client.run_flow(flow_input={})
+
+    assert entry == first
+    assert stack.flows.calls['deploy_flow'] == 2
+    assert stack.flows.runs['run-0']['flow_id'] == first['flow_id']
+    assert stack.flows.runs['run-0']['definition'] == stack.flows.deployments[first['flow_id']]
+
+
+def test_a_deployment_without_a_flow_id_is_not_registered():
+    registry = flow_registry.FlowRegistry(None)
+
+    with pytest.raises(ValueError):
+        registry.put('checksum', None)
+    registry.entries['legacy'] = {'flow_id': None, 'flow_scope': None, 'title': None, 'deployed': 0}
+    assert registry.get('legacy') is None
+
+
+def test_the_registry_is_saved_and_reloaded(tmp_path):
+    path = tmp_path / "flow_registry.json"
+    flow_registry.FlowRegistry(path).put('checksum', 'flow-1', title='LiD')
+
+    assert flow_registry.FlowRegistry(path).get('checksum')['flow_id'] == 'flow-1'
+    assert [p.name for p in tmp_path.iterdir()] == ["flow_registry.json"]
+
+
+def test_flows_run_on_the_deployment_of_their_own_definition(stack):
+    pytest.importorskip("globus_sdk")     # Flow requests the Transfer and Auth scopes
+    flow = import_module("flow")
+    identity_cache = import_module("identity_cache")
+    registry = flow_registry.FlowRegistry(None)
+
+    def run(n_steps):
+        submitted = flow.Flow(config={'input': {'LP_configuration': {'article_name': 'article'}}}, journal_dir=None,
+                              flow_registry=registry, identity_cache=identity_cache.IdentityCache(path=None),
+                              **stack.flow_kwargs(mock_globus.synthetic_tools(n_steps)))
+        submitted.run()
+        return submitted
+
+    first, second, again = run(2), run(3), run(2)
+
+    assert first.flow_id != second.flow_id
+    assert again.flow_id == first.flow_id
+    assert [stack.flows.runs[f.run_id]['flow_id'] for f in (first, second, again)] == \
+        [first.flow_id, second.flow_id, first.flow_id]
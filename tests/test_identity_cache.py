@@ -0,0 +1,138 @@
+import json
+
+from common import FakeClock, import_module
+
+identity_cache = import_module("identity_cache")
+mock_globus = import_module("mock_globus")
+
+IdentityCache = identity_cache.IdentityCache
+
+
+def identity(g_id):
+    return mock_globus.StubAuthClient.make_identity(g_id)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = IdentityCache(path=None, ttl=10, clock=clock)
+    cache.put('a', identity('a'))
+
+    clock.now = 10
+    assert cache.get('a') == identity('a')
+    clock.now = 10.5
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_on_save(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "identities.json"
+    cache = IdentityCache(path, max_entries=2, clock=clock)
+    for g_id in ('a', 'b', 'c'):
+        cache.put(g_id, identity(g_id))
+        clock.now += 1
+    cache.get('a')      # a is now more recent than b
+
+    cache.save()
+
+    assert set(IdentityCache(path, clock=clock).entries) == {'a', 'c'}
+
+
+def test_expired_entries_are_dropped_on_save(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "identities.json"
+    cache = IdentityCache(path, ttl=5, clock=clock)
+    cache.put('old', identity('old'))
+    clock.now = 4
+    cache.put('new', identity('new'))
+    clock.now = 6
+
+    cache.save()
+
+    assert set(json.loads(path.read_text())) == {'new'}
+
+
+def test_an_unreadable_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "identities.json"
+    path.write_text("{not json")
+    assert IdentityCache(path).entries == {}
+
+
+def test_resolver_only_requests_uncached_identities_in_batches():
+    auth = mock_globus.StubAuthClient()
+    resolver = identity_cache.IdentityResolver(auth, IdentityCache(path=None), batch_size=2)
+
+    first = resolver.resolve(['a', 'b', 'c', 'a'])
+    second = resolver.resolve(['a', 'b', 'c', 'd'])
+
+    assert set(first) == {'a', 'b', 'c'}
+    assert second['d'] == identity('d')
+    assert auth.requests == 3     # [a, b] and [c], then [d]
+
+
+def test_access_times_are_saved_when_every_identity_is_cached(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "identities.json"
+    auth = mock_globus.StubAuthClient()
+    identity_cache.IdentityResolver(auth, IdentityCache(path, clock=clock)).resolve(['a', 'b'])
+
+    clock.now = 5
+    identity_cache.IdentityResolver(auth, IdentityCache(path, clock=clock)).resolve(['a'])
+
+    entries = json.loads(path.read_text())
+    assert auth.requests == 1
+    assert (entries['a']['accessed'], entries['b']['accessed']) == (5, 0)
+
+
+def test_saves_leave_no_temporary_files(tmp_path):
+    cache = IdentityCache(tmp_path / "identities.json")
+    cache.put('a', identity('a'))
+    cache.save()
+
+    assert not list(tmp_path.glob("*.tmp"))
+    assert not cache.modified
+
+
+def test_concurrent_saves_keep_each_others_entries(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "identities.json"
+    first, second = IdentityCache(path, clock=clock), IdentityCache(path, clock=clock)
+    first.put('a', identity('a'))
+    first.put('shared', identity('shared'))
+    clock.now = 5
+    second.put('b', identity('b'))
+    second.put('shared', {**identity('shared'), 'name': 'Renamed'})
+    clock.now = 7
+    first.get('shared')
+
+    first.save()
+    second.save()
+
+    entries = json.loads(path.read_text())
+    assert set(entries) == {'a', 'b', 'shared'}
+    assert entries['shared']['identity']['name'] == 'Renamed'
+    assert (entries['shared']['stored'], entries['shared']['accessed']) == (5, 7)
+
+
+class PartialAuthClient:
+    # Auth returns no identity for IDs outside known
+    def __init__(self, known):
+        self.known = known
+        self.requested = []
+
+    def get_identities(self, ids=None):
+        self.requested.append(list(ids))
+        return {'identities': [identity(g_id) for g_id in ids if g_id in self.known]}
+
+
+def test_ids_without_an_identity_are_not_requested_again_until_they_expire():
+    clock = FakeClock()
+    auth = PartialAuthClient(known={'a'})
+    resolver = identity_cache.IdentityResolver(auth, IdentityCache(path=None, clock=clock, not_found_ttl=60))
+
+    assert set(resolver.resolve(['a', 'gone'])) == {'a'}
+    assert set(resolver.resolve(['a', 'gone'])) == {'a'}
+    clock.now = 61
+    resolver.resolve(['a', 'gone'])
+
+    assert auth.requested == [['a', 'gone'], ['gone']]
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from common import REPO, import_module
+
+orchestration = import_module("orchestration")
+
+HEAVY_MODULES = ('gladier', 'globus_sdk', 'rocrate', 'graphviz', 'numpy')
+
+
+def run_python(*args):
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(REPO.parent), os.environ.get('PYTHONPATH')]))}
+    return subprocess.run([sys.executable, *args], cwd=REPO.parent, env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def imported_heavy_modules(statement):
+    # The heavy modules imported by a statement run in a fresh interpreter
+    result = run_python("-c", f"import sys, json; {statement}; "
+                              f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & {set(HEAVY_MODULES)})))")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_help_lists_the_commands():
+    result = run_python("-m", f"{REPO.name}.orchestration", "--help")
+
+    for command in ('run', 'monitor', 'build-crate', 'replay'):
+        assert command in result.stdout
+
+
+def test_the_cli_and_flow_classes_import_without_the_heavy_modules():
+    assert imported_heavy_modules(f"from {REPO.name} import orchestration; orchestration.build_parser()") == []
+    assert imported_heavy_modules(f"from {REPO.name}.LidFlow import LidFlow") == []
+
+
+def test_commands_are_dispatched_with_their_options():
+    parser = orchestration.build_parser()
+
+    monitor = parser.parse_args(["monitor", "run-1", "--batch"])
+    replay = parser.parse_args(["-q", "replay", "data.msgpack", "--time-scale", "0.5", "-o", "crate"])
+
+    assert (monitor.handler, monitor.run_id, monitor.batch) == (orchestration.monitor_command, "run-1", True)
+    assert replay.handler is orchestration.replay_command
+    assert (replay.quiet, replay.data, replay.time_scale, replay.output) == (True, "data.msgpack", 0.5, "crate")
+    with pytest.raises(SystemExit):
+        parser.parse_args([])
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from common import import_module
+
+pytest.importorskip("rocrate")
+orchestration_crate = import_module("orchestration_crate")
+orchestration_types = import_module("orchestration_types")
+blob_store = import_module("blob_store")
+flow_builder = import_module("flow_builder")
+flow_diagram = import_module("flow_diagram")
+
+WEP = {'StartAt': 'A_Transfer', 'States': {
+    'A_Transfer': {'Type': 'Action', 'Next': 'Stats'},
+    'Stats': {'Type': 'Action', 'End': True},
+}}
+
+
+def step_record(name, action_id, seconds=1):
+    return {'action_id': action_id, 'state_name': name, 'status': 'SUCCEEDED',
+            'creator_id': 'urn:globus:auth:identity:user', 'manage_by': [], 'monitor_by': [],
+            'start_time': '2024-01-01T00:00:00', 'completion_time': '2024-01-01T00:00:01',
+            'total_execution_time': seconds}
+
+
+def make_subcrate(path, name="Statistics run"):
+    (path / "output").mkdir(parents=True)
+    (path / "output" / "results.txt").write_text("results")
+    (path / "ro-crate-metadata.json").write_text(json.dumps({'@graph': [
+        {'@id': 'ro-crate-metadata.json', 'about': {'@id': './'}},
+        {'@id': './', 'name': name},
+    ]}))
+
+
+def make_crate(tmp_path, WED_clean, **kwargs):
+    article = tmp_path / "article"
+    components = {}
+    for name in ('A_Transfer', 'Stats', 'Other'):
+        components[name] = tmp_path / "components" / f"{name.lower()}.py"
+        components[name].parent.mkdir(exist_ok=True)
+        components[name].write_text(f"# {name}\n")
+    data = orchestration_types.OrchestrationData(
+        input={'input': {}}, WEP=WEP, WED=[], WED_clean=WED_clean, components=components,
+        flow_id='flow', run_id='run', article_name=str(article), identity_map={}, reused_inputs=[],
+        cached_steps=[])
+
+    # A laid-out template, so no Graphviz layout is needed
+    renderer = flow_diagram.DiagramRenderer()
+    topology = flow_builder.flow_topology(WEP)
+    renderer.templates[flow_diagram.topology_key(topology)] = "<svg>" + "".join(
+        f"<text>{flow_diagram.placeholder(index)}</text>" for index in range(2)) + "</svg>"
+    return orchestration_crate.Orchestration_crate(None, data, crate_directory=str(tmp_path / "crate"),
+                                                   run_label="Run", diagram_renderer=renderer,
+                                                   verify_outputs=False, **kwargs)
+
+
+def read_graph(crate_directory):
+    with open(crate_directory / "ro-crate-metadata.json") as f:
+        return {entity['@id']: entity for entity in json.load(f)['@graph']}
+
+
+def test_steps_are_added_as_they_complete(tmp_path):
+    make_subcrate(tmp_path / "article" / "action-2")
+    crate = make_crate(tmp_path, {})
+    crate.start_incremental()
+
+    crate.on_step_complete('A_Transfer', step_record('A_Transfer', 'action-1'))
+    crate.on_step_complete('Stats', step_record('Stats', 'action-2', seconds=61))
+    assert list(crate.steps) == ['A_Transfer']      # The LPAP step waits for its sub-crate
+
+    crate.on_subcrate('Stats', 'action-2', None)
+    assert list(crate.steps) == ['A_Transfer', 'Stats']
+    crate.finalize()
+
+    graph = read_graph(tmp_path / "crate")
+    assert [part['@id'] for part in graph['WEP.json']['hasPart']] == ['action-1', 'action-2']
+    assert [graph[action]['step_number'] for action in ('action-1', 'action-2')] == [1, 2]
+    assert (tmp_path / "crate" / "Statistics_run" / "output" / "results.txt").read_text() == "results"
+    assert "1 minutes, 1 seconds" in (tmp_path / "crate" / "flow_diagram.svg").read_text()
+
+
+def test_subcrates_are_prepared_concurrently_in_a_fixed_layout(tmp_path):
+    # Both sub-crates are named "Statistics run"; the first step in WEP order keeps the name
+    make_subcrate(tmp_path / "article" / "action-2")
+    make_subcrate(tmp_path / "article" / "action-3")
+    WED_clean = {'A_Transfer': step_record('A_Transfer', 'action-1'), 'Stats': step_record('Stats', 'action-2'),
+                 'Other': step_record('Other', 'action-3')}
+    store = blob_store.BlobStore(tmp_path / "blobs")
+    crate = make_crate(tmp_path, WED_clean, ingest_workers=4, blob_store=store)
+
+    prepared = crate.prepare_steps(['A_Transfer', 'Stats', 'Other'])
+
+    assert 'subcrate' not in prepared['A_Transfer']
+    assert str(prepared['Stats']['subcrate']) == str(tmp_path / "crate" / "Statistics_run")
+    assert str(prepared['Other']['subcrate']) == str(tmp_path / "crate" / "Statistics_run_action-3")
+    assert os.path.samefile(tmp_path / "crate" / "Statistics_run" / "output" / "results.txt",
+                            tmp_path / "crate" / "Statistics_run_action-3" / "output" / "results.txt")
+    assert crate.ingested.keys() == {'Stats', 'Other'}
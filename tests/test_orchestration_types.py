@@ -0,0 +1,61 @@
+import pytest
+
+from common import import_module
+
+orchestration_types = import_module("orchestration_types")
+mock_globus = import_module("mock_globus")
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def records():
+    return {USER_ID: mock_globus.StubAuthClient.make_identity(USER_ID)}
+
+
+def test_types_are_slotted():
+    user = orchestration_types.GlobusUser.from_dict(records()[USER_ID])
+
+    assert not hasattr(user, '__dict__')
+    with pytest.raises(AttributeError):
+        user.nickname = 'x'
+    assert user.to_dict() == records()[USER_ID]
+
+
+def test_views_share_the_collected_trees_read_only():
+    WED = [{'code': 'FlowStarted'}]
+    WED_clean = {'Step_0': {'action_id': 'action-0'}}
+    WED_view, clean_view = orchestration_types.ListView(WED), orchestration_types.DictView(WED_clean)
+
+    assert WED_view == WED and dict(clean_view) == WED_clean
+    assert WED_view.unwrap() is WED and clean_view.unwrap() is WED_clean
+    with pytest.raises(TypeError):
+        WED_view[0] = {}
+    with pytest.raises(TypeError):
+        clean_view['Step_1'] = {}
+
+
+def test_identity_records_become_users_when_accessed():
+    identity_map = orchestration_types.LazyIdentityMap(records())
+
+    assert identity_map._users == {}
+    user = identity_map[USER_ID]
+
+    assert isinstance(user, orchestration_types.GlobusUser)
+    assert identity_map[USER_ID] is user
+    assert list(identity_map) == [USER_ID]
+
+
+def test_to_dict_shares_the_trees_and_round_trips():
+    WED = [{'code': 'FlowStarted'}]
+    data = orchestration_types.OrchestrationData(
+        input={'input': {}}, WEP={'StartAt': 'A'}, WED=orchestration_types.ListView(WED), WED_clean={},
+        components={'A': '/tools/a.py'}, flow_id='flow', run_id='run', article_name='article',
+        identity_map=orchestration_types.LazyIdentityMap(records()), reused_inputs=[], cached_steps=[])
+
+    data_dict = data.to_dict()
+    loaded = orchestration_types.OrchestrationData.from_dict(data_dict)
+
+    assert data_dict['WED'] is WED
+    assert data_dict['identity_map'] == records()
+    assert loaded.to_dict() == data_dict
+    assert str(loaded.components['A']) == '/tools/a.py'
@@ -0,0 +1,76 @@
+import json
+import threading
+
+from common import FakeClock, import_module
+
+profiling = import_module("profiling")
+run_monitor = import_module("run_monitor")
+wed_parser = import_module("wed_parser")
+mock_globus = import_module("mock_globus")
+
+
+def test_spans_are_recorded_as_chrome_trace_events(tmp_path):
+    clock = FakeClock()
+    profiler = profiling.Profiler(clock=clock)
+    with profiler.span('flow.submit', label='run'):
+        clock.now += 0.5
+    profiler.instant('run.started')
+
+    trace = json.loads(profiler.write(tmp_path / "profile.json").read_text())
+
+    events = [event for event in trace['traceEvents'] if event['ph'] != 'M']
+    assert [(event['name'], event['ph']) for event in events] == [('flow.submit', 'X'), ('run.started', 'i')]
+    assert events[0]['dur'] == 0.5e6
+    assert events[0]['args'] == {'label': 'run'}
+    assert trace['traceEvents'][0]['args']['name'] == 'main'
+
+
+def test_the_summary_totals_spans_by_name():
+    clock = FakeClock()
+    profiler = profiling.Profiler(clock=clock)
+    for seconds in (1, 2):
+        with profiler.span('wed.page'):
+            clock.now += seconds
+
+    assert profiler.summary() == {'wed.page': {'count': 2, 'total': 3.0}}
+
+
+def test_spans_from_other_threads_are_kept():
+    profiler = profiling.Profiler()
+
+    def work():
+        with profiler.span('ingest'):
+            pass
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert profiler.summary()['ingest']['count'] == 4
+
+
+def test_a_disabled_profiler_records_nothing():
+    with profiling.NULL_PROFILER.span('flow.poll'):
+        pass
+    profiling.NULL_PROFILER.instant('run.started')
+
+    assert profiling.NULL_PROFILER.events == []
+
+
+def test_each_run_records_its_own_spans():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=3, clock=clock)
+    profilers = {}
+    for run_id in ('run-a', 'run-b'):
+        flows.start_run(run_id)
+        profilers[run_id] = profiling.Profiler()
+        run_monitor.RunMonitor(flows, run_monitor.BackoffPolicy(initial=1, jitter=0), sleep=clock.sleep,
+                               clock=clock, profiler=profilers[run_id]).wait(run_id)
+
+    WED = mock_globus.synthetic_WED(1)
+    log = mock_globus.MockFlowsService(WED, time_scale=0)
+    list(wed_parser.iter_run_log_pages(log, log.run_flow()['run_id'], profiler=profilers['run-b']))
+
+    assert {event['args']['run_id'] for event in profilers['run-a'].events} == {'run-a'}
+    assert set(profilers['run-b'].summary()) == {'flow.poll', 'wed.page'}
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from common import FakeClock, import_module
+
+run_monitor = import_module("run_monitor")
+mock_globus = import_module("mock_globus")
+
+BackoffPolicy = run_monitor.BackoffPolicy
+
+
+def test_backoff_grows_to_its_maximum():
+    policy = BackoffPolicy(initial=1, maximum=5, multiplier=2, jitter=0)
+    delays, delay = [], None
+    for _ in range(5):
+        delay = policy.next_delay(delay)
+        delays.append(delay)
+    assert delays == [1, 2, 4, 5, 5]
+
+
+def test_jitter_stays_within_its_spread():
+    policy = BackoffPolicy(jitter=0.1)
+    assert all(9 <= policy.apply_jitter(10) <= 11 for _ in range(100))
+    assert BackoffPolicy(jitter=0).apply_jitter(10) == 10
+
+
+def test_monitor_backs_off_while_the_status_is_unchanged():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=20, clock=clock)
+    flows.start_run('run')
+    monitor = run_monitor.RunMonitor(flows, BackoffPolicy(initial=1, maximum=4, multiplier=2, jitter=0),
+                                     sleep=clock.sleep, clock=clock)
+
+    status = monitor.wait('run')
+
+    assert status['status'] == 'SUCCEEDED'
+    assert clock.sleeps == [1, 2, 4, 4, 4, 4, 4]
+    assert monitor.stats.requests == len(clock.sleeps) + 1
+    assert monitor.stats.total_sleep == sum(clock.sleeps)
+
+
+def test_monitor_resets_the_backoff_when_the_run_progresses():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=40, clock=clock)
+    flows.start_run('run', states=['A', 'B'])
+    progress = []
+    monitor = run_monitor.RunMonitor(flows, BackoffPolicy(initial=1, maximum=8, multiplier=2, jitter=0),
+                                     sleep=clock.sleep, clock=clock,
+                                     on_progress=lambda status: progress.append(status['details']['state_name']))
+
+    monitor.wait('run')
+
+    assert clock.sleeps == [1, 2, 4, 8, 8, 1, 2, 4, 8, 8]
+    assert progress == ['A', 'B']
+
+
+def test_monitor_gives_up_after_its_poll_budget():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=1000, clock=clock)
+    flows.start_run('run')
+    monitor = run_monitor.RunMonitor(flows, BackoffPolicy(jitter=0), max_polls=3, sleep=clock.sleep, clock=clock)
+
+    with pytest.raises(run_monitor.PollBudgetExceeded):
+        monitor.wait('run')
+    assert monitor.stats.requests == 3
+
+
+def test_monitor_gives_up_after_its_timeout():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=1000, clock=clock)
+    flows.start_run('run')
+    monitor = run_monitor.RunMonitor(flows, BackoffPolicy(initial=10, jitter=0), timeout=25,
+                                     sleep=clock.sleep, clock=clock)
+
+    with pytest.raises(run_monitor.PollBudgetExceeded):
+        monitor.wait('run')
+    assert clock.now >= 25
+
+
+def test_async_monitor_awaits_its_progress_callback():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=40, clock=clock)
+    flows.start_run('run', states=['A', 'B'])
+    progress = []
+
+    async def on_progress(status):
+        progress.append(status['details']['state_name'])
+
+    monitor = run_monitor.AsyncRunMonitor(flows, BackoffPolicy(initial=1, maximum=8, multiplier=2, jitter=0),
+                                          sleep=clock.asleep, clock=clock, on_progress=on_progress)
+    status = asyncio.run(monitor.wait('run'))
+
+    assert status['status'] == 'SUCCEEDED'
+    assert progress == ['A', 'B']
+
+
+def test_multi_run_monitor_polls_each_run_until_it_completes():
+    clock = FakeClock()
+    flows = mock_globus.FakeFlowsService(run_duration=10, clock=clock)
+    completed = []
+    monitor = run_monitor.MultiRunMonitor(BackoffPolicy(initial=1, maximum=4, jitter=0),
+                                          on_complete=lambda run_id, status: completed.append(run_id),
+                                          sleep=clock.sleep, clock=clock)
+    for run_id in ('a', 'b'):
+        flows.start_run(run_id)
+        monitor.add(run_id, flows)
+
+    results = monitor.wait()
+
+    assert sorted(completed) == ['a', 'b']
+    assert {run_id: status['status'] for run_id, status in results.items()} == {'a': 'SUCCEEDED', 'b': 'SUCCEEDED'}
@@ -0,0 +1,83 @@
+import gzip
+import json
+
+import pytest
+
+from common import import_module
+
+snapshot = import_module("snapshot")
+orchestration_types = import_module("orchestration_types")
+mock_globus = import_module("mock_globus")
+wed_parser = import_module("wed_parser")
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def orchestration_data(n_steps=3):
+    WED = mock_globus.synthetic_WED(n_steps)
+    identity = mock_globus.StubAuthClient.make_identity(USER_ID)
+    return orchestration_types.OrchestrationData(
+        input={'input': {'p': '/data'}}, WEP={'StartAt': 'Step_0', 'States': {}}, WED=WED,
+        WED_clean=dict(wed_parser.WEDParser().parse(WED)), components={'Step_0': '/tools/step.py'},
+        flow_id='flow', run_id='run', article_name='article',
+        identity_map={USER_ID: orchestration_types.GlobusUser(**identity)},
+        reused_inputs=[{'tool': 'A_Transfer'}], cached_steps=[])
+
+
+@pytest.fixture(params=['jsonl', 'msgpack'])
+def encoding(request):
+    if request.param == 'msgpack':
+        pytest.importorskip("msgpack")
+    return request.param
+
+
+def test_a_snapshot_round_trips(tmp_path, encoding):
+    data = orchestration_data()
+    path = snapshot.write_snapshot(data, tmp_path / "data.snapshot", encoding=encoding)
+
+    loaded = snapshot.read_snapshot(path)
+
+    assert loaded.to_dict() == data.to_dict()
+    assert loaded.identity_map[USER_ID].name == data.identity_map[USER_ID].name
+
+
+def test_the_WED_is_only_read_when_used(tmp_path):
+    data = orchestration_data(5)
+    path = snapshot.write_snapshot(data, tmp_path / "data.snapshot", encoding='jsonl')
+
+    WED = snapshot.read_snapshot(path).WED
+
+    assert len(WED) == len(data.WED)
+    assert WED._entries is None
+    assert WED[-1] == data.WED[-1]
+    assert WED == data.WED
+
+
+def test_legacy_json_files_are_still_loaded(tmp_path):
+    data = orchestration_data()
+    path = tmp_path / "orchestration_data.json"
+    path.write_text(json.dumps(data.to_dict()))
+
+    loaded = snapshot.load_orchestration_data(path)
+
+    assert not snapshot.is_snapshot(path)
+    assert loaded.to_dict() == data.to_dict()
+
+
+def test_snapshots_from_a_newer_version_are_refused(tmp_path):
+    path = tmp_path / "data.snapshot"
+    with gzip.open(path, 'wb') as f:
+        f.write(json.dumps({'format': snapshot.SNAPSHOT_FORMAT, 'version': snapshot.SNAPSHOT_VERSION + 1,
+                            'encoding': 'jsonl', 'WED_count': 0}).encode() + b'\n')
+
+    with pytest.raises(ValueError, match='version'):
+        snapshot.read_snapshot(path)
+
+
+def test_other_gzip_files_are_refused(tmp_path):
+    path = tmp_path / "other.gz"
+    with gzip.open(path, 'wb') as f:
+        f.write(b'{"format": "something-else"}\n')
+
+    with pytest.raises(ValueError, match='not an orchestration snapshot'):
+        snapshot.read_snapshot(path)
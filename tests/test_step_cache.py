@@ -0,0 +1,126 @@
+import hashlib
+import json
+
+import pytest
+
+from common import FakeClock, import_module, lpap_tool
+
+step_cache = import_module("step_cache")
+
+LISTING = {'size': 3, 'last_modified': 't1'}
+
+
+def sha256(data):
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def write_subcrate(path, files, version='1.0'):
+    # An LPAP sub-crate carrying files (relative path -> content), reporting version
+    for name, content in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content)
+    root = {'@id': './', '@type': 'Dataset', 'name': path.name}
+    if version is not None:
+        root['version'] = version
+    graph = [{'@id': 'ro-crate-metadata.json', 'about': {'@id': './'}}, root]
+    (path / "ro-crate-metadata.json").write_text(json.dumps({'@graph': graph}))
+    return path
+
+
+def delivery(destination_path, listing=LISTING):
+    # A delivered transfer item and its manifest entry
+    item = {'source_endpoint': 'DS', 'source_path': destination_path, 'destination_endpoint': 'LP',
+            'destination_path': destination_path, 'recursive': False}
+    return item, {'destination': listing}
+
+
+@pytest.fixture
+def tool():
+    return lpap_tool('FT', 'data')
+
+
+@pytest.fixture
+def delivered():
+    return {'$.input.p.data': delivery('/lpap/input/data.txt')}
+
+
+@pytest.fixture
+def subcrate(tmp_path):
+    return write_subcrate(tmp_path / "subcrate", {'input/data.txt': 'abc', 'output/predictions.txt': 'en'})
+
+
+def make_cache(tmp_path, version='1.0', **kwargs):
+    return step_cache.StepCache(tmp_path / "cache", version_source=lambda tool: version, **kwargs)
+
+
+def test_a_recorded_result_is_found_for_the_same_inputs(tmp_path, tool, delivered, subcrate):
+    cache = make_cache(tmp_path)
+
+    recorded = cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+    found = cache.lookup(tool, delivered)
+
+    assert recorded['inputs'] == {'$.input.p.data': sha256('abc')}
+    assert (found['run_id'], found['action_id'], found['version']) == ('run-0', 'action-0', '1.0')
+    assert (tmp_path / "cache" / "subcrates" / found['key'] / "output" / "predictions.txt").read_text() == 'en'
+
+
+def test_an_upgraded_lpap_misses(tmp_path, tool, delivered, subcrate):
+    cache = make_cache(tmp_path)
+    cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+    cache.save()
+
+    assert make_cache(tmp_path, version='1.0').lookup(tool, delivered) is not None
+    assert make_cache(tmp_path, version='2.0').lookup(tool, delivered) is None
+
+
+def test_an_lpap_without_a_version_is_not_cached(tmp_path, tool, delivered, subcrate):
+    cache = make_cache(tmp_path)
+    cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+    assert make_cache(tmp_path, version=None).lookup(tool, delivered) is None
+
+    unversioned = write_subcrate(tmp_path / "unversioned", {'input/data.txt': 'abc'}, version=None)
+    assert cache.record(tool, unversioned, delivered, 'run-1', 'action-1') is None
+
+
+def test_a_changed_input_listing_misses(tmp_path, tool, delivered, subcrate):
+    cache = make_cache(tmp_path)
+    cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+
+    changed = {'$.input.p.data': delivery('/lpap/input/data.txt', {'size': 4, 'last_modified': 't2'})}
+
+    assert cache.lookup(tool, changed) is None
+
+
+def test_results_expire_after_max_age(tmp_path, tool, delivered, subcrate):
+    clock = FakeClock(now=1000)
+    cache = make_cache(tmp_path, max_age=60, clock=clock)
+    cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+
+    clock.now += 61
+
+    assert cache.lookup(tool, delivered) is None
+
+
+def test_inputs_are_matched_by_their_path_in_the_subcrate(tmp_path):
+    tool = lpap_tool('ST', ['x', 'y'])
+    delivered = {'$.input.p.x': delivery('/lpap/x/data.txt'), '$.input.p.y': delivery('/lpap/y/data.txt')}
+    subcrate = write_subcrate(tmp_path / "subcrate", {'x/data.txt': 'one', 'y/data.txt': 'two'})
+
+    recorded = make_cache(tmp_path).record(tool, subcrate, delivered, 'run-0', 'action-0')
+
+    assert recorded['inputs'] == {'$.input.p.x': sha256('one'), '$.input.p.y': sha256('two')}
+
+
+def test_a_subcrate_missing_an_input_is_not_cached(tmp_path, tool, delivered):
+    subcrate = write_subcrate(tmp_path / "subcrate", {'other/data.txt': 'abc'})
+
+    assert make_cache(tmp_path).record(tool, subcrate, delivered, 'run-0', 'action-0') is None
+
+
+def test_the_index_is_saved_and_reloaded(tmp_path, tool, delivered, subcrate):
+    cache = make_cache(tmp_path)
+    cache.record(tool, subcrate, delivered, 'run-0', 'action-0')
+    cache.save()
+
+    assert make_cache(tmp_path).lookup(tool, delivered)['run_id'] == 'run-0'
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ['index.json', 'subcrates']
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from common import import_module
+
+subcrate_ingest = import_module("subcrate_ingest")
+
+
+def make_subcrate(path, name="Statistics run"):
+    (path / "output").mkdir(parents=True)
+    (path / "output" / "data.txt").write_text("results")
+    (path / "ro-crate-metadata.json").write_text(json.dumps({'@graph': [
+        {'@id': 'ro-crate-metadata.json', 'about': {'@id': './'}},
+        {'@id': './', 'name': name},
+    ]}))
+    return path
+
+
+def test_renaming_moves_the_subcrate_into_place(tmp_path):
+    src = make_subcrate(tmp_path / "received")
+
+    dst = subcrate_ingest.ingest_subcrate(src, tmp_path / "crate" / "sub", mode='rename')
+
+    assert not src.exists()
+    assert (dst / "output" / "data.txt").read_text() == "results"
+
+
+def test_hardlinking_shares_the_files_and_keeps_the_source(tmp_path):
+    src = make_subcrate(tmp_path / "received")
+
+    dst = subcrate_ingest.ingest_subcrate(src, tmp_path / "crate" / "sub", mode='hardlink')
+
+    assert os.path.samefile(src / "output" / "data.txt", dst / "output" / "data.txt")
+
+
+def test_copying_leaves_independent_files(tmp_path):
+    src = make_subcrate(tmp_path / "received")
+
+    dst = subcrate_ingest.ingest_subcrate(src, tmp_path / "crate" / "sub", mode='copy')
+    (dst / "output" / "data.txt").write_text("changed")
+
+    assert (src / "output" / "data.txt").read_text() == "results"
+
+
+def test_an_existing_destination_or_unknown_mode_is_refused(tmp_path):
+    src = make_subcrate(tmp_path / "received")
+    (tmp_path / "taken").mkdir()
+
+    with pytest.raises(FileExistsError):
+        subcrate_ingest.ingest_subcrate(src, tmp_path / "taken")
+    with pytest.raises(ValueError, match='Unknown ingest mode'):
+        subcrate_ingest.ingest_subcrate(src, tmp_path / "sub", mode='symlink')
+    assert src.exists()
+
+
+def test_subcrates_are_named_after_their_root_entity(tmp_path):
+    assert subcrate_ingest.subcrate_name(make_subcrate(tmp_path / "a", "Statistics run / 2"), 'x') == "Statistics_run_2"
+    assert subcrate_ingest.subcrate_name(tmp_path / "missing", 'Step_1') == 'Step_1'
+
+
+def test_paths_match_on_their_longest_trailing_part(tmp_path):
+    make_subcrate(tmp_path / "sub")
+    (tmp_path / "sub" / "data.txt").write_text("other")
+
+    assert subcrate_ingest.find_path(tmp_path / "sub", "/home/lpap/output/data.txt") == \
+        tmp_path / "sub" / "output" / "data.txt"
+    assert subcrate_ingest.find_path(tmp_path / "sub", "/home/lpap/input/data.txt") == tmp_path / "sub" / "data.txt"
+    assert subcrate_ingest.find_path(tmp_path / "sub", "/home/lpap/missing.txt") is None
@@ -0,0 +1,130 @@
+import pytest
+
+from common import import_module, lpap_tool, transfer_tool
+
+pytest.importorskip("globus_sdk")     # file_listing handles Globus API errors
+
+transfer_manifest = import_module("transfer_manifest")
+mock_globus = import_module("mock_globus")
+flow_builder = import_module("flow_builder")
+
+FLOW_INPUT = {'input': {
+    'endpoints': {'ds': 'DS', 'ft': 'FT', 'st': 'ST'},
+    'p': {name: f"/d/{name}" for name in ('a', 'a2', 'o', 'o2')},
+}}
+
+
+def names(tools):
+    return [flow_builder.tool_name(tool) for tool in tools]
+
+
+@pytest.fixture
+def tools():
+    # A transfer feeding an LPAP, whose output is transferred to a second LPAP
+    return [
+        transfer_tool('A_Transfer', 'ds', 'ft', 'a', 'a2'),
+        lpap_tool('FT', 'a2', ['o']),
+        transfer_tool('O_Transfer', 'ft', 'st', 'o', 'o2'),
+        lpap_tool('ST', 'o2'),
+    ]
+
+
+@pytest.fixture
+def files():
+    return {
+        ('DS', '/d/a'): {'size': 1, 'last_modified': 't1'},
+        ('FT', '/d/a2'): {'size': 1, 'last_modified': 't2'},
+        ('FT', '/d/o'): {'size': 5, 'last_modified': 't3'},
+        ('ST', '/d/o2'): {'size': 5, 'last_modified': 't4'},
+    }
+
+
+@pytest.fixture
+def client(files):
+    return mock_globus.MockTransferClient(mock_globus.MockFlowsService([]), files=files)
+
+
+def delivered(manifest, client, tools, run_id='run-0'):
+    # Records every transfer of tools as delivered by run_id
+    for tool in tools:
+        if flow_builder.transfer_state(tool) is not None:
+            for item in transfer_manifest.transfer_items(tool, FLOW_INPUT):
+                manifest.record(client, item, run_id)
+    return manifest
+
+
+def test_nothing_is_elided_without_a_delivery(tools, client):
+    remaining, reused, cached = transfer_manifest.elide_transfers(
+        tools, FLOW_INPUT, client, transfer_manifest.TransferManifest(path=None))
+
+    assert (remaining, reused, cached) == (tools, [], [])
+
+
+def test_a_transfer_with_current_destinations_is_elided(tools, client):
+    manifest = delivered(transfer_manifest.TransferManifest(path=None), client, tools[:1])
+
+    remaining, reused, _ = transfer_manifest.elide_transfers(tools, FLOW_INPUT, client, manifest)
+
+    assert names(remaining) == ['FT', 'O_Transfer', 'ST']
+    assert reused[0]['tool'] == 'A_Transfer'
+    assert reused[0]['items'][0]['run_id'] == 'run-0'
+    assert reused[0]['items'][0]['destination_listing'] == {'size': 1, 'last_modified': 't2'}
+
+
+def test_a_transfer_whose_source_changed_is_kept(tools, client, files):
+    manifest = delivered(transfer_manifest.TransferManifest(path=None), client, tools[:1])
+    files[('DS', '/d/a')] = {'size': 2, 'last_modified': 't9'}
+
+    remaining, reused, _ = transfer_manifest.elide_transfers(tools, FLOW_INPUT, client, manifest)
+
+    assert remaining == tools
+    assert reused == []
+
+
+def test_a_transfer_whose_source_is_rewritten_by_the_run_is_kept(tools, client):
+    manifest = delivered(transfer_manifest.TransferManifest(path=None), client, tools)
+
+    remaining, reused, _ = transfer_manifest.elide_transfers(tools, FLOW_INPUT, client, manifest)
+
+    # FT still runs and rewrites o, so O_Transfer must deliver it again
+    assert names(remaining) == ['FT', 'O_Transfer', 'ST']
+    assert [record['tool'] for record in reused] == ['A_Transfer']
+
+
+def test_steps_with_a_reusable_result_are_elided(tools, client):
+    manifest = delivered(transfer_manifest.TransferManifest(path=None), client, tools)
+    lookups = []
+
+    def lookup(tool, delivered):
+        lookups.append((flow_builder.tool_name(tool), sorted(delivered)))
+        return {'tool': flow_builder.tool_name(tool), 'run_id': 'run-0'}
+
+    remaining, reused, cached = transfer_manifest.elide_transfers(tools, FLOW_INPUT, client, manifest, lookup)
+
+    # Every step is reusable, so the last one runs again
+    assert names(remaining) == ['ST']
+    assert [record['tool'] for record in reused] == ['A_Transfer', 'O_Transfer']
+    assert [record['tool'] for record in cached] == ['FT']
+    assert lookups[0] == ('FT', ['$.input.p.a2'])
+
+
+def test_a_step_whose_delivered_output_changed_is_kept(tools, client, files):
+    manifest = delivered(transfer_manifest.TransferManifest(path=None), client, tools)
+    files[('FT', '/d/o')] = {'size': 6, 'last_modified': 't9'}
+
+    remaining, reused, cached = transfer_manifest.elide_transfers(
+        tools, FLOW_INPUT, client, manifest, lambda tool, delivered: {'run_id': 'run-0'})
+
+    assert names(remaining) == ['FT', 'O_Transfer', 'ST']
+    assert cached == []
+
+
+def test_the_manifest_is_saved_and_reloaded(tools, client, tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = delivered(transfer_manifest.TransferManifest(path), client, tools[:1])
+    manifest.save()
+
+    reloaded = transfer_manifest.TransferManifest(path)
+
+    assert reloaded.entries == manifest.entries
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from common import FakeClock, import_module
+
+transfer_tracker = import_module("transfer_tracker")
+run_monitor = import_module("run_monitor")
+
+BACKOFF = run_monitor.BackoffPolicy(initial=1, maximum=4, multiplier=2, jitter=0)
+
+
+class ScriptedTransferClient:
+    """
+    A transfer client whose task statuses follow a script: label -> statuses on successive polls
+    (the last status is kept). A label with a None status has no task yet.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.polls = 0
+        self.filters = []
+
+    def advance(self):
+        self.polls += 1
+
+    def status(self, label):
+        statuses = self.script[label]
+        return statuses[min(self.polls, len(statuses) - 1)]
+
+    def task_list(self, filter=None):
+        self.filters.append(filter)
+        tasks = []
+        for label in self.script:
+            status = self.status(label)
+            if status is None:
+                continue
+            task_id = f"task-{label}"
+            if label in filter.get('label', ()) or task_id in filter.get('task_id', ()):
+                tasks.append({'task_id': task_id, 'label': label, 'status': status})
+        return tasks
+
+
+def tracker(client, labels, clock, **kwargs):
+    def sleep(seconds):
+        clock.sleep(seconds)
+        client.advance()
+    return transfer_tracker.TransferTracker(client, labels, backoff=BACKOFF, sleep=sleep, clock=clock, **kwargs)
+
+
+def test_transfers_are_tracked_until_every_subcrate_lands():
+    clock = FakeClock()
+    client = ScriptedTransferClient({
+        'action-0': ['ACTIVE', 'SUCCEEDED'],
+        'action-1': [None, 'ACTIVE', 'ACTIVE', 'SUCCEEDED'],
+    })
+    landed = []
+
+    tasks = tracker(client, {'action-0': 'fastText', 'action-1': 'langDetect'}, clock,
+                    on_complete=lambda state_name, label, task: landed.append(state_name)).wait()
+
+    assert landed == ['fastText', 'langDetect']
+    assert {label: task['status'] for label, task in tasks.items()} == {'action-0': 'SUCCEEDED',
+                                                                        'action-1': 'SUCCEEDED'}
+    # The backoff restarts whenever a transfer changes state
+    assert clock.sleeps == [1, 1, 2]
+
+
+def test_only_outstanding_transfers_are_polled():
+    clock = FakeClock()
+    client = ScriptedTransferClient({'action-0': ['SUCCEEDED'], 'action-1': [None, 'ACTIVE', 'SUCCEEDED']})
+
+    tracker(client, {'action-0': 'A', 'action-1': 'B'}, clock).wait()
+
+    assert client.filters == [
+        {'label': ['action-0', 'action-1']},
+        {'label': ['action-1']},
+        {'task_id': ['task-action-1']},
+    ]
+
+
+def test_a_failed_transfer_raises():
+    clock = FakeClock()
+    client = ScriptedTransferClient({'action-0': ['ACTIVE', 'FAILED']})
+
+    with pytest.raises(transfer_tracker.TransferFailedError, match='fastText'):
+        tracker(client, {'action-0': 'fastText'}, clock).wait()
+
+
+def test_waiting_gives_up_after_the_timeout():
+    clock = FakeClock()
+    client = ScriptedTransferClient({'action-0': ['ACTIVE']})
+
+    with pytest.raises(run_monitor.PollBudgetExceeded):
+        tracker(client, {'action-0': 'fastText'}, clock, timeout=10).wait()
+    assert clock.now >= 10
+
+
+def test_the_async_tracker_polls_until_done():
+    clock = FakeClock()
+    client = ScriptedTransferClient({'action-0': ['ACTIVE', 'SUCCEEDED'], 'action-1': ['SUCCEEDED']})
+
+    async def sleep(seconds):
+        await clock.asleep(seconds)
+        client.advance()
+
+    tracker = transfer_tracker.AsyncTransferTracker(client, {'action-0': 'A', 'action-1': 'B'},
+                                                     backoff=BACKOFF, sleep=sleep, clock=clock)
+    tasks = asyncio.run(tracker.wait())
+
+    assert sorted(tasks) == ['action-0', 'action-1']
+    assert tracker.requests == 2
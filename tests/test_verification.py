@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from common import import_module
+
+verification = import_module("verification")
+
+VALIDATION = "__label__en The cat\n__label__fr Le chat\n__label__en A dog\n__label__de Der Hund\n"
+FASTTEXT = "__label__en 0.9\n__label__fr 0.8\n__label__fr 0.6\n__label__de 0.7\n"
+
+
+def test_labels_are_read_without_the_fasttext_prefix():
+    data = np.frombuffer(b"__label__en text\nfr\n\n__label__de", dtype=np.uint8)
+
+    assert verification.line_labels(data).tolist() == [b'en', b'fr', b'', b'de']
+
+
+@pytest.mark.parametrize('chunk_bytes', [7, 1024])
+def test_predictions_are_scored_against_the_validation_data(tmp_path, chunk_bytes):
+    (tmp_path / "validation.txt").write_text(VALIDATION)
+    (tmp_path / "fasttext.txt").write_text(FASTTEXT)
+
+    report = verification.verify_predictions(tmp_path / "validation.txt", {'fastText': tmp_path / "fasttext.txt"},
+                                             chunk_bytes=chunk_bytes)
+
+    fasttext = report['predictors']['fastText']
+    assert report['lines'] == {'validation': 4, 'fastText': 4}
+    assert fasttext['accuracy'] == 0.75
+    assert fasttext['per_language']['en'] == {'precision': 1.0, 'recall': 0.5, 'support': 2}
+    assert fasttext['per_language']['fr'] == {'precision': 0.5, 'recall': 1.0, 'support': 1}
+    assert fasttext['confusion_matrix']['labels'] == ['de', 'en', 'fr']
+    assert fasttext['confusion_matrix']['counts'] == [[1, 0, 0], [0, 1, 1], [0, 0, 1]]
+
+
+def test_the_subcrate_files_are_found_by_their_flow_input_names(tmp_path):
+    (tmp_path / "output").mkdir()
+    (tmp_path / "output" / "validation.txt").write_text(VALIDATION)
+    (tmp_path / "output" / "langdetect.txt").write_text("en\nfr\nen\nde\n")
+    flow_input = {'datastore_paths': {'validation_dest_path': '/lpap/validation.txt'},
+                  'langdetect_paths': {'LD_ST_dest': '/lpap/langdetect.txt'},
+                  'fastText_paths': {'FT_ST_dest': '/lpap/missing.txt'}}
+
+    report = verification.verify_statistics(tmp_path, flow_input)
+
+    assert report['files'] == {'validation': 'output/validation.txt', 'langDetect': 'output/langdetect.txt'}
+    assert report['predictors']['langDetect']['accuracy'] == 1.0
+    assert verification.verify_statistics(tmp_path, {}) is None
@@ -0,0 +1,60 @@
+from common import import_module
+
+wed_parser = import_module("wed_parser")
+mock_globus = import_module("mock_globus")
+
+
+def test_parse_yields_a_record_per_completed_step():
+    WED = mock_globus.synthetic_WED(3, step_seconds=30)
+
+    records = dict(wed_parser.WEDParser().parse(WED))
+
+    assert list(records) == ['Step_0', 'Step_1', 'Step_2']
+    assert records['Step_1']['action_id'] == 'action-1'
+    assert records['Step_1']['total_execution_time'] == 30
+
+
+def test_concurrent_steps_are_matched_by_state_name():
+    start_a, done_a, start_b, done_b = mock_globus.synthetic_WED(2, step_seconds=10, state_names=['A', 'B'])
+
+    records = list(wed_parser.WEDParser().parse([start_a, start_b, done_b, done_a]))
+
+    assert [state_name for state_name, _ in records] == ['B', 'A']
+    assert dict(records)['A']['action_id'] == 'action-0'
+
+
+def test_completions_without_a_state_name_are_matched_by_action_id():
+    start_a, done_a, start_b, done_b = mock_globus.synthetic_WED(2, step_seconds=10, state_names=['A', 'B'])
+    start_a['details']['action_id'] = 'action-0'
+    start_b['details']['action_id'] = 'action-1'
+    for done in (done_a, done_b):
+        del done['details']['state_name']
+
+    records = dict(wed_parser.WEDParser().parse([start_a, start_b, done_b, done_a]))
+
+    assert records['A']['action_id'] == 'action-0'
+    assert records['B']['action_id'] == 'action-1'
+
+
+def test_the_run_log_is_paged():
+    WED = mock_globus.synthetic_WED(3)
+    flows = mock_globus.MockFlowsService(WED, time_scale=0, page_size=4)
+    run_id = flows.run_flow()['run_id']
+
+    pages = list(wed_parser.iter_run_log_pages(flows, run_id))
+
+    assert [len(entries) for entries, _ in pages] == [4, 2]
+    assert pages[-1][1] is None
+    assert [entry for entries, _ in pages for entry in entries] == WED
+    assert flows.calls['get_run_logs'] == 2
+
+
+def test_paging_continues_from_a_marker():
+    WED = mock_globus.synthetic_WED(3)
+    flows = mock_globus.MockFlowsService(WED, time_scale=0, page_size=4)
+    run_id = flows.run_flow()['run_id']
+    _, marker = next(wed_parser.iter_run_log_pages(flows, run_id))
+
+    entries = [entry for entry in wed_parser.iter_run_logs(flows, run_id, marker=marker)]
+
+    assert entries == WED[4:]
@@ -0,0 +1,254 @@
+"""
+This module keeps a manifest of the files delivered by the flow's transfer steps, so unchanged
+inputs are not copied to the LPAP endpoints on every run. After a run, each transferred file is
+recorded with the size and modification time of its source and its destination (as listed by
+Globus Transfer), and the run that delivered it. Before the next run is submitted, a transfer tool
+whose every item still has the recorded source and destination listings is provably current and
+is dropped from the flow; the orchestration crate records its files as reused inputs. A transfer
+is never dropped while a tool that still runs writes its source (e.g. an LPAP's output).
+
+Only file items are elided; recursive (directory) items are always transferred. elide_transfers
+also drops the LPAP steps with a cached result for the same inputs (see step_cache).
+"""
+import json
+import os
+import posixpath
+import threading
+import time
+import logging
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .flow_builder import resolve_parameters, tool_io, tool_name, transfer_state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = Path.home() / ".orchestration_logic" / "transfer_manifest.json"
+
+
+def transfer_items(tool, flow_input) -> List[dict]:
+    """
+    Returns a transfer tool's items resolved against the flow input, as {source_endpoint,
+    source_path, destination_endpoint, destination_path, recursive}.
+    """
+    parameters = resolve_parameters(transfer_state(tool)['Parameters'], flow_input)
+    return [{
+        'source_endpoint': parameters.get('source_endpoint_id'),
+        'source_path': item.get('source_path'),
+        'destination_endpoint': parameters.get('destination_endpoint_id'),
+        'destination_path': item.get('destination_path'),
+        'recursive': item.get('recursive', False),
+    } for item in parameters.get('transfer_items', [])]
+
+
+def file_listing(transfer_client, endpoint, path) -> Optional[dict]:
+    """
+    Returns the size and modification time of a file on a Globus endpoint (None if it cannot be
+    listed).
+    """
+    from globus_sdk import GlobusAPIError
+
+    directory, name = posixpath.split(path)
+    try:
+        listing = transfer_client.operation_ls(endpoint, path=directory or '/', filter=f"name:{name}")
+    except GlobusAPIError as e:
+        logger.debug(f"Could not list {endpoint}:{path}: {e}")
+        return None
+    for entry in listing:
+        if entry.get('name') == name and entry.get('type', 'file') == 'file':
+            return {'size': entry.get('size'), 'last_modified': entry.get('last_modified')}
+    return None
+
+
+class TransferManifest:
+    """
+    A JSON file mapping transfer destinations ('<endpoint>:<path>') to {source_endpoint,
+    source_path, source, destination, run_id, recorded}, where source and destination are file
+    listings (see file_listing).
+
+    Parameters:
+    path (Path): The manifest file location (None for an in-memory only manifest).
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH, clock=time.time):
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable transfer manifest {self.path}: {e}")
+            return {}
+
+    @staticmethod
+    def key(item) -> str:
+        return f"{item['destination_endpoint']}:{item['destination_path']}"
+
+    def current(self, transfer_client, item) -> Optional[dict]:
+        """
+        Returns the manifest entry of an item if its destination is current: it was delivered
+        from the same source, and neither file has changed since.
+        """
+        entry = self.entries.get(self.key(item))
+        if item['recursive'] or entry is None:
+            return None
+        if (entry['source_endpoint'], entry['source_path']) != (item['source_endpoint'], item['source_path']):
+            return None
+        source = file_listing(transfer_client, item['source_endpoint'], item['source_path'])
+        if source is None or source != entry['source']:
+            return None
+        destination = file_listing(transfer_client, item['destination_endpoint'], item['destination_path'])
+        if destination is None or destination != entry['destination']:
+            return None
+        return entry
+
+    def source_current(self, transfer_client, item) -> bool:
+        """
+        Whether an item's source is unchanged since the item was last delivered.
+        """
+        entry = self.entries.get(self.key(item))
+        if item['recursive'] or entry is None:
+            return False
+        if (entry['source_endpoint'], entry['source_path']) != (item['source_endpoint'], item['source_path']):
+            return False
+        return file_listing(transfer_client, item['source_endpoint'], item['source_path']) == entry['source']
+
+    def record(self, transfer_client, item, run_id):
+        """
+        Records a delivered item (call save to write the manifest).
+        """
+        if item['recursive']:
+            return
+        source = file_listing(transfer_client, item['source_endpoint'], item['source_path'])
+        destination = file_listing(transfer_client, item['destination_endpoint'], item['destination_path'])
+        if source is None or destination is None:
+            self.entries.pop(self.key(item), None)
+            return
+        self.entries[self.key(item)] = {
+            'source_endpoint': item['source_endpoint'],
+            'source_path': item['source_path'],
+            'source': source,
+            'destination': destination,
+            'run_id': run_id,
+            'recorded': self.clock(),
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)     # Atomic, so concurrent runs never see a partial file
+
+
+def transfer_references(tool) -> List[Tuple[str, str]]:
+    # The flow input paths of each transfer item's source and destination, in item order
+    return [(item.get('source_path.$'), item.get('destination_path.$'))
+            for item in transfer_state(tool)['Parameters'].get('transfer_items', [])]
+
+
+def deliveries(tools, flow_input, manifest: TransferManifest) -> Dict[str, Tuple[dict, dict]]:
+    """
+    Maps the destination input paths of the tools' transfer items to (item, manifest entry), for
+    the items the manifest has an entry for.
+    """
+    delivered = {}
+    for tool in tools:
+        if transfer_state(tool) is None:
+            continue
+        for (_, destination), item in zip(transfer_references(tool), transfer_items(tool, flow_input)):
+            entry = manifest.entries.get(manifest.key(item))
+            if destination and entry is not None:
+                delivered[destination] = (item, entry)
+    return delivered
+
+
+def elide_transfers(tools, flow_input, transfer_client, manifest: TransferManifest,
+                    lookup=None) -> Tuple[list, List[dict], List[dict]]:
+    """
+    Drops the steps which need not run: transfer tools whose destinations are all current and,
+    given a lookup, other tools with a reusable result. A tool is only dropped when none of its
+    inputs are written by a tool which still runs, and at least one tool is always kept.
+
+    Parameters:
+    lookup (Callable): lookup(tool, delivered) returns a record of a reusable result for the
+    tool (or None), delivered mapping the input paths written by the dropped transfers to
+    (item, manifest entry). See StepCache.lookup.
+
+    Returns:
+    Tuple[list, List[dict], List[dict]]: The remaining tools, a reused input record {tool, items}
+    per dropped transfer (each item carrying the run which delivered it (run_id) and its
+    listings), and the lookup's record per dropped tool.
+    """
+    tools = list(tools)
+    skipped = {}        # Tool index -> ('reused' or 'cached', record)
+    written = set()     # Input paths written by the tools which still run
+    delivered = {}      # Input paths written by the dropped transfers -> (item, manifest entry)
+    for index, tool in enumerate(tools):
+        reads, writes = tool_io(tool)
+        record = None
+        if reads & written:
+            pass    # Its inputs are rewritten by this run
+        elif transfer_state(tool) is not None:
+            record = _current_transfer(tool, flow_input, transfer_client, manifest)
+            if record is not None:
+                skipped[index] = ('reused', record)
+                for (_, destination), item in zip(transfer_references(tool), record['items']):
+                    delivered[destination] = (item, manifest.entries[manifest.key(item)])
+        elif lookup is not None:
+            record = lookup(tool, delivered)
+            if record is not None and _outputs_current(tool, tools[index + 1:], flow_input, transfer_client, manifest):
+                skipped[index] = ('cached', record)
+                logger.info(f"Skipping {tool_name(tool)}, reusing its result from run {record['run_id']}")
+            else:
+                record = None
+        if record is None:
+            written |= writes
+
+    if skipped and len(skipped) == len(tools):
+        # A run needs a step to execute: the last tool (which no other tool depends on) runs again
+        skipped.pop(len(tools) - 1)
+    remaining = [tool for index, tool in enumerate(tools) if index not in skipped]
+    reused = [record for kind, record in skipped.values() if kind == 'reused']
+    cached = [record for kind, record in skipped.values() if kind == 'cached']
+    return remaining, reused, cached
+
+
+def _current_transfer(tool, flow_input, transfer_client, manifest: TransferManifest) -> Optional[dict]:
+    # The reused input record of a transfer tool whose destinations are all current (else None)
+    items = transfer_items(tool, flow_input)
+    entries = []
+    for item in items:
+        entry = manifest.current(transfer_client, item)
+        if entry is None:
+            return None
+        entries.append(entry)
+    if not items:
+        return None
+    logger.info(f"Skipping {tool_name(tool)}, its destination files are current")
+    return {
+        'tool': tool_name(tool),
+        'items': [dict(item, run_id=entry['run_id'], source_listing=entry['source'],
+                       destination_listing=entry['destination']) for item, entry in zip(items, entries)],
+    }
+
+
+def _outputs_current(tool, later_tools, flow_input, transfer_client, manifest: TransferManifest) -> bool:
+    # Whether the files a dropped tool would have written, and later transfers read, are unchanged
+    # since they were last delivered
+    _, writes = tool_io(tool)
+    for later in later_tools:
+        if transfer_state(later) is None:
+            continue
+        for (source, _), item in zip(transfer_references(later), transfer_items(later, flow_input)):
+            if source in writes and not manifest.source_current(transfer_client, item):
+                return False
+    return True
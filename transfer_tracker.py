@@ -0,0 +1,155 @@
+"""
+This module tracks the background Globus transfers that move LPAP sub-crates to the orchestration
+server. Each transfer is identified by its label (the LPAP action id). The tracker keeps per-task
+state, only re-polls labels and tasks that are still outstanding, fires a callback as each sub-crate
+lands, and raises as soon as a transfer fails.
+"""
+import asyncio
+import time
+import logging
+
+from typing import Callable, Dict
+
+from .run_monitor import BackoffPolicy, PollBudgetExceeded, call_async
+from .profiling import Profiler, NULL_PROFILER
+
+logger = logging.getLogger(__name__)
+
+
+class TransferFailedError(RuntimeError):
+    """ Raised when a tracked sub-crate transfer ends in the FAILED state. """
+
+
+class TransferTracker:
+    """
+    Parameters:
+    transfer_client (TransferClient): A client with access to the transfer task list.
+    labels (Dict[str, str]): Transfer labels (LPAP action ids) mapped to their WED state names.
+    on_complete (Callable): Optional callback, called with (state_name, action_id, task) when a
+    sub-crate transfer succeeds.
+    backoff (BackoffPolicy): The polling backoff policy.
+    timeout (float): Optional maximum wall-clock time (s) to wait for all transfers.
+    profiler (Profiler): Records each task list request (see profiling).
+    """
+
+    def __init__(self, transfer_client, labels: Dict[str, str], on_complete: Callable = None,
+                 backoff: BackoffPolicy = None, timeout: float = None,
+                 sleep: Callable = time.sleep, clock: Callable = time.monotonic, profiler: Profiler = None):
+        self.transfer_client = transfer_client
+        self.labels = dict(labels)
+        self.on_complete = on_complete
+        self.backoff = backoff or BackoffPolicy(initial=5, maximum=60, multiplier=1.5)
+        self.timeout = timeout
+        self.sleep = sleep
+        self.clock = clock
+        self.profiler = profiler or NULL_PROFILER
+        self.tasks: Dict[str, dict] = {}    # label -> latest task document
+        self.requests = 0
+
+    @property
+    def unseen(self):
+        return [label for label in self.labels if label not in self.tasks]
+
+    @property
+    def active(self):
+        return [label for label, task in self.tasks.items() if task['status'] not in ('SUCCEEDED', 'FAILED')]
+
+    @property
+    def done(self):
+        return not self.unseen and not self.active
+
+    def _task_list(self, **filters):
+        self.requests += 1
+        with self.profiler.span('transfer.poll', filters=sorted(filters)):
+            return list(self.transfer_client.task_list(filter=filters))
+
+    def _queries(self):
+        # Task list filters for the outstanding transfers
+        queries = []
+        if self.unseen:
+            queries.append({'label': self.unseen})
+        active_ids = [self.tasks[label]['task_id'] for label in self.active]
+        if active_ids:
+            queries.append({'task_id': active_ids})
+        return queries
+
+    def poll(self) -> bool:
+        """
+        Refreshes outstanding transfers, returning True if any transfer changed state.
+        """
+        updates = []
+        for filters in self._queries():
+            updates += self._task_list(**filters)
+        return self._apply(updates)
+
+    def _apply(self, updates) -> bool:
+        changed = False
+        for task in updates:
+            label = task['label']
+            previous = self.tasks.get(label)
+            if previous is not None and previous['status'] == task['status']:
+                continue
+            self.tasks[label] = task
+            changed = True
+            if task['status'] == 'FAILED':
+                raise TransferFailedError(
+                    f"Sub-crate transfer for {self.labels[label]} ({label}) failed: task {task['task_id']}")
+            if task['status'] == 'SUCCEEDED':
+                logger.info(f"Sub-crate for {self.labels[label]} transferred")
+                if self.on_complete:
+                    self.on_complete(self.labels[label], label, task)
+        return changed
+
+    def wait(self):
+        """
+        Blocks until every tracked transfer has succeeded.
+        """
+        started = self.clock()
+        delay = None
+        while True:
+            changed = self.poll()
+            if self.done:
+                logger.info("LPAP transfers complete. Ready for orchestration crate generation.")
+                return self.tasks
+            delay = self._next_delay(changed, delay, started)
+            self.sleep(self.backoff.apply_jitter(delay))
+
+    def _next_delay(self, changed, delay, started):
+        if self.timeout is not None and self.clock() - started >= self.timeout:
+            raise PollBudgetExceeded(f"Sub-crate transfers still outstanding after {self.timeout}s: "
+                                     f"{[self.labels[label] for label in self.unseen + self.active]}")
+        delay = self.backoff.next_delay(None if changed else delay)
+        logger.info(f"LPAP background transfers in progress. Backoff {delay:.1f} seconds")
+        return delay
+
+
+class AsyncTransferTracker(TransferTracker):
+    """
+    Asyncio variant of TransferTracker. The label and task id queries of each poll are issued
+    concurrently; transfer clients exposing task_list_async are awaited directly.
+    """
+
+    def __init__(self, transfer_client, labels: Dict[str, str], on_complete: Callable = None,
+                 backoff: BackoffPolicy = None, timeout: float = None,
+                 sleep: Callable = asyncio.sleep, clock: Callable = time.monotonic, profiler: Profiler = None):
+        super().__init__(transfer_client, labels, on_complete, backoff, timeout, sleep, clock, profiler)
+
+    async def _task_list(self, **filters):
+        self.requests += 1
+        with self.profiler.span('transfer.poll', filters=sorted(filters)):
+            return list(await call_async(self.transfer_client, 'task_list', filter=filters))
+
+    async def poll(self) -> bool:
+        pages = await asyncio.gather(*(self._task_list(**filters) for filters in self._queries()))
+        return self._apply([task for page in pages for task in page])
+
+    async def wait(self):
+        started = self.clock()
+        delay = None
+        while True:
+            changed = await self.poll()
+            if self.done:
+                logger.info("LPAP transfers complete. Ready for orchestration crate generation.")
+                return self.tasks
+            delay = self._next_delay(changed, delay, started)
+            await self.sleep(self.backoff.apply_jitter(delay))
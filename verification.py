@@ -0,0 +1,201 @@
+"""
+This module verifies the statistics LPAP's results on the orchestration server, rather than taking
+the numbers it reports on trust. The fastText and langDetect predictions and the validation data it
+compared (found by name in its sub-crate) are memory-mapped and processed a chunk of lines at a
+time: the label of each line (its first token, without fastText's __label__ prefix) is extracted
+with vectorised NumPy byte operations, and label pairs are counted per chunk, so multi-GB files
+are verified in bounded memory. The report holds, for each predictor, the accuracy, per-language
+precision / recall and the confusion matrix.
+"""
+import mmap
+import os
+import logging
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from .profiling import NULL_PROFILER
+from .subcrate_ingest import find_file
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = 1024 * 1024       # Bytes of each file processed at a time
+LABEL_WIDTH = 16                # Labels are compared on their first LABEL_WIDTH bytes
+LABEL_PREFIX = np.frombuffer(b'__label__', dtype=np.uint8)
+WHITESPACE = np.frombuffer(b' \t\r\n', dtype=np.uint8)
+
+# Flow input paths of the files the statistics LPAP compares (see gladier_components.statistics)
+VALIDATION_INPUT = ('datastore_paths', 'validation_dest_path')
+PREDICTION_INPUTS = {
+    'fastText': ('fastText_paths', 'FT_ST_dest'),
+    'langDetect': ('langdetect_paths', 'LD_ST_dest'),
+}
+
+
+def line_labels(data: np.ndarray, width=LABEL_WIDTH) -> np.ndarray:
+    """
+    Returns the label of each line in data (a uint8 array of whole lines) as fixed width byte
+    strings.
+    """
+    ends = np.flatnonzero(data == ord('\n'))
+    if len(data) and data[-1] != ord('\n'):
+        ends = np.append(ends, len(data))     # Last line of a file without a trailing newline
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    last = len(data) - 1
+
+    # Skip fastText's __label__ prefix
+    prefix = data[np.minimum(starts[:, None] + np.arange(len(LABEL_PREFIX)), last)]
+    has_prefix = (ends - starts >= len(LABEL_PREFIX)) & np.all(prefix == LABEL_PREFIX, axis=1)
+    starts = starts + has_prefix * len(LABEL_PREFIX)
+
+    # The label runs up to the first whitespace (or the end of the line)
+    columns = starts[:, None] + np.arange(width)
+    window = data[np.minimum(columns, last)]
+    inside = np.logical_and.accumulate((columns < ends[:, None]) & ~np.isin(window, WHITESPACE), axis=1)
+    return np.ascontiguousarray(np.where(inside, window, 0).astype(np.uint8)).view(f'S{width}').ravel()
+
+
+def iter_labels(path, chunk_bytes=CHUNK_BYTES) -> Iterator[np.ndarray]:
+    """
+    Yields the labels of a line-delimited file, a chunk of (whole) lines at a time.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                end = min(start + chunk_bytes, size)
+                if end < size:
+                    cut = mm.rfind(b'\n', start, end)
+                    if cut == -1:   # A line longer than the chunk
+                        cut = mm.find(b'\n', end)
+                    end = size if cut == -1 else cut + 1
+                chunk = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+                labels = line_labels(chunk)
+                del chunk   # The map cannot be closed while NumPy holds a view of it
+                yield labels
+                start = end
+
+
+class LabelCounts:
+    """
+    Accumulates (true label, predicted label) counts over chunks of aligned lines.
+    """
+
+    def __init__(self):
+        self.ids: Dict[bytes, int] = {}
+        self.pairs = Counter()      # (true id, predicted id) -> lines
+
+    def _ids(self, labels):
+        # Global label ids, looked up once per distinct label in the chunk
+        unique, inverse = np.unique(labels, return_inverse=True)
+        ids = np.array([self.ids.setdefault(label, len(self.ids)) for label in unique], dtype=np.int64)
+        return ids[inverse.ravel()]
+
+    def add(self, truth: np.ndarray, predicted: np.ndarray):
+        codes = (self._ids(truth) << 32) | self._ids(predicted)
+        pairs, counts = np.unique(codes, return_counts=True)
+        for code, count in zip(pairs.tolist(), counts.tolist()):
+            self.pairs[(code >> 32, code & 0xFFFFFFFF)] += count
+
+    def report(self) -> dict:
+        labels = sorted(self.ids, key=lambda label: label.decode('utf-8', 'replace'))
+        index = {self.ids[label]: i for i, label in enumerate(labels)}
+        matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        for (truth, predicted), count in self.pairs.items():
+            matrix[index[truth], index[predicted]] += count
+        correct = np.diag(matrix)
+        support = matrix.sum(axis=1)
+        predicted = matrix.sum(axis=0)
+        total = int(matrix.sum())
+        names = [label.decode('utf-8', 'replace') for label in labels]
+        return {
+            'lines_compared': total,
+            'accuracy': float(correct.sum() / total) if total else None,
+            'per_language': {
+                name: {
+                    'precision': float(correct[i] / predicted[i]) if predicted[i] else None,
+                    'recall': float(correct[i] / support[i]) if support[i] else None,
+                    'support': int(support[i]),
+                }
+                for i, name in enumerate(names)
+            },
+            'confusion_matrix': {'labels': names, 'rows': 'validation', 'columns': 'predicted',
+                                 'counts': matrix.tolist()},
+        }
+
+
+def verify_predictions(validation_path, prediction_paths: Dict[str, Path], chunk_bytes=CHUNK_BYTES) -> dict:
+    """
+    Compares each predictions file with the validation file, line by line.
+
+    Parameters:
+    validation_path (Path): The validation file (fastText format, '__label__<language> <text>').
+    prediction_paths (Dict[str, Path]): Predictions files (one label per line) by predictor name.
+
+    Returns:
+    dict: The line counts of the files, and a report per predictor (see LabelCounts.report).
+    """
+    streams = {name: iter_labels(path, chunk_bytes) for name, path in prediction_paths.items()}
+    pending = {name: None for name in streams}     # Predictions read ahead of the validation lines
+    lines = dict.fromkeys(['validation', *streams], 0)
+    counts = {name: LabelCounts() for name in streams}
+
+    for truth in iter_labels(validation_path, chunk_bytes):
+        lines['validation'] += len(truth)
+        for name, stream in streams.items():
+            # Compare the predictions for the same lines, chunk boundaries differing between files
+            offset = 0
+            while offset < len(truth):
+                if pending[name] is None or not len(pending[name]):
+                    pending[name] = next(stream, None)
+                    if pending[name] is None:
+                        break
+                    lines[name] += len(pending[name])
+                n = min(len(truth) - offset, len(pending[name]))
+                counts[name].add(truth[offset:offset + n], pending[name][:n])
+                pending[name] = pending[name][n:]
+                offset += n
+
+    # Count the predictions the validation data has no counterpart for
+    for name, stream in streams.items():
+        lines[name] += sum(len(chunk) for chunk in stream)
+
+    if len(set(lines.values())) > 1:
+        logger.warning(f"Statistics inputs differ in length, compared the common lines only: {lines}")
+    return {
+        'lines': lines,
+        'predictors': {name: counts[name].report() for name in streams},
+    }
+
+
+def verify_statistics(subcrate_path, flow_input: dict, chunk_bytes=CHUNK_BYTES, profiler=NULL_PROFILER) -> Optional[dict]:
+    """
+    Verifies the statistics LPAP's results from the files in its sub-crate, which are found by the
+    names of the paths it was given in the flow input.
+
+    Returns:
+    dict: The verification report (see verify_predictions), or None if the sub-crate does not
+    include the validation data and at least one predictions file.
+    """
+    def locate(group, key):
+        path = flow_input.get(group, {}).get(key)
+        return find_file(subcrate_path, os.path.basename(path)) if path else None
+
+    validation_path = locate(*VALIDATION_INPUT)
+    prediction_paths = {name: locate(*paths) for name, paths in PREDICTION_INPUTS.items()}
+    prediction_paths = {name: path for name, path in prediction_paths.items() if path is not None}
+    if validation_path is None or not prediction_paths:
+        logger.warning(f"Statistics inputs not found in {subcrate_path}, skipping verification")
+        return None
+
+    with profiler.span('statistics.verify', files=len(prediction_paths) + 1):
+        report = verify_predictions(validation_path, prediction_paths, chunk_bytes)
+    report['files'] = {name: os.path.relpath(path, subcrate_path)
+                       for name, path in [('validation', validation_path), *prediction_paths.items()]}
+    return report
@@ -0,0 +1,144 @@
+"""
+This module defines an incremental parser for Globus run logs (the WED). Log entries are consumed
+one at a time, ActionStarted entries are held in a hash index until the matching ActionCompleted
+entry arrives, and a cleaned step record is emitted as soon as each step finishes. Matching does
+not depend on the order of entries in the log, so concurrently executing steps are handled, and
+only the in-flight steps are kept in memory.
+"""
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, Tuple
+
+from .profiling import NULL_PROFILER
+from .run_monitor import call_async
+
+
+def parse_time(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def _next_marker(page):
+    # The marker of the following page, or None on the last page
+    marker = page.get('marker')
+    return marker if page.get('has_next_page') and marker else None
+
+
+def iter_run_log_pages(flows_client, run_id, marker=None, profiler=NULL_PROFILER, **kwargs) -> Iterator[Tuple[list, str]]:
+    """
+    Yields (entries, next_marker) for each page of a run log, starting from marker. next_marker
+    is None on the last page, and can be used to continue paging later.
+
+    Parameters:
+    flows_client: A Globus FlowsClient (or any object with a paginated get_run_logs method).
+    run_id (str): The ID of the run.
+    profiler (Profiler): Records each page request (see profiling).
+    """
+    while True:
+        if marker:
+            kwargs['marker'] = marker
+        with profiler.span('wed.page', run_id=run_id):
+            page = flows_client.get_run_logs(run_id, **kwargs)
+        marker = _next_marker(page)
+        yield page['entries'], marker
+        if marker is None:
+            return
+
+
+def iter_run_logs(flows_client, run_id, **kwargs) -> Iterator[dict]:
+    """
+    Yields run log entries page by page, so parsing can start before the log is fully paged.
+    """
+    for entries, _ in iter_run_log_pages(flows_client, run_id, **kwargs):
+        yield from entries
+
+
+async def aiter_run_log_pages(flows_client, run_id, marker=None, profiler=NULL_PROFILER, **kwargs) -> AsyncIterator[Tuple[list, str]]:
+    """
+    Asyncio variant of iter_run_log_pages (clients exposing get_run_logs_async are awaited directly).
+    """
+    while True:
+        if marker:
+            kwargs['marker'] = marker
+        with profiler.span('wed.page', run_id=run_id):
+            page = await call_async(flows_client, 'get_run_logs', run_id, **kwargs)
+        marker = _next_marker(page)
+        yield page['entries'], marker
+        if marker is None:
+            return
+
+
+async def aiter_run_logs(flows_client, run_id, **kwargs) -> AsyncIterator[dict]:
+    async for entries, _ in aiter_run_log_pages(flows_client, run_id, **kwargs):
+        for entry in entries:
+            yield entry
+
+
+def action_results(state_name: str, completed: dict) -> dict:
+    """
+    There is inconsistancy in the key names for the results. This must be dependent
+    on how many dependent steps are included in the action log.
+    """
+    output = completed['details'].get('output', {})
+    return output.get(f"{state_name}_result") or \
+        output.get(f"{state_name}_results") or \
+        output
+
+
+class WEDParser:
+    """
+    Matches ActionStarted/ActionCompleted log entries by state name (or action id) and yields a
+    cleaned record per completed step: the action results plus its total_execution_time.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, dict] = {}      # state_name -> ActionStarted entry
+        self.action_index: Dict[str, str] = {}  # action_id -> state_name, for entries without a state name
+        self.completed = 0
+
+    def _match(self, completed: dict):
+        details = completed['details']
+        state_name = details.get('state_name')
+        if state_name in self.pending:
+            return state_name
+        output = details.get('output', {})
+        action_id = details.get('action_id') or next(
+            (value['action_id'] for value in output.values() if isinstance(value, dict) and 'action_id' in value), None)
+        if action_id in self.action_index:
+            return self.action_index[action_id]
+        if state_name is None and len(self.pending) == 1:
+            # Only one step in flight, so the completion must belong to it
+            return next(iter(self.pending))
+        return None
+
+    def feed(self, entry: dict) -> Iterator[Tuple[str, dict]]:
+        """
+        Consumes one log entry, yielding (state_name, record) if it completes a step.
+        """
+        code = entry.get('code')
+        if code == 'ActionStarted':
+            state_name = entry['details']['state_name']
+            self.pending[state_name] = entry
+            action_id = entry['details'].get('action_id')
+            if action_id:
+                self.action_index[action_id] = state_name
+        elif code == 'ActionCompleted':
+            state_name = self._match(entry)
+            if state_name is None:
+                return
+            started = self.pending.pop(state_name)
+            self.action_index.pop(started['details'].get('action_id'), None)
+
+            results = action_results(state_name, entry)
+            # Storing the results in the dictionary if action_results is found
+            if results:
+                record = dict(results)
+                total_time = (parse_time(entry['time']) - parse_time(started['time'])).total_seconds()
+                record['total_execution_time'] = total_time  # Add total execution time to results
+                self.completed += 1
+                yield state_name, record
+
+    def parse(self, entries: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+        """
+        Consumes a stream of log entries, yielding (state_name, record) as each step completes.
+        """
+        for entry in entries:
+            yield from self.feed(entry)